@@ -0,0 +1,254 @@
+import sys, time
+from typing import Callable, List, Optional, Tuple
+
+SW_RESTORE = 9
+BACKENDS = ("auto", "win32", "pynput", "virtual")
+# ops a batch passed to send() may contain: (op, args) with op one of these
+BATCH_OPS = ("press_key", "release_key", "press_button", "release_button", "move")
+
+# SendInput
+INPUT_MOUSE, INPUT_KEYBOARD = 0, 1
+MOUSEEVENTF_MOVE, MOUSEEVENTF_XDOWN, MOUSEEVENTF_XUP = 0x0001, 0x0080, 0x0100
+MOUSEEVENTF_VIRTUALDESK, MOUSEEVENTF_ABSOLUTE = 0x4000, 0x8000
+KEYEVENTF_EXTENDEDKEY, KEYEVENTF_KEYUP, KEYEVENTF_UNICODE = 0x0001, 0x0002, 0x0004
+MAPVK_VK_TO_VSC = 0
+# page up/down, end, home, arrows, print screen, insert, delete, windows/apps
+# keys, numpad divide, num lock, right ctrl/alt: sent with KEYEVENTF_EXTENDEDKEY
+EXTENDED_VKS = frozenset((*range(0x21, 0x29), 0x2C, 0x2D, 0x2E, 0x5B, 0x5C, 0x5D, 0x6F, 0x90, 0xA3, 0xA5))
+SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN = 76, 77, 78, 79
+BUTTON_FLAGS = {"left": (0x0002, 0x0004, 0), "right": (0x0008, 0x0010, 0), "middle": (0x0020, 0x0040, 0),
+                "x1": (MOUSEEVENTF_XDOWN, MOUSEEVENTF_XUP, 1), "x2": (MOUSEEVENTF_XDOWN, MOUSEEVENTF_XUP, 2)}
+
+
+class _NullListener:
+    def start(self): pass
+    def run(self): pass
+    def stop(self): pass
+
+
+class InputBackend:
+    # Everything the engine injects or observes goes through one of these, so
+    # the clicker/player/recorder never touch pynput or user32 directly.
+    name = "base"
+
+    def resolve_key(self, name: str): raise NotImplementedError
+    def resolve_button(self, name: str): raise NotImplementedError
+    def key_name(self, key) -> str: raise NotImplementedError
+    def button_name(self, button) -> str: raise NotImplementedError
+
+    def press_key(self, key): raise NotImplementedError
+    def release_key(self, key): raise NotImplementedError
+    def press_button(self, button): raise NotImplementedError
+    def release_button(self, button): raise NotImplementedError
+    def move(self, x: int, y: int): raise NotImplementedError
+    def position(self) -> Tuple[int, int]: raise NotImplementedError
+
+    def send(self, inputs):
+        # inject a whole batch of (op, args) in one go; backends with a native
+        # batch call (SendInput) override this, the rest just loop
+        for op, args in inputs: getattr(self, op)(*args)
+
+    def foreground_window(self) -> Optional[int]: return None
+    def focus_window(self, hwnd: int) -> bool: return False
+
+    def keyboard_listener(self, on_press, on_release): return _NullListener()
+    def mouse_listener(self, on_move, on_click): return _NullListener()
+
+
+class PynputBackend(InputBackend):
+    name = "pynput"
+
+    def __init__(self):
+        from pynput import keyboard, mouse
+        self.keyboard, self.mouse = keyboard, mouse
+        self.kb = keyboard.Controller()
+        self.ms = mouse.Controller()
+        self.press_key, self.release_key = self.kb.press, self.kb.release
+        self.press_button, self.release_button = self.ms.press, self.ms.release
+
+    def resolve_key(self, name: str):
+        key_obj = getattr(self.keyboard.Key, name, None)
+        return key_obj if key_obj is not None else self.keyboard.KeyCode.from_char(name[:1])
+
+    def resolve_button(self, name: str): return getattr(self.mouse.Button, name)
+
+    def key_name(self, key) -> str:
+        try:
+            if isinstance(key, self.keyboard.KeyCode):
+                return key.char if key.char else str(key.vk)
+            return str(key).split(".")[-1]
+        except: return str(key)
+
+    def button_name(self, button) -> str: return str(button).split(".")[-1]
+
+    def move(self, x: int, y: int): self.ms.position = (x, y)
+    def position(self) -> Tuple[int, int]:
+        x, y = self.ms.position; return (int(x), int(y))
+
+    def keyboard_listener(self, on_press, on_release):
+        l = self.keyboard.Listener(on_press=on_press, on_release=on_release); l.start(); return l
+
+    def mouse_listener(self, on_move, on_click):
+        l = self.mouse.Listener(on_move=on_move, on_click=on_click); l.start(); return l
+
+
+class Win32Backend(PynputBackend):
+    # pynput for injection and hooks, user32 for cursor and window focus
+    name = "win32"
+
+    def __init__(self):
+        super().__init__()
+        import ctypes, ctypes.wintypes
+        self.ctypes = ctypes
+        self.user32 = ctypes.windll.user32
+        class POINT(ctypes.Structure):
+            _fields_ = [("x", ctypes.c_long), ("y", ctypes.c_long)]
+        self._pt = POINT()
+        W = ctypes.wintypes
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", W.LONG), ("dy", W.LONG), ("mouseData", W.DWORD), ("dwFlags", W.DWORD),
+                        ("time", W.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [("wVk", W.WORD), ("wScan", W.WORD), ("dwFlags", W.DWORD),
+                        ("time", W.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+        class _INPUT_U(ctypes.Union):
+            _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT)]
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", W.DWORD), ("u", _INPUT_U)]
+        self._INPUT = INPUT
+        self._buttons = {}
+        self._keys = {}
+        self.user32.VkKeyScanW.argtypes = [W.WCHAR]; self.user32.VkKeyScanW.restype = ctypes.c_short
+        self.user32.MapVirtualKeyW.argtypes = [W.UINT, W.UINT]; self.user32.MapVirtualKeyW.restype = W.UINT
+
+    def _button_flags(self, button):
+        f = self._buttons.get(button)
+        if f is None: f = self._buttons[button] = BUTTON_FLAGS[self.button_name(button)]
+        return f
+
+    def _key_strokes(self, key) -> tuple:
+        # -> ((vk, scan, flags), ...) for one key, resolved like pynput's own
+        # press(): vk + scan code whenever the layout has the character without
+        # modifiers, unicode input (a surrogate pair above U+FFFF) otherwise
+        try: ks = self._keys.get(key)
+        except TypeError: ks = None
+        if ks is not None: return ks
+        kc = getattr(key, "value", key); u = self.user32
+        vk = getattr(kc, "vk", None)
+        if not vk:
+            ch = kc.char
+            res = u.VkKeyScanW(ch) if len(ch) == 1 and ord(ch) <= 0xFFFF else -1
+            if res != -1 and not (res >> 8) & 0xFF: vk = res & 0xFF
+        if vk:
+            ext = vk in EXTENDED_VKS or getattr(kc, "_flags", 0) & KEYEVENTF_EXTENDEDKEY
+            ks = ((vk, u.MapVirtualKeyW(vk, MAPVK_VK_TO_VSC), KEYEVENTF_EXTENDEDKEY if ext else 0),)
+        else:
+            b = kc.char.encode("utf-16-le")
+            ks = tuple((0, int.from_bytes(b[i:i + 2], "little"), KEYEVENTF_UNICODE) for i in range(0, len(b), 2))
+        try: self._keys[key] = ks
+        except TypeError: pass
+        return ks
+
+    def send(self, inputs):
+        # one SendInput call for the whole batch: the inputs are queued
+        # back to back without other input interleaving
+        if any(op in ("press_key", "release_key") for op, _ in inputs):
+            flat = []
+            for op, args in inputs:
+                if op == "press_key" or op == "release_key":
+                    up = KEYEVENTF_KEYUP if op == "release_key" else 0
+                    flat += [("key", (vk, scan, f | up)) for vk, scan, f in self._key_strokes(args[0])]
+                else: flat.append((op, args))
+            inputs = flat
+        n = len(inputs)
+        if not n: return
+        arr = (self._INPUT * n)(); gsm = self.user32.GetSystemMetrics
+        vx, vy = gsm(SM_XVIRTUALSCREEN), gsm(SM_YVIRTUALSCREEN)
+        vw, vh = max(2, gsm(SM_CXVIRTUALSCREEN)), max(2, gsm(SM_CYVIRTUALSCREEN))
+        for rec, (op, args) in zip(arr, inputs):
+            if op == "move":
+                mi = rec.u.mi; rec.type = INPUT_MOUSE
+                mi.dx = (int(args[0]) - vx) * 65535 // (vw - 1); mi.dy = (int(args[1]) - vy) * 65535 // (vh - 1)
+                mi.dwFlags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
+            elif op in ("press_button", "release_button"):
+                down, up, data = self._button_flags(args[0])
+                mi = rec.u.mi; rec.type = INPUT_MOUSE
+                mi.dwFlags = down if op == "press_button" else up; mi.mouseData = data
+            else:
+                ki = rec.u.ki; rec.type = INPUT_KEYBOARD
+                ki.wVk, ki.wScan, ki.dwFlags = args
+        self.user32.SendInput(n, arr, self.ctypes.sizeof(self._INPUT))
+
+    def position(self) -> Tuple[int, int]:
+        pt = self._pt; self.user32.GetCursorPos(self.ctypes.byref(pt)); return (pt.x, pt.y)
+
+    def move(self, x: int, y: int): self.user32.SetCursorPos(int(x), int(y))
+
+    def foreground_window(self) -> Optional[int]:
+        return int(self.user32.GetForegroundWindow())
+
+    def focus_window(self, hwnd: int) -> bool:
+        h = self.ctypes.wintypes.HWND(hwnd)
+        self.user32.ShowWindow(h, SW_RESTORE)
+        return bool(self.user32.SetForegroundWindow(h))
+
+
+class VirtualBackend(InputBackend):
+    # In-memory backend for headless runs: injected input is only logged as
+    # (perf_counter_ns, op, arg) and listeners are driven with emit_*().
+    name = "virtual"
+
+    def __init__(self, log: bool = True):
+        self.log: List[tuple] = []
+        self.logging = log
+        self.pos = (0, 0)
+        self.hwnd: Optional[int] = None
+        self._on_key: List[Tuple[Callable, Callable]] = []
+        self._on_mouse: List[Tuple[Callable, Callable]] = []
+
+    def _rec(self, op, arg):
+        if self.logging: self.log.append((time.perf_counter_ns(), op, arg))
+
+    def resolve_key(self, name: str): return name
+    def resolve_button(self, name: str): return name
+    def key_name(self, key) -> str: return str(key)
+    def button_name(self, button) -> str: return str(button)
+
+    def press_key(self, key): self._rec("key_down", key)
+    def release_key(self, key): self._rec("key_up", key)
+    def press_button(self, button): self._rec("button_down", button)
+    def release_button(self, button): self._rec("button_up", button)
+    def move(self, x: int, y: int):
+        self.pos = (int(x), int(y)); self._rec("move", self.pos)
+    def position(self) -> Tuple[int, int]: return self.pos
+
+    def foreground_window(self) -> Optional[int]: return self.hwnd
+    def focus_window(self, hwnd: int) -> bool:
+        self.hwnd = hwnd; self._rec("focus", hwnd); return True
+
+    def keyboard_listener(self, on_press, on_release):
+        self._on_key.append((on_press, on_release)); return _NullListener()
+
+    def mouse_listener(self, on_move, on_click):
+        self._on_mouse.append((on_move, on_click)); return _NullListener()
+
+    def emit_key(self, key, pressed: bool):
+        for on_press, on_release in self._on_key: (on_press if pressed else on_release)(key)
+
+    def emit_move(self, x: int, y: int):
+        self.pos = (int(x), int(y))
+        for on_move, _ in self._on_mouse: on_move(x, y)
+
+    def emit_click(self, x: int, y: int, button, pressed: bool):
+        for _, on_click in self._on_mouse: on_click(x, y, button, pressed)
+
+    def clear(self): self.log.clear()
+
+
+def get_backend(name: str = "auto") -> InputBackend:
+    if name == "auto":
+        name = "win32" if sys.platform == "win32" else "pynput"
+    if name == "win32": return Win32Backend()
+    if name == "pynput": return PynputBackend()
+    if name == "virtual": return VirtualBackend()
+    raise ValueError(f"unknown input backend: {name}")
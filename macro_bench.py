@@ -0,0 +1,298 @@
+import argparse, json, platform, subprocess, sys, time, tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Callable, List, Optional
+import macro_engine as engine
+from macro_model import Macro, MacroEvent
+from macro_backend import VirtualBackend
+from macro_plan import get_plan
+from macro_timing import percentile
+from macro_human import DISTS, Humanizer
+from macro_sched import ClickJob, Scheduler, TriggerJob
+from macro_hooks import InputHub
+from macro_trigger import ArraySource, Region, TriggerSet
+
+BENCH_VERSION = 1
+CLICK_RATES = (1, 10, 100, 1000)
+MACRO_SIZES = (1_000, 100_000, 1_000_000)
+FLOOD_SIZES = (10_000, 100_000)
+TRIGGER_REGIONS = (1, 12, 48)
+
+
+def _errors_summary(errors_ns: List[int]) -> dict:
+    s = sorted(errors_ns)
+    return {"err_p50_ms": round(percentile(s, 50) / 1e6, 4),
+            "err_p99_ms": round(percentile(s, 99) / 1e6, 4),
+            "err_max_ms": round((s[-1] if s else 0) / 1e6, 4)}
+
+def _measure(fn: Callable[[], dict], trace_mem: bool) -> dict:
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    out = fn()
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    peak = None
+    if trace_mem:
+        # tracemalloc slows every allocation, so memory gets its own run and
+        # never skews the timing numbers above
+        tracemalloc.start()
+        try: fn()
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+    out.update({"wall_s": round(wall, 4), "cpu_s": round(cpu, 4),
+                "peak_mem_kb": round(peak / 1024, 1) if peak is not None else None})
+    return out
+
+
+def bench_click(cps: float, duration_s: float, burst: int = 1, human: Optional[dict] = None) -> dict:
+    # human: humanization settings (human_seed, interval_dist, interval_cv, ...)
+    vb = VirtualBackend(); engine.set_backend(vb)
+    ticks = max(3, int(cps * duration_s / burst))
+    cfg = {"click_mode": "cps", "cps": cps, "interval_ms": 100, "button": "left",
+           "mode": "fixed", "fixed_xy": (10, 10), "jitter": 0.0, "late_policy": "skip",
+           "burst_size": burst, "burst_spacing_ms": 0, **(human or {})}
+    sched = Scheduler(); job = sched.add(ClickJob("bench", lambda: cfg))
+    sched.start("bench")
+    while job.stats.ticks < ticks:
+        time.sleep(0.001)
+    sched.close()
+    # lateness of each click against its grid slot, taken from the injection log
+    # (the first click of each burst against its burst's slot)
+    downs = [ts for ts, op, _ in vb.log if op == "button_down"]
+    period = int(1e9 * burst / cps)
+    # a humanizer with the same seed replays the exact intervals the job used
+    factor = Humanizer.for_clicker(cfg).interval_factor if cfg.get("human_seed") else None
+    errors, slot = [], 0
+    for ts in downs[::burst]:
+        errors.append(max(0, ts - downs[0] - slot))
+        slot += period if factor is None else max(1, int(period * factor()))
+    st = job.stats.summary()
+    return {"target_rate": cps, "burst": burst, "achieved_rate": st["achieved_cps"], "events": len(downs),
+            "missed": st["missed"], **_errors_summary(errors)}
+
+
+def synthetic_macro(n: int, delay_ms: int) -> Macro:
+    evs = []
+    for i in range(n):
+        if i % 4 < 2:
+            evs.append(MacroEvent("key", "press" if i % 2 == 0 else "release", {"key": "a"}, delay_ms))
+        else:
+            evs.append(MacroEvent("mouse", "click", {"x": i % 800, "y": i % 600, "button": "left",
+                                                      "pressed": i % 2 == 0}, delay_ms))
+    return Macro(evs)
+
+def bench_playback(n: int, speed: float, loop: int, delay_ms: int, human: Optional[dict] = None) -> dict:
+    vb = VirtualBackend(); engine.set_backend(vb)
+    m = synthetic_macro(n, delay_ms)
+    t0 = time.perf_counter_ns()
+    engine.playback_macro(m, speed=speed, loop=loop, human=Humanizer.for_playback(human or {}))
+    wall_ns = time.perf_counter_ns() - t0
+    errors = []
+    if Humanizer.for_playback(human or {}) is not None:
+        # replay the same seed to get every (humanized) due time, batches expanded
+        due = [off for off, fn, args in engine.timeline(m, vb, speed, loop, Humanizer.for_playback(human))
+               for _ in (args[0] if fn == vb.send else (None,))]
+        start = vb.log[0][0] - due[0] if vb.log else 0
+        errors = [ts - start - d for (ts, _, _), d in zip(vb.log, due)]
+    else:
+        plan = get_plan(m, vb)
+        scale = 1.0 / max(0.01, speed)
+        # one due time per logged input, batches expanded
+        due = [off for off, fn, args in plan.ops for _ in (args[0] if fn == vb.send else (None,))]
+        start = vb.log[0][0] - int(due[0] * scale) if vb.log else 0
+        for i, (ts, _, _) in enumerate(vb.log):
+            loop_i, op_i = divmod(i, len(due))
+            errors.append(ts - start - int((loop_i * plan.duration_ns + due[op_i]) * scale))
+    return {"events": len(vb.log), "speed": speed, "loop": loop, "delay_ms": delay_ms,
+            "achieved_rate": round(len(vb.log) * 1e9 / wall_ns, 1) if wall_ns else 0.0,
+            **_errors_summary([abs(e) for e in errors])}
+
+
+def bench_recorder(n: int, kind: str) -> dict:
+    vb = VirtualBackend(log=False); engine.set_backend(vb)
+    engine.set_control_keys([])
+    engine.start_record()
+    lat = [0] * n
+    clock = time.perf_counter_ns
+    t0 = clock()
+    if kind == "key":
+        for i in range(n):
+            s = clock(); engine.on_kb_event("a", i % 2 == 0); lat[i] = clock() - s
+    else:
+        for i in range(n):
+            s = clock(); engine.on_mouse_click(i % 800, i % 600, "left", i % 2 == 0); lat[i] = clock() - s
+    wall_ns = clock() - t0
+    m = engine.stop_record()
+    return {"events": len(m.events), "achieved_rate": round(n * 1e9 / wall_ns, 1),
+            **_errors_summary(lat)}
+
+
+def bench_trigger(n: int, duration_s: float, fps: float = 60.0) -> dict:
+    # n 32x32 regions on a 1080p array screen; one region changes every 50 ms
+    # and the error is change-to-action time, which should stay under a frame
+    src = ArraySource(1920, 1080)
+    regions = [Region(64 * (i % 28), 64 * (i // 28), 32, 32) for i in range(n)]
+    ts = TriggerSet(src, regions, fps); ts.poll()
+    changed, errors = [0], []
+    clock = time.perf_counter_ns
+    def action(fired): errors.append(clock() - changed[0])
+    sched = Scheduler(); job = sched.add(TriggerJob("bench", ts, action))
+    sched.start("bench")
+    t0 = clock(); k = 0
+    while clock() - t0 < duration_s * 1e9:
+        r = regions[k % n]; k += 1
+        changed[0] = clock(); src.fill(r.x, r.y, r.w, r.h, (k % 256, 0, 0))
+        time.sleep(0.05)
+    sched.close()
+    wall_ns = clock() - t0
+    return {"regions": n, "fps": fps, "changes": k, "fired": len(errors),
+            "achieved_rate": round(job.stats.ticks * 1e9 / wall_ns, 1), **_errors_summary(errors)}
+
+
+def bench_hooks(n: int) -> dict:
+    # synthetic key feed through the single keyboard hook while recording:
+    # letters, with a <ctrl>+<alt>+h hotkey every 50 keys. Errors are the hook
+    # time per key event; hotkey_* is key press to action done on the hotkey thread.
+    vb = VirtualBackend(log=False); engine.set_backend(vb)
+    hotkeys = ["<f9>", "<f10>", "<f8>", "<f6>", "<f7>", "<ctrl>+<alt>+h"]
+    engine.set_control_keys(hotkeys)
+    hub = InputHub(vb); hub.start_keyboard()
+    clock = time.perf_counter_ns
+    fired, t_press = [], deque()
+    noop = lambda: None
+    hub.set_hotkeys({**{hk: noop for hk in hotkeys[:-1]}, hotkeys[-1]: lambda: fired.append(clock() - t_press.popleft())})
+    engine.start_record()
+    lat = []; letters = "etaoinsrhl"
+    t0 = clock()
+    for i in range(n):
+        if i % 50 == 49:
+            seq = [("ctrl_l", True), ("alt_l", True), ("h", True), ("h", False), ("alt_l", False), ("ctrl_l", False)]
+        else:
+            k = letters[i % len(letters)]; seq = [(k, True), (k, False)]
+        for k, down in seq:
+            s = clock()
+            if k == "h" and down: t_press.append(s)
+            vb.emit_key(k, down); lat.append(clock() - s)
+    wall_ns = clock() - t0
+    m = engine.stop_record(); hub.stop()   # stop() waits for queued hotkey actions
+    hk = sorted(fired)
+    return {"events": len(lat), "recorded": len(m.events), "hotkeys_fired": len(hk),
+            "hotkey_p50_ms": round(percentile(hk, 50) / 1e6, 4), "hotkey_p99_ms": round(percentile(hk, 99) / 1e6, 4),
+            "achieved_rate": round(len(lat) * 1e9 / wall_ns, 1), **_errors_summary(lat)}
+
+
+def import_breakdown(module: str, top: int = 15) -> dict:
+    # cold-import cost per module, from `python -X importtime` in a fresh interpreter
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       capture_output=True, text=True, cwd=str(Path(__file__).parent))
+    rows = []
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        self_us, cum_us, name = (p.strip() for p in line[len("import time:"):].split("|"))
+        if self_us.isdigit(): rows.append((name, int(self_us), int(cum_us)))
+    total = next((c for n, _, c in rows if n == module), 0)
+    rows.sort(key=lambda t: -t[1])
+    return {"import_ms": round(total / 1000, 1),
+            "modules": [{"module": n, "self_ms": round(s / 1000, 2), "cum_ms": round(c / 1000, 2)}
+                        for n, s, c in rows[:top]]}
+
+def bench_startup() -> dict:
+    out = {"scenario": "startup", **import_breakdown("macro_clicker_gui")}
+    # time to first window needs a display; left out when the GUI cannot start
+    try:
+        r = subprocess.run([sys.executable, "macro_clicker_gui.py", "--startup-report"], capture_output=True,
+                           text=True, timeout=30, cwd=str(Path(__file__).parent))
+        out.update(json.loads(r.stdout.strip().splitlines()[-1]))
+    except (subprocess.TimeoutExpired, ValueError, IndexError):
+        out["first_window_ms"] = None
+    return out
+
+
+def run_all(args) -> dict:
+    results = []
+    human = {"human_seed": args.seed, "interval_dist": args.interval_dist, "interval_cv": args.interval_cv,
+             "playback_dist": args.delay_dist, "playback_delay_cv": args.delay_cv}
+    def add(name: str, fn):
+        r = _measure(fn, not args.no_mem); r["scenario"] = name
+        results.append(r)
+        print(f"{name:<40} rate={r['achieved_rate']:>12} p99={r['err_p99_ms']}ms cpu={r['cpu_s']}s",
+              file=sys.stderr)
+    if "click" in args.only:
+        for cps in args.cps:
+            for b in args.bursts:
+                name = f"click/{cps:g}cps" + (f"/burst{b}" if b > 1 else "")
+                add(name, lambda cps=cps, b=b: bench_click(cps, args.duration, b, human))
+    if "playback" in args.only:
+        for n in args.sizes:
+            for speed in args.speeds:
+                for loop in args.loops:
+                    # real delays on small macros, back-to-back events on big ones
+                    dly = 1 if n * loop <= 5_000 else 0
+                    add(f"playback/{n}ev/x{speed:g}/loop{loop}",
+                        lambda n=n, s=speed, l=loop, d=dly: bench_playback(n, s, l, d, human))
+    if "recorder" in args.only:
+        for n in args.floods:
+            add(f"recorder/key/{n}", lambda n=n: bench_recorder(n, "key"))
+            add(f"recorder/mouse_click/{n}", lambda n=n: bench_recorder(n, "mouse"))
+    if "hooks" in args.only:
+        for n in args.floods:
+            add(f"hooks/keys/{n}", lambda n=n: bench_hooks(n))
+    if "trigger" in args.only:
+        for n in args.regions:
+            add(f"trigger/{n}regions", lambda n=n: bench_trigger(n, args.duration))
+    if "startup" in args.only:
+        r = bench_startup(); results.append(r)
+        print(f"{'startup':<40} import={r['import_ms']}ms first_window={r['first_window_ms']}ms", file=sys.stderr)
+    return {"version": BENCH_VERSION, "python": platform.python_version(),
+            "platform": platform.platform(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results}
+
+
+def compare(old: dict, new: dict):
+    prev = {r["scenario"]: r for r in old.get("results", [])}
+    for r in new["results"]:
+        o = prev.get(r["scenario"])
+        if not o: continue
+        def ratio(k):
+            return f"{r[k] / o[k]:.2f}x" if o.get(k) and r.get(k) is not None else "-"
+        if r["scenario"] == "startup":
+            print(f"{'startup':<40} import {ratio('import_ms'):>7}  first window {ratio('first_window_ms'):>7}",
+                  file=sys.stderr)
+            continue
+        print(f"{r['scenario']:<40} rate {ratio('achieved_rate'):>7}  p99 {ratio('err_p99_ms'):>7}  "
+              f"cpu {ratio('cpu_s'):>7}  mem {ratio('peak_mem_kb'):>7}", file=sys.stderr)
+
+
+def _floats(s: str): return [float(x) for x in s.split(",") if x]
+def _ints(s: str): return [int(x) for x in s.split(",") if x]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Timing benchmarks for the clicker, player and recorder (virtual input).")
+    ap.add_argument("--only", default="click,playback,recorder", type=lambda s: s.split(","),
+                    help="any of click,playback,recorder,hooks,trigger,startup")
+    ap.add_argument("--cps", default=",".join(map(str, CLICK_RATES)), type=_floats)
+    ap.add_argument("--duration", default=2.0, type=float, help="seconds per clicker run (min 3 clicks)")
+    ap.add_argument("--bursts", default="1", type=_ints, help="clicker burst sizes, e.g. 1,10")
+    ap.add_argument("--sizes", default=",".join(map(str, MACRO_SIZES)), type=_ints)
+    ap.add_argument("--speeds", default="1,4", type=_floats)
+    ap.add_argument("--loops", default="1,3", type=_ints)
+    ap.add_argument("--floods", default=",".join(map(str, FLOOD_SIZES)), type=_ints)
+    ap.add_argument("--regions", default=",".join(map(str, TRIGGER_REGIONS)), type=_ints,
+                    help="watched regions per trigger run")
+    ap.add_argument("--seed", default=1, type=int, help="humanizer seed, so humanized runs repeat exactly")
+    ap.add_argument("--interval-dist", default="none", choices=DISTS, help="humanized click intervals")
+    ap.add_argument("--interval-cv", default=0.1, type=float)
+    ap.add_argument("--delay-dist", default="none", choices=DISTS, help="humanized playback delays")
+    ap.add_argument("--delay-cv", default=0.1, type=float)
+    ap.add_argument("--no-mem", action="store_true", help="skip the extra tracemalloc run used for peak memory")
+    ap.add_argument("--out", type=Path, help="write JSON results here instead of stdout")
+    ap.add_argument("--compare", type=Path, help="previous JSON results to compare against")
+    args = ap.parse_args(argv)
+
+    res = run_all(args)
+    text = json.dumps(res, indent=2)
+    if args.out: args.out.write_text(text, encoding="utf-8")
+    else: print(text)
+    if args.compare: compare(json.loads(args.compare.read_text(encoding="utf-8")), res)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
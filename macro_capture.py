@@ -0,0 +1,71 @@
+import heapq, threading
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+# raw event codes stored by the capture stage
+EV_KEY = 1     # x = name id, flags = pressed
+EV_CLICK = 2   # x, y = position, flags = pressed | name id << 1
+EV_MOVE = 3    # x, y = position
+
+CHUNK = 1 << 16
+
+# (perf_counter_ns, code, x, y, flags)
+RawEvent = Tuple[int, int, int, int, int]
+
+
+class CaptureBuffer:
+    # Column arrays written by exactly one hook thread, so push() needs no lock:
+    # the reader only looks at the first `n` slots once recording has stopped.
+    # Storage is pre-allocated and only grows (by a whole chunk) when full.
+    def __init__(self, capacity: int = CHUNK):
+        self.cap = capacity
+        self.ts = array("q", [0]) * capacity
+        self.code = array("b", [0]) * capacity
+        self.x = array("i", [0]) * capacity
+        self.y = array("i", [0]) * capacity
+        self.flags = array("i", [0]) * capacity
+        self.n = 0
+
+    def _grow(self):
+        extra = max(CHUNK, self.cap)
+        self.ts.extend(array("q", [0]) * extra); self.code.extend(array("b", [0]) * extra)
+        self.x.extend(array("i", [0]) * extra); self.y.extend(array("i", [0]) * extra)
+        self.flags.extend(array("i", [0]) * extra)
+        self.cap += extra
+
+    def push(self, ts: int, code: int, x: int, y: int, flags: int):
+        i = self.n
+        if i == self.cap: self._grow()
+        self.ts[i] = ts; self.code[i] = code; self.x[i] = x; self.y[i] = y; self.flags[i] = flags
+        self.n = i + 1
+
+    def reset(self): self.n = 0
+
+    def __len__(self): return self.n
+
+    def __iter__(self) -> Iterator[RawEvent]:
+        ts, code, x, y, flags = self.ts, self.code, self.x, self.y, self.flags
+        for i in range(self.n):
+            yield (ts[i], code[i], x[i], y[i], flags[i])
+
+
+def merged(buffers: List[CaptureBuffer]) -> Iterator[RawEvent]:
+    # every buffer is already in timestamp order
+    return heapq.merge(*buffers, key=lambda r: r[0])
+
+
+class NameTable:
+    # key/button names are interned once; the hot path only stores their id
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, name: str) -> int:
+        i = self.ids.get(name)
+        if i is None:
+            with self._lock:
+                i = self.ids.get(name)
+                if i is None:
+                    i = len(self.names); self.names.append(name); self.ids[name] = i
+        return i
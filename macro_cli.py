@@ -0,0 +1,112 @@
+import argparse, sys, time
+from pathlib import Path
+from typing import List, Optional
+import macro_engine as engine
+from macro_backend import BACKENDS, get_backend
+from macro_metrics import METRICS, PLAY_LATE, PLAY_INJECT, Histogram
+from macro_model import Macro
+from macro_human import DISTS, Humanizer
+
+# Plays macro files without the GUI (and without importing tkinter), e.g.
+#   python macro_cli.py a.json b.mcrb --speed 2 --loop 3 --delay 5
+#   python macro_cli.py --playlist night.txt --repeat 10 --backend win32
+
+
+def read_playlist(path: Path) -> List[Path]:
+    # one macro path per line, relative to the playlist; '#' starts a comment
+    out = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line: out.append((path.parent / line) if not Path(line).is_absolute() else Path(line))
+    return out
+
+
+def positive_float(s: str) -> float:
+    v = float(s)
+    if not 0 < v < float("inf"): raise argparse.ArgumentTypeError(f"must be > 0, got {s}")
+    return v
+
+def positive_int(s: str) -> int:
+    v = int(s)
+    if v <= 0: raise argparse.ArgumentTypeError(f"must be >= 1, got {s}")
+    return v
+
+
+def play_one(path: Path, speed: float, loop: int, focus: bool, human: Optional[Humanizer] = None) -> dict:
+    m = Macro.load(path)
+    if not focus: m.target_hwnd = None
+    PLAY_LATE.reset(); PLAY_INJECT.reset()
+    t0 = time.perf_counter()
+    engine.playback_macro(m, speed=speed, loop=loop, human=human)
+    wall = time.perf_counter() - t0
+    close = getattr(m, "close", None)
+    if close: close()
+    late = PLAY_LATE.summary()
+    return {"macro": str(path), "events": PLAY_LATE.count, "wall_s": round(wall, 3),
+            "late_p50_ms": late["p50_ms"], "late_p99_ms": late["p99_ms"], "late_max_ms": late["max_ms"],
+            "inject_p99_ms": PLAY_INJECT.summary()["p99_ms"]}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Play macro files headless (no GUI).")
+    ap.add_argument("macros", nargs="*", type=Path, help=".json or .mcrb macro files, played in order")
+    ap.add_argument("--playlist", type=Path, help="text file with one macro path per line")
+    ap.add_argument("--speed", default=1.0, type=positive_float)
+    ap.add_argument("--loop", default=1, type=positive_int, help="loops per macro")
+    ap.add_argument("--repeat", default=1, type=positive_int, help="times to play the whole list")
+    ap.add_argument("--delay", default=0.0, type=float, help="seconds to wait between runs")
+    ap.add_argument("--backend", default="auto", choices=BACKENDS)
+    ap.add_argument("--no-focus", action="store_true", help="do not focus the window the macro was recorded in")
+    ap.add_argument("--humanize", default="none", choices=DISTS, help="randomize every delay")
+    ap.add_argument("--variation", default=0.1, type=float, help="relative delay spread for --humanize")
+    ap.add_argument("--seed", default=0, type=int, help="humanizer seed (0 = random, printed)")
+    ap.add_argument("--metrics", type=Path, help="write the latency histograms here (.prom = Prometheus text)")
+    args = ap.parse_args(argv)
+
+    paths = list(args.macros)
+    if args.playlist:
+        try: paths += read_playlist(args.playlist)
+        except OSError as e: print(f"playlist: {e}", file=sys.stderr); return 2
+    if not paths: ap.error("no macros given")
+    missing = [p for p in paths if not p.is_file()]
+    if missing:
+        print("not found: " + ", ".join(map(str, missing)), file=sys.stderr); return 2
+
+    engine.set_backend(get_backend(args.backend))
+    human = Humanizer.for_playback({"human_seed": args.seed, "playback_dist": args.humanize,
+                                    "playback_delay_cv": args.variation})
+    if human is not None: print(f"humanize seed {human.seed}", file=sys.stderr)
+    # play_one resets the playback histograms per run; these collect the whole session
+    totals = {h: Histogram(h.name, h.help) for h in (PLAY_LATE, PLAY_INJECT)}
+    runs, failed = [], 0
+    total = len(paths) * args.repeat
+    try:
+        for r in range(args.repeat):
+            for i, p in enumerate(paths):
+                n = r * len(paths) + i
+                if n and args.delay > 0: time.sleep(args.delay)
+                try:
+                    res = play_one(p, args.speed, args.loop, not args.no_focus, human)
+                except Exception as e:
+                    failed += 1; print(f"[{n + 1}/{total}] {p}: {e}", file=sys.stderr); continue
+                runs.append(res)
+                for h, t in totals.items(): t.merge(h)
+                print(f"[{n + 1}/{total}] {p.name}: {res['events']} events in {res['wall_s']}s, "
+                      f"late p50 {res['late_p50_ms']} p99 {res['late_p99_ms']} max {res['late_max_ms']} ms",
+                      file=sys.stderr)
+    except KeyboardInterrupt:
+        engine.playing = False
+        print("interrupted", file=sys.stderr)
+
+    if runs:
+        worst = max(runs, key=lambda d: d["late_max_ms"])
+        print(f"{len(runs)} runs, {sum(d['events'] for d in runs)} events, "
+              f"{sum(d['wall_s'] for d in runs):.3f}s; worst p99 {max(d['late_p99_ms'] for d in runs)} ms, "
+              f"worst max {worst['late_max_ms']} ms ({Path(worst['macro']).name}), {failed} failed")
+    if args.metrics:
+        for h, t in totals.items(): h.reset(); h.merge(t)
+        METRICS.dump(args.metrics, "prom" if args.metrics.suffix == ".prom" else "json")
+    return 1 if failed or len(runs) < total else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,243 +1,125 @@
-import json, time, random, threading, ctypes
+import time
+T_IMPORT = time.perf_counter()   # for --startup-report
+import json, sys, threading
 from pathlib import Path
-from dataclasses import dataclass, asdict
-from typing import List, Literal, Tuple, Optional
+from typing import Optional
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from pynput import keyboard, mouse
-import ctypes.wintypes
-
-SW_RESTORE = 9
-record_hwnd: Optional[int] = None
-
-
-user32 = ctypes.windll.user32
-class POINT(ctypes.Structure):
-    _fields_ = [("x", ctypes.c_long), ("y", ctypes.c_long)]
-def get_cursor_pos() -> Tuple[int,int]:
-    pt = POINT(); user32.GetCursorPos(ctypes.byref(pt)); return (pt.x, pt.y)
-def set_cursor_pos(x:int,y:int): user32.SetCursorPos(int(x),int(y))
-
-@dataclass
-class MacroEvent:
-    kind: Literal["key","mouse"]
-    action: str
-    data: dict
-    delay_ms: int
-
-@dataclass
-@dataclass
-class Macro:
-    events: List[MacroEvent]
-    target_hwnd: Optional[int] = None  # window handle recorded in
-
-    def save(self, path: Path):
-        data = {"events": [asdict(e) for e in self.events], "target_hwnd": self.target_hwnd}
-        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
-
-    @staticmethod
-    def load(path: Path) -> "Macro":
-        raw = json.loads(path.read_text(encoding="utf-8"))
-        if isinstance(raw, dict):
-            events = [MacroEvent(**e) for e in raw["events"]]
-            return Macro(events, raw.get("target_hwnd"))
-        else:  # backward-compat for old files that were just a list
-            return Macro([MacroEvent(**e) for e in raw], None)
-
-
-kb = keyboard.Controller()
-ms = mouse.Controller()
+from tkinter import ttk, filedialog, messagebox, simpledialog
+from macro_timing import LATE_POLICIES
+from macro_config import ConfigStore
+from macro_backend import get_backend
+import macro_engine as engine
+from macro_model import Macro, MacroEvent, LOOP_BEGIN, LOOP_END
+from macro_table import VirtualEventTable, fmt_delay
+from macro_edit import EditHistory, Batch, MoveBlock, runs, delete_rows, duplicate_block, set_delays, scale_delays, replace_key, set_row
+from macro_engine import start_record, stop_record
+from macro_hooks import InputHub
+from macro_library import MacroLibrary
+from macro_loops import compress_edit
+from macro_optimize import OptimizeOptions, optimize_edit, summary_text
+from macro_metrics import METRICS
+from macro_human import DISTS, Humanizer
+from macro_sched import Scheduler, ClickJob, PlaybackJob, TriggerJob, STARTING, RUNNING, PAUSED, DONE, ERROR
+from macro_ui import UiChannel, RateMeter
+from macro_trigger import TRIGGER_MODES, Region, TriggerSet, get_source
 
 APP_DIR = Path.home() / "AppData" / "Roaming" / "MacroClicker"
-APP_DIR.mkdir(parents=True, exist_ok=True)
 CFG_PATH = APP_DIR / "settings.json"
 DEFAULTS = {
     "hk_rec_start": "<f9>",
     "hk_rec_stop":  "<f10>",
     "hk_play":      "<f8>",
     "hk_click_toggle": "<f6>",
+    "hk_jobs_pause": "<f7>",
     "click_mode": "cps",
     "cps": 10.0,
     "interval_ms": 100,
     "button": "left",
     "mode": "current",
     "fixed_xy": (0,0),
-    "jitter": 0.0
+    "jitter": 0.0,
+    "late_policy": "skip",
+    "burst_size": 1,
+    "burst_spacing_ms": 0.0,
+    "backend": "auto",
+    "record_moves": False,
+    "move_tolerance_px": 2.0,
+    "move_min_interval_ms": 8.0,
+    "move_playback_hz": 125.0,
+    "opt_max_gap_ms": 0.0,
+    "opt_quantize_ms": 0.0,
+    "opt_fast_min_ms": 0.0,
+    "metrics": True,
+    "human_seed": 0,
+    "interval_dist": "none",
+    "interval_cv": 0.1,
+    "drift_px": 0.0,
+    "playback_dist": "none",
+    "playback_delay_cv": 0.1,
+    "trigger_source": "auto",
+    "trigger_file": "",
+    "trigger_fps": 60.0,
+    "library_dir": ""
 }
-def load_cfg():
-    try:
-        if CFG_PATH.exists():
-            data = json.loads(CFG_PATH.read_text(encoding="utf-8"))
-            return {**DEFAULTS, **data}
-    except: pass
-    return DEFAULTS.copy()
-def save_cfg(d):
-    try: CFG_PATH.write_text(json.dumps(d, indent=2), encoding="utf-8")
-    except: pass
-
-settings = load_cfg()
-
-def key_to_str(k)->str:
-    try:
-        if isinstance(k, keyboard.KeyCode):
-            return k.char if k.char else str(k.vk)
-        return str(k).split(".")[-1]
-    except: return str(k)
-def button_to_str(b)->str: return str(b).split(".")[-1]
-def str_to_button(s:str): return getattr(mouse.Button, s)
-def extract_simple_key_names(hk: str)->List[str]:
-    names=[]; tmp=hk.lower().replace(" ","")
-    for part in tmp.split("+"):
-        p=part.strip("<>"); 
-        if p: names.append(p)
-    return names
-
-CONTROL_KEYS = set(sum([extract_simple_key_names(settings[k])
-                        for k in ("hk_rec_start","hk_rec_stop","hk_play","hk_click_toggle")], []))
-
-recording = False
-playing = False
-autoclicking = False
-_rec_prev_t: float = 0.0
-_rec_buf: List[MacroEvent] = []
-_rec_lock = threading.Lock()
-player_thread: Optional[threading.Thread] = None
-clicker_thread: Optional[threading.Thread] = None
-gh_listener: Optional[keyboard.GlobalHotKeys] = None
-gh_lock = threading.Lock()
-
-def start_record():
-    global recording, _rec_prev_t, _rec_buf, record_hwnd
-    if recording or playing or autoclicking:
-        return
-    record_hwnd = int(user32.GetForegroundWindow())
-    with _rec_lock:
-        _rec_buf = []
-    _rec_prev_t = time.time()
-    recording = True
-
-
-def stop_record() -> Macro:
-    global recording
-    recording = False
-    with _rec_lock:
-        return Macro(list(_rec_buf), target_hwnd=record_hwnd)
-
-
-def on_kb_event(key, pressed: bool):
-    if not recording or playing or autoclicking: return
-    name = key_to_str(key).lower()
-    if name in CONTROL_KEYS or name in ("ctrl","alt","shift","cmd","windows","alt_gr"):
-        return
-    now = time.time()
-    global _rec_prev_t
-    delay_ms = int((now - _rec_prev_t)*1000)
-    _rec_prev_t = now
-    ev = MacroEvent(kind="key", action="press" if pressed else "release",
-                    data={"key": name}, delay_ms=delay_ms)
-    with _rec_lock: _rec_buf.append(ev)
-
-def on_mouse_move(x, y): pass
-
-def on_mouse_click(x, y, button, pressed):
-    if not recording or playing or autoclicking: return
-    now = time.time(); global _rec_prev_t
-    delay_ms = int((now - _rec_prev_t)*1000); _rec_prev_t = now
-    with _rec_lock:
-        _rec_buf.append(MacroEvent("mouse","click",
-                                   {"x":int(x),"y":int(y),
-                                    "button": button_to_str(button),
-                                    "pressed": bool(pressed)}, delay_ms))
-
-def playback_macro(m: Macro, speed: float = 1.0, loop: int = 1):
-    global playing
-    if playing or not m.events:
-        return
-
-    # focus the recorded window if known
-    try:
-        if m.target_hwnd:
-            user32.ShowWindow(ctypes.wintypes.HWND(m.target_hwnd), SW_RESTORE)
-            user32.SetForegroundWindow(ctypes.wintypes.HWND(m.target_hwnd))
-            time.sleep(0.15)
-    except Exception:
-        pass
-
-    playing = True
-    try:
-        for _ in range(max(1, loop)):
-            for e in m.events:
-                if not playing:
-                    return
-                wait = max(0, (e.delay_ms / 1000.0) / max(0.01, speed))
-                if wait:
-                    time.sleep(wait)
-                if e.kind == "key":
-                    k = e.data["key"]
-                    key_obj = getattr(keyboard.Key, k, None)
-                    if key_obj is None:
-                        key_obj = keyboard.KeyCode.from_char(k[:1])
-                    (kb.press if e.action == "press" else kb.release)(key_obj)
-                else:
-                    if e.action == "move":
-                        ms.position = (e.data["x"], e.data["y"])
-                    elif e.action == "click":
-                        btn = getattr(mouse.Button, e.data["button"])
-                        (ms.press if e.data["pressed"] else ms.release)(btn)
-    finally:
-        playing = False
-
-
-def click_loop(get_cfg):
-    global autoclicking
-    while autoclicking:
-        cfg = get_cfg()
-        if cfg["click_mode"] == "ms":
-            delay = max(1, int(cfg["interval_ms"])) / 1000.0
-        else:
-            delay = 1.0 / max(0.1, float(cfg["cps"]))
-        btn = str_to_button(cfg["button"])
-        mode = cfg["mode"]; fx, fy = cfg["fixed_xy"]; jitter = float(cfg["jitter"])
-        if mode == "fixed":
-            tx, ty = fx, fy
-        else:
-            tx, ty = get_cursor_pos()
-        if jitter > 0:
-            tx += int(random.uniform(-jitter, jitter))
-            ty += int(random.uniform(-jitter, jitter))
-        if mode == "fixed":
-            set_cursor_pos(tx, ty)
-        ms.press(btn); ms.release(btn)
-        time.sleep(delay)
+TRIGGER_ACTIONS = ("click", "click while", "macro")
+HOTKEY_SETTINGS = ("hk_rec_start","hk_rec_stop","hk_play","hk_click_toggle","hk_jobs_pause")
+settings = ConfigStore(CFG_PATH, DEFAULTS)   # settings.json is read on first access
+
+# every click job and macro run shares this one dispatch thread
+scheduler = Scheduler()
+
+def apply_control_keys():
+    engine.set_control_keys([settings[k] for k in HOTKEY_SETTINGS] +
+                            [j.hotkey for j in list(scheduler.jobs.values()) if j.hotkey])
+
+def apply_move_settings():
+    engine.configure_moves(settings["record_moves"], settings["move_tolerance_px"],
+                           settings["move_min_interval_ms"], settings["move_playback_hz"])
+
+_initialized = False
+
+def init_app():
+    # everything that touches the disk or the engine's global state; kept out
+    # of import time so tools can import this module cheaply
+    global _initialized
+    if _initialized: return
+    _initialized = True
+    APP_DIR.mkdir(parents=True, exist_ok=True)
+    apply_control_keys()
+    apply_move_settings()
+    METRICS.enabled = bool(settings["metrics"])
 
 def rebuild_hotkeys(app):
-    global gh_listener
-    with gh_lock:
-        if gh_listener:
-            try: gh_listener.stop()
-            except: pass
-            gh_listener = None
-        def hk_rec_start():
-            start_record(); app.set_status("Recording…" if recording else "Busy")
-        def hk_rec_stop():
-            if recording:
-                m = stop_record(); app.load_macro_into_table(m); app.set_status(f"Recorded {len(m.events)} events.")
-        def hk_play():
-            if app.current_macro and not playing: app.play_macro()
-        def hk_click_toggle():
-            app.toggle_clicker()
-        mapping = {
-            settings["hk_rec_start"]: hk_rec_start,
-            settings["hk_rec_stop"]:  hk_rec_stop,
-            settings["hk_play"]:      hk_play,
-            settings["hk_click_toggle"]: hk_click_toggle
-        }
-        gh_listener = keyboard.GlobalHotKeys(mapping)
-        threading.Thread(target=gh_listener.run, daemon=True).start()
-        
+    # recompiles the hotkey table of the app's one keyboard hook, in place
+    def hk_rec_start():
+        app.start_record(); app.set_status("Recording…" if engine.recording else "Busy")
+    def hk_rec_stop():
+        if engine.recording:
+            m = stop_record(); app.ui.call(app.load_macro_into_table, m)
+            app.set_status(f"Recorded {len(m.events)} events.")
+    def hk_play():
+        if not scheduler.running("macro"): app.ui.call(app.play_macro)
+    def hk_click_toggle():
+        app.toggle_clicker()
+    def hk_jobs_pause():
+        if any(j.state == RUNNING for j in list(scheduler.jobs.values())): scheduler.pause_all()
+        else: scheduler.resume_all()
+    mapping = {
+        settings["hk_rec_start"]: hk_rec_start,
+        settings["hk_rec_stop"]:  hk_rec_stop,
+        settings["hk_play"]:      hk_play,
+        settings["hk_click_toggle"]: hk_click_toggle,
+        settings["hk_jobs_pause"]: hk_jobs_pause
+    }
+    for j in list(scheduler.jobs.values()):
+        if j.hotkey: mapping[j.hotkey] = lambda name=j.name: scheduler.toggle(name)
+    try: app.hub.set_hotkeys(mapping)
+    except ValueError as e: app.set_status(f"Hotkeys: {e}")
+
 
 class App(tk.Tk):
     def __init__(self):
+        init_app()
         super().__init__()
         self.title("Macro + Auto Clicker")
         ico = Path("Untitled-1.ico")
@@ -245,10 +127,17 @@ class App(tk.Tk):
             try: self.iconbitmap(ico.resolve())
             except: pass
         self.protocol("WM_DELETE_WINDOW", self.on_close)
+        # hotkey/worker threads never touch Tk directly; see set_status and ui.call
+        self.ui = UiChannel(self)
 
-        nb = ttk.Notebook(self); nb.pack(fill="both", expand=True, padx=8, pady=8)
+        self.nb = nb = ttk.Notebook(self); nb.pack(fill="both", expand=True, padx=8, pady=8)
         self.tab_macro = ttk.Frame(nb); nb.add(self.tab_macro, text="Macro")
         self.tab_click = ttk.Frame(nb); nb.add(self.tab_click, text="Auto Clicker")
+        self.tab_jobs = ttk.Frame(nb); nb.add(self.tab_jobs, text="Jobs")
+        self.tab_lib = ttk.Frame(nb); nb.add(self.tab_lib, text="Library")
+        self._tab_builders = {str(self.tab_click): self._build_click_tab, str(self.tab_jobs): self._build_jobs_tab,
+                              str(self.tab_lib): self._build_library_tab}
+        nb.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
         self.current_macro: Optional[Macro] = None
 
@@ -266,15 +155,47 @@ class App(tk.Tk):
         ttk.Entry(f_hk, textvariable=self.var_hk_play,  width=18).grid(row=r, column=1, padx=6); r+=1
         ttk.Button(f_hk, text="Apply Hotkeys", command=self.apply_macro_hotkeys).grid(row=r, column=0, columnspan=2, pady=4)
 
+        f_mv = ttk.LabelFrame(self.tab_macro, text="Mouse Paths")
+        f_mv.pack(fill="x", padx=6, pady=(0,6))
+        self.var_rec_moves = tk.BooleanVar(value=bool(settings["record_moves"]))
+        self.var_move_tol = tk.DoubleVar(value=float(settings["move_tolerance_px"]))
+        self.var_move_hz = tk.DoubleVar(value=float(settings["move_playback_hz"]))
+        ttk.Checkbutton(f_mv, text="Record mouse moves", variable=self.var_rec_moves).grid(row=0, column=0, sticky="w")
+        ttk.Label(f_mv, text="Tolerance (px):").grid(row=0, column=1, sticky="e", padx=(12,0))
+        ttk.Entry(f_mv, textvariable=self.var_move_tol, width=6).grid(row=0, column=2, sticky="w", padx=4)
+        ttk.Label(f_mv, text="Playback rate (Hz):").grid(row=0, column=3, sticky="e", padx=(12,0))
+        ttk.Entry(f_mv, textvariable=self.var_move_hz, width=6).grid(row=0, column=4, sticky="w", padx=4)
+        for v in (self.var_rec_moves, self.var_move_tol, self.var_move_hz):
+            v.trace_add("write", self.sync_move_cfg)
+
+        f_opt = ttk.LabelFrame(self.tab_macro, text="Optimize")
+        f_opt.pack(fill="x", padx=6, pady=(0,6))
+        self.var_opt_gap = tk.DoubleVar(value=float(settings["opt_max_gap_ms"]))
+        self.var_opt_q = tk.DoubleVar(value=float(settings["opt_quantize_ms"]))
+        self.var_opt_fast = tk.DoubleVar(value=float(settings["opt_fast_min_ms"]))
+        c = 0
+        for text, var in (("Max gap (ms, 0 = off):", self.var_opt_gap), ("Quantize (ms):", self.var_opt_q),
+                          ("Fast, min delay (ms):", self.var_opt_fast)):
+            ttk.Label(f_opt, text=text).grid(row=0, column=c, sticky="e", padx=(12 if c else 0,0))
+            ttk.Entry(f_opt, textvariable=var, width=6).grid(row=0, column=c+1, sticky="w", padx=4); c += 2
+        ttk.Button(f_opt, text="Optimize", command=self.optimize_macro).grid(row=0, column=c, padx=(12,0))
+        ttk.Button(f_opt, text="Compress Loops", command=self.compress_loops).grid(row=0, column=c+1, padx=(6,0))
+
+        f_hp = ttk.LabelFrame(self.tab_macro, text="Humanize Playback")
+        f_hp.pack(fill="x", padx=6, pady=(0,6))
+        self.var_play_dist = tk.StringVar(value=settings["playback_dist"])
+        self.var_play_cv = tk.DoubleVar(value=float(settings["playback_delay_cv"]))
+        ttk.Label(f_hp, text="Delays:").grid(row=0, column=0, sticky="w")
+        ttk.OptionMenu(f_hp, self.var_play_dist, self.var_play_dist.get(), *DISTS).grid(row=0, column=1, sticky="w")
+        ttk.Label(f_hp, text="Variation (0-1):").grid(row=0, column=2, sticky="e", padx=(12,0))
+        ttk.Entry(f_hp, textvariable=self.var_play_cv, width=6).grid(row=0, column=3, sticky="w", padx=4)
+        for v in (self.var_play_dist, self.var_play_cv):
+            v.trace_add("write", self.sync_playback_cfg)
+
         f_tbl = ttk.LabelFrame(self.tab_macro, text="Recorded Events")
         f_tbl.pack(fill="both", expand=True, padx=6, pady=6)
-        cols = ("#", "type", "action", "detail", "delay_ms")
-        self.tree = ttk.Treeview(f_tbl, columns=cols, show="headings", height=12)
-        for c,w in zip(cols,(50,70,80,360,90)):
-            self.tree.heading(c, text=c); self.tree.column(c, width=w, anchor="w")
-        self.tree.pack(fill="both", expand=True, side="left")
-        sb = ttk.Scrollbar(f_tbl, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=sb.set); sb.pack(side="right", fill="y")
+        self.table = VirtualEventTable(f_tbl); self.table.pack(fill="both", expand=True)
+        self.tree = self.table.tree
         self.tree.bind("<Double-1>", self._edit_delay_cell)
 
         hint = ttk.Label(self.tab_macro, text="Tip: double-click the delay_ms cell to edit.", foreground="#6a6a6a")
@@ -303,15 +224,15 @@ class App(tk.Tk):
         self.var_pressed = tk.BooleanVar(value=True)
         ttk.Checkbutton(f_ed, variable=self.var_pressed).grid(row=2, column=1, sticky="w", padx=(4,12))
         ttk.Label(f_ed, text="Delay before (ms):").grid(row=2, column=2, sticky="e")
-        self.var_delay = tk.IntVar(value=0)
+        self.var_delay = tk.DoubleVar(value=0)
         ttk.Entry(f_ed, textvariable=self.var_delay, width=10).grid(row=2, column=3, sticky="w")
         f_ed_btn = ttk.Frame(self.tab_macro); f_ed_btn.pack(fill="x", padx=6, pady=(0,6))
         ttk.Button(f_ed_btn, text="Load Selected", command=self.load_selected).pack(side="left", padx=4)
         ttk.Button(f_ed_btn, text="Apply to Selected", command=self.apply_to_selected).pack(side="left", padx=4)
-        self.tree.bind("<<TreeviewSelect>>", lambda e: self._update_selected_label())
+        self.table.bind("<<TableSelect>>", lambda e: self._update_selected_label())
 
         row_btn = ttk.Frame(self.tab_macro); row_btn.pack(fill="x", padx=6, pady=6)
-        ttk.Button(row_btn, text="Start Record", command=start_record).pack(side="left", padx=4)
+        ttk.Button(row_btn, text="Start Record", command=self.start_record).pack(side="left", padx=4)
         ttk.Button(row_btn, text="Stop Record",  command=self.stop_record_btn).pack(side="left", padx=4)
         ttk.Button(row_btn, text="Play", command=self.play_macro).pack(side="left", padx=4)
         ttk.Button(row_btn, text="Delete Selected", command=self.delete_selected).pack(side="left", padx=4)
@@ -320,6 +241,46 @@ class App(tk.Tk):
         ttk.Button(row_btn, text="Save…", command=self.save_macro).pack(side="left", padx=4)
         ttk.Button(row_btn, text="Load…", command=self.load_macro).pack(side="left", padx=4)
 
+        row_bulk = ttk.Frame(self.tab_macro); row_bulk.pack(fill="x", padx=6, pady=(0,6))
+        ttk.Label(row_bulk, text="Rows:").pack(side="left")
+        self.var_rows = tk.StringVar(value="")
+        ttk.Entry(row_bulk, textvariable=self.var_rows, width=12).pack(side="left", padx=(4,0))
+        ttk.Button(row_bulk, text="Select", command=self.select_rows).pack(side="left", padx=4)
+        ttk.Button(row_bulk, text="Duplicate", command=self.duplicate_selected).pack(side="left", padx=4)
+        ttk.Button(row_bulk, text="Set Delay…", command=self.set_selected_delay).pack(side="left", padx=4)
+        ttk.Button(row_bulk, text="Scale Delay…", command=self.scale_selected_delay).pack(side="left", padx=4)
+        ttk.Button(row_bulk, text="Replace Key…", command=self.replace_key_all).pack(side="left", padx=4)
+        ttk.Button(row_bulk, text="Undo", command=self.undo).pack(side="left", padx=4)
+        ttk.Button(row_bulk, text="Redo", command=self.redo).pack(side="left", padx=4)
+        self.history = EditHistory()
+        self.bind("<Control-z>", lambda e: self.undo()); self.bind("<Control-y>", lambda e: self.redo())
+        self.tree.bind("<Delete>", lambda e: self.delete_selected())
+
+        self._job_states: dict = {}
+
+        self.status = tk.StringVar(value="Ready.")
+        ttk.Label(self, textvariable=self.status).pack(anchor="w", padx=8, pady=(0,2))
+        self.live = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.live).pack(anchor="w", padx=8, pady=(0,2))
+        self._cps = RateMeter()
+        self._capture = None   # screen source for trigger jobs, opened by the first one
+        self.ui.bind("status", self.status.set)
+        self.ui.on_frame(self._live_counters)
+        self.ui.start()
+        self.metrics_text = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.metrics_text, foreground="#6a6a6a").pack(anchor="w", padx=8, pady=(0,8))
+
+        # keyboard hook for hotkeys + recording; the mouse hook waits for a recording
+        self.hub = InputHub(engine.current_backend())
+        rebuild_hotkeys(self); self.hub.start_keyboard()
+        self.after(250, self._poll_jobs)
+
+    # ---- tabs other than Macro are built the first time they are shown ----
+    def _on_tab_changed(self, _e=None):
+        build = self._tab_builders.pop(self.nb.select(), None)
+        if build: build()
+
+    def _build_click_tab(self):
         f_rate = ttk.LabelFrame(self.tab_click, text="Click Rate")
         f_rate.pack(fill="x", padx=6, pady=6)
         self.var_mode_rate = tk.StringVar(value=settings["click_mode"])
@@ -329,6 +290,13 @@ class App(tk.Tk):
         ttk.Entry(f_rate, textvariable=self.var_cps, width=10).grid(row=0, column=1, padx=6)
         ttk.Radiobutton(f_rate, text="Interval (ms)", variable=self.var_mode_rate, value="ms").grid(row=1, column=0, sticky="w")
         ttk.Entry(f_rate, textvariable=self.var_ms, width=10).grid(row=1, column=1, padx=6)
+        # burst: several clicks per tick, injected as one batch (for very high rates)
+        self.var_burst = tk.IntVar(value=int(settings["burst_size"]))
+        self.var_burst_ms = tk.DoubleVar(value=float(settings["burst_spacing_ms"]))
+        ttk.Label(f_rate, text="Burst size:").grid(row=2, column=0, sticky="w")
+        ttk.Entry(f_rate, textvariable=self.var_burst, width=10).grid(row=2, column=1, padx=6)
+        ttk.Label(f_rate, text="Burst spacing (ms, 0 = from rate):").grid(row=3, column=0, sticky="w")
+        ttk.Entry(f_rate, textvariable=self.var_burst_ms, width=10).grid(row=3, column=1, padx=6)
 
         f_click = ttk.LabelFrame(self.tab_click, text="Click Settings")
         f_click.pack(fill="x", padx=6, pady=6)
@@ -344,6 +312,29 @@ class App(tk.Tk):
         ttk.Label(f_click, text="Fixed X:").grid(row=2, column=0, sticky="w"); ttk.Entry(f_click, textvariable=self.var_fx, width=10).grid(row=2, column=1)
         ttk.Label(f_click, text="Fixed Y:").grid(row=3, column=0, sticky="w"); ttk.Entry(f_click, textvariable=self.var_fy, width=10).grid(row=3, column=1)
         ttk.Label(f_click, text="Jitter (px):").grid(row=4, column=0, sticky="w"); ttk.Entry(f_click, textvariable=self.var_jitter, width=10).grid(row=4, column=1)
+        self.var_late = tk.StringVar(value=settings["late_policy"])
+        ttk.Label(f_click, text="Missed ticks:").grid(row=5, column=0, sticky="w")
+        ttk.OptionMenu(f_click, self.var_late, self.var_late.get(), *LATE_POLICIES).grid(row=5, column=1, sticky="w")
+
+        # humanize: noisy intervals and a bounded cursor drift, reproducible by seed
+        f_hum = ttk.LabelFrame(self.tab_click, text="Humanize")
+        f_hum.pack(fill="x", padx=6, pady=6)
+        self.var_int_dist = tk.StringVar(value=settings["interval_dist"])
+        self.var_int_cv = tk.DoubleVar(value=float(settings["interval_cv"]))
+        self.var_drift = tk.DoubleVar(value=float(settings["drift_px"]))
+        self.var_seed = tk.IntVar(value=int(settings["human_seed"]))
+        ttk.Label(f_hum, text="Intervals:").grid(row=0, column=0, sticky="w")
+        ttk.OptionMenu(f_hum, self.var_int_dist, self.var_int_dist.get(), *DISTS).grid(row=0, column=1, sticky="w")
+        ttk.Label(f_hum, text="Variation (0-1):").grid(row=0, column=2, sticky="e", padx=(12,0))
+        ttk.Entry(f_hum, textvariable=self.var_int_cv, width=6).grid(row=0, column=3, sticky="w", padx=4)
+        ttk.Label(f_hum, text="Drift (px, fixed mode):").grid(row=1, column=0, sticky="w")
+        ttk.Entry(f_hum, textvariable=self.var_drift, width=6).grid(row=1, column=1, sticky="w")
+        ttk.Label(f_hum, text="Seed (0 = random):").grid(row=1, column=2, sticky="e", padx=(12,0))
+        ttk.Entry(f_hum, textvariable=self.var_seed, width=10).grid(row=1, column=3, sticky="w", padx=4)
+        for v in (self.var_mode_rate, self.var_cps, self.var_ms, self.var_button, self.var_where,
+                  self.var_fx, self.var_fy, self.var_jitter, self.var_late, self.var_burst, self.var_burst_ms,
+                  self.var_int_dist, self.var_int_cv, self.var_drift, self.var_seed):
+            v.trace_add("write", self.sync_click_cfg)
 
         f_hkc = ttk.LabelFrame(self.tab_click, text="Global Toggle")
         f_hkc.pack(fill="x", padx=6, pady=6)
@@ -355,223 +346,553 @@ class App(tk.Tk):
         ttk.Button(rowc, text="Start Clicker", command=lambda: self.toggle_clicker(True)).pack(side="left", padx=4)
         ttk.Button(rowc, text="Stop Clicker", command=lambda: self.toggle_clicker(False)).pack(side="left", padx=4)
 
-        self.status = tk.StringVar(value="Ready.")
-        ttk.Label(self, textvariable=self.status).pack(anchor="w", padx=8, pady=(0,8))
-
-        rebuild_hotkeys(self)
-        self.k_listener = keyboard.Listener(on_press=lambda k: on_kb_event(k, True),
-                                            on_release=lambda k: on_kb_event(k, False))
-        self.k_listener.start()
-        self.m_listener = mouse.Listener(on_move=on_mouse_move, on_click=on_mouse_click)
-        self.m_listener.start()
-
-    def set_status(self, s:str): self.status.set(s)
-
-    def _macro_to_rows(self, m: Macro):
-        rows=[]
-        for i,e in enumerate(m.events, start=1):
-            if e.kind=="key":
-                detail=f"key={e.data.get('key','')}"
-            else:
-                if e.action=="click":
-                    detail=f"{e.data.get('button','')} @({e.data.get('x','')},{e.data.get('y','')}) pressed={e.data.get('pressed')}"
-                else:
-                    detail=f"move @({e.data.get('x','')},{e.data.get('y','')})"
-            rows.append((str(i), e.kind, e.action, detail, str(e.delay_ms)))
-        return rows
+    def _build_jobs_tab(self):
+        # several click jobs and macros on the shared scheduler
+        f_jobs = ttk.LabelFrame(self.tab_jobs, text="Jobs")
+        f_jobs.pack(fill="both", expand=True, padx=6, pady=6)
+        self.jobs_tree = ttk.Treeview(f_jobs, columns=("name","kind","state","hotkey","detail","stats"),
+                                      show="headings", height=10, selectmode="browse")
+        for c, w in (("name",110),("kind",60),("state",70),("hotkey",80),("detail",220),("stats",300)):
+            self.jobs_tree.heading(c, text=c); self.jobs_tree.column(c, width=w, anchor="w")
+        self.jobs_tree.pack(fill="both", expand=True)
+        f_new = ttk.Frame(self.tab_jobs); f_new.pack(fill="x", padx=6, pady=(0,6))
+        self.var_job_name = tk.StringVar(value="")
+        self.var_job_hotkey = tk.StringVar(value="")
+        self.var_job_speed = tk.DoubleVar(value=1.0)
+        self.var_job_loops = tk.IntVar(value=1)
+        ttk.Label(f_new, text="Name:").grid(row=0, column=0, sticky="w")
+        ttk.Entry(f_new, textvariable=self.var_job_name, width=14).grid(row=0, column=1, padx=4)
+        ttk.Label(f_new, text="Hotkey:").grid(row=0, column=2, sticky="w")
+        ttk.Entry(f_new, textvariable=self.var_job_hotkey, width=14).grid(row=0, column=3, padx=4)
+        ttk.Label(f_new, text="Speed:").grid(row=0, column=4, sticky="w")
+        ttk.Entry(f_new, textvariable=self.var_job_speed, width=6).grid(row=0, column=5, padx=4)
+        ttk.Label(f_new, text="Loops:").grid(row=0, column=6, sticky="w")
+        ttk.Entry(f_new, textvariable=self.var_job_loops, width=6).grid(row=0, column=7, padx=4)
+        ttk.Button(f_new, text="Add Click Job (current settings)", command=self.add_click_job).grid(row=1, column=0, columnspan=4, sticky="w", pady=4)
+        ttk.Button(f_new, text="Add Macro Job (current macro)", command=self.add_macro_job).grid(row=1, column=4, columnspan=4, sticky="w", pady=4)
+        row_j = ttk.Frame(self.tab_jobs); row_j.pack(fill="x", padx=6, pady=(0,6))
+        for text, fn in (("Start", scheduler.start), ("Pause", scheduler.pause),
+                         ("Stop", scheduler.stop), ("Remove", self.remove_job)):
+            ttk.Button(row_j, text=text, command=lambda fn=fn: self._job_action(fn)).pack(side="left", padx=4)
+        ttk.Label(row_j, text="Pause/resume all:").pack(side="left", padx=(16,4))
+        self.var_hk_jobs = tk.StringVar(value=settings["hk_jobs_pause"])
+        ttk.Entry(row_j, textvariable=self.var_hk_jobs, width=12).pack(side="left")
+        ttk.Button(row_j, text="Apply", command=self.apply_jobs_hotkey).pack(side="left", padx=4)
+
+        f_trig = ttk.LabelFrame(self.tab_jobs, text="Screen Trigger")
+        f_trig.pack(fill="x", padx=6, pady=(0,6))
+        self.var_trig_box = tk.StringVar(value="0,0,32,32")
+        self.var_trig_mode = tk.StringVar(value="change")
+        self.var_trig_tol = tk.DoubleVar(value=0.0)
+        self.var_trig_action = tk.StringVar(value="click")
+        self.var_trig_fps = tk.DoubleVar(value=settings["trigger_fps"])
+        ttk.Label(f_trig, text="Region x,y,w,h:").grid(row=0, column=0, sticky="w")
+        ttk.Entry(f_trig, textvariable=self.var_trig_box, width=16).grid(row=0, column=1, padx=4)
+        ttk.Label(f_trig, text="When:").grid(row=0, column=2, sticky="w")
+        ttk.Combobox(f_trig, textvariable=self.var_trig_mode, values=TRIGGER_MODES, width=8, state="readonly").grid(row=0, column=3, padx=4)
+        ttk.Label(f_trig, text="Tolerance:").grid(row=0, column=4, sticky="w")
+        ttk.Entry(f_trig, textvariable=self.var_trig_tol, width=5).grid(row=0, column=5, padx=4)
+        ttk.Label(f_trig, text="FPS:").grid(row=0, column=6, sticky="w")
+        ttk.Entry(f_trig, textvariable=self.var_trig_fps, width=5).grid(row=0, column=7, padx=4)
+        ttk.Label(f_trig, text="Then:").grid(row=1, column=0, sticky="w")
+        ttk.Combobox(f_trig, textvariable=self.var_trig_action, values=TRIGGER_ACTIONS, width=10, state="readonly").grid(row=1, column=1, sticky="w", padx=4)
+        ttk.Button(f_trig, text="Add Trigger Job", command=self.add_trigger_job).grid(row=1, column=2, columnspan=3, sticky="w", pady=4)
+        ttk.Label(f_trig, text="'match' compares against the region as it looks now; 'click while' clicks at the clicker rate while it is active.").grid(row=1, column=5, columnspan=4, sticky="w")
+
+        f_met = ttk.LabelFrame(self.tab_jobs, text="Latency Metrics")
+        f_met.pack(fill="x", padx=6, pady=(0,6))
+        self.var_metrics_on = tk.BooleanVar(value=bool(settings["metrics"]))
+        ttk.Checkbutton(f_met, text="Record", variable=self.var_metrics_on, command=self.sync_metrics_cfg).pack(side="left", padx=4)
+        ttk.Button(f_met, text="Dump JSON", command=lambda: self.dump_metrics("json")).pack(side="left", padx=4)
+        ttk.Button(f_met, text="Dump Prometheus", command=lambda: self.dump_metrics("prom")).pack(side="left", padx=4)
+        ttk.Button(f_met, text="Reset", command=METRICS.reset).pack(side="left", padx=4)
+        self._refresh_jobs()
+
+    def _build_library_tab(self):
+        # macros in a folder, listed and filtered from the library index
+        f_dir = ttk.Frame(self.tab_lib); f_dir.pack(fill="x", padx=6, pady=6)
+        self.var_lib_dir = tk.StringVar(value=settings["library_dir"] or str(APP_DIR))
+        ttk.Label(f_dir, text="Folder:").pack(side="left")
+        ttk.Entry(f_dir, textvariable=self.var_lib_dir, width=50).pack(side="left", padx=4, fill="x", expand=True)
+        ttk.Button(f_dir, text="Browse", command=self.browse_library).pack(side="left", padx=4)
+        ttk.Button(f_dir, text="Rescan", command=self.rescan_library).pack(side="left", padx=4)
+        f_find = ttk.Frame(self.tab_lib); f_find.pack(fill="x", padx=6)
+        self.var_lib_text, self.var_lib_keys, self.var_lib_max = tk.StringVar(), tk.StringVar(), tk.StringVar()
+        for label, var, w in (("Name:", self.var_lib_text, 16), ("Uses keys:", self.var_lib_keys, 16),
+                              ("Max seconds:", self.var_lib_max, 6)):
+            ttk.Label(f_find, text=label).pack(side="left")
+            ttk.Entry(f_find, textvariable=var, width=w).pack(side="left", padx=(4,12))
+            var.trace_add("write", lambda *_: self._fill_library())
+        self.var_lib_bad = tk.BooleanVar(value=False)
+        ttk.Checkbutton(f_find, text="Broken only", variable=self.var_lib_bad, command=self._fill_library).pack(side="left")
+        self.lib_tree = ttk.Treeview(self.tab_lib, columns=("path","events","duration","keys"), show="headings", height=14)
+        for c, w in (("path",260),("events",70),("duration",80),("keys",360)):
+            self.lib_tree.heading(c, text=c); self.lib_tree.column(c, width=w, anchor="w")
+        self.lib_tree.pack(fill="both", expand=True, padx=6, pady=6)
+        self.lib_tree.bind("<Double-1>", lambda _e: self.load_from_library())
+        self.library: Optional[MacroLibrary] = None
+        self.rescan_library()
+
+    def browse_library(self):
+        d = filedialog.askdirectory(initialdir=self.var_lib_dir.get() or str(APP_DIR))
+        if d: self.var_lib_dir.set(d); self.rescan_library()
+
+    def rescan_library(self):
+        root = Path(self.var_lib_dir.get().strip() or APP_DIR)
+        settings.update(library_dir=str(root))
+        self.set_status(f"Scanning {root}…")
+        def work():
+            # stat + parse off the Tk thread; unchanged files come from the index
+            lib = MacroLibrary(root)
+            try: added, updated, removed = lib.rescan()
+            except OSError as e: self.set_status(f"Library: {e}"); return
+            self.ui.call(self._library_ready, lib, added + updated)
+        threading.Thread(target=work, name="macro-library", daemon=True).start()
+
+    def _library_ready(self, lib, parsed: int):
+        self.library = lib; self._fill_library()
+        self.set_status(f"Library: {len(lib.entries)} macros ({parsed} parsed).")
+
+    def _fill_library(self):
+        if self.library is None: return
+        try: max_ms = float(self.var_lib_max.get()) * 1000 if self.var_lib_max.get().strip() else None
+        except ValueError: max_ms = None
+        rows = self.library.search(self.var_lib_text.get().strip(), self.var_lib_keys.get().replace(",", " ").split(),
+                                   max_ms=max_ms, errors=True if self.var_lib_bad.get() else None)
+        t = self.lib_tree; t.delete(*t.get_children())
+        for e in rows:
+            detail = f"ERROR {e.error}" if e.error else ", ".join(e.keys)
+            t.insert("", "end", iid=e.path, values=(e.path, e.events, f"{e.duration_ms / 1000:.2f}s", detail))
+
+    def load_from_library(self):
+        sel = self.lib_tree.selection()
+        if not sel or self.library is None: return
+        p = self.library.root / sel[0]
+        try: self.load_macro_into_table(Macro.load(p)); self.set_status(f"Loaded: {p}")
+        except Exception as e: messagebox.showerror("Load Macro", f"Failed: {e}")
+
+    def set_status(self, s:str):
+        # safe from any thread: the newest status is shown on the next frame
+        self.ui.post("status", s)
+
+    def _live_counters(self):
+        # pulled once per frame from the jobs, so the clicker and player
+        # threads do no UI work at all
+        parts = []
+        c = scheduler.jobs.get("clicker")
+        if c is not None and c.stats.ticks:
+            rate = self._cps.update(c.stats.units) if c.state == RUNNING else 0.0
+            parts.append(f"Clicks: {c.stats.units}   CPS: {rate:.1f}")
+        p = scheduler.jobs.get("macro")
+        if p is not None and p.state == STARTING:
+            parts.append("Playback: preparing…")
+        elif p is not None and p.state in (RUNNING, PAUSED):
+            i, n, j, k, eta = p.progress(time.perf_counter_ns())
+            parts.append(f"Playback: event {i}/{n}, loop {j}/{k}, ETA {eta:.1f} s")
+        text = "   |   ".join(parts)
+        if text != self.live.get(): self.live.set(text)
 
     def load_macro_into_table(self, m: Macro):
+        if not isinstance(m, Macro): m = m.to_macro()  # mapped .mcrb files are read-only
         self.current_macro = m
-        for i in self.tree.get_children(): self.tree.delete(i)
-        for row in self._macro_to_rows(m): self.tree.insert("", "end", values=row)
-
-    def _table_to_macro(self) -> Macro:
-        evs=[]
-        for item in self.tree.get_children():
-            _, kind, action, detail, dly = self.tree.item(item, "values")
-            delay_ms = int(float(dly)) if dly!="" else 0
-            if kind=="key":
-                key = detail.split("key=",1)[1] if "key=" in detail else detail
-                evs.append(MacroEvent("key", action, {"key": key}, delay_ms))
-            else:
-                btn="left"; x=0; y=0; pressed=True
-                if "@(" in detail:
-                    try:
-                        pre, rest = detail.split("@(",1)
-                        if "pressed=" in rest:
-                            coord, pressed_part = rest.split(") pressed=",1)
-                            pressed = (pressed_part.strip().lower()=="true")
-                        else:
-                            coord = rest.split(")")[0]
-                        x,y = map(int, coord.split(","))
-                        if any(b in pre for b in ("left","right","middle")):
-                            btn = pre.strip().split()[0]
-                    except: pass
-                evs.append(MacroEvent("mouse", action, {"button":btn,"x":x,"y":y,"pressed":pressed}, delay_ms))
-        return Macro(evs)
+        self.history.clear()
+        self.table.set_macro(m)
+
+    def _selected_index(self) -> Optional[int]:
+        sel = self.table.selected
+        return sel[0] if sel else None
+
+    def _do(self, edit, select=None):
+        if edit is None or self.current_macro is None: return
+        self.history.do(self.current_macro, edit)
+        if select is not None: self.table.selected = [i for i in select if i < len(self.current_macro)]
+        self.table.refresh(); self._update_selected_label()
+        self.set_status(f"{edit.label}: {len(self.current_macro)} events")
+
+    def undo(self):
+        if self.current_macro is None: return
+        e = self.history.undo(self.current_macro)
+        if e: self.table.refresh(); self.set_status(f"Undid {e.label}.")
+
+    def redo(self):
+        if self.current_macro is None: return
+        e = self.history.redo(self.current_macro)
+        if e: self.table.refresh(); self.set_status(f"Redid {e.label}.")
+
+    def select_rows(self):
+        # "5", "10-200" or "1-3,8" (1-based, inclusive)
+        idx = []
+        try:
+            for part in self.var_rows.get().replace(" ","").split(","):
+                if not part: continue
+                a, _, b = part.partition("-")
+                idx.extend(range(int(a)-1, int(b or a)))
+        except ValueError:
+            self.set_status("Rows: use e.g. 10-200 or 1-3,8"); return
+        self.table.select(idx)
+        if self.table.selected: self.table.see(self.table.selected[0])
 
     def delete_selected(self):
-        sel=self.tree.selection()
+        sel = self.table.selected
         if not sel: return
-        self.tree.delete(sel[0])
-        for i,it in enumerate(self.tree.get_children(), start=1):
-            vals=list(self.tree.item(it,"values")); vals[0]=str(i); self.tree.item(it, values=vals)
+        self._do(delete_rows(sel), select=[sel[0]])
 
     def move_selected(self, delta:int):
-        sel=self.tree.selection()
+        blocks = runs(self.table.selected)
+        if len(blocks) != 1:
+            if blocks: self.set_status("Move needs one contiguous block of rows.")
+            return
+        (start, stop), = blocks
+        dest = max(0, min(start + delta, len(self.current_macro) - (stop - start)))
+        if dest == start: return
+        self._do(MoveBlock(start, stop, dest), select=range(dest, dest + stop - start))
+        self.table.see(dest if delta < 0 else dest + stop - start - 1)
+
+    def duplicate_selected(self):
+        blocks = runs(self.table.selected)
+        if not blocks: return
+        # back to front, so every block's indices are still the original ones
+        self._do(Batch([duplicate_block(self.current_macro, s, e) for s, e in reversed(blocks)], "duplicate"))
+
+    def set_selected_delay(self):
+        sel = self.table.selected
+        if not sel: return
+        v = simpledialog.askfloat("Set Delay", f"delay_ms for {len(sel)} selected rows:", minvalue=0, parent=self)
+        if v is not None: self._do(set_delays(self.current_macro, sel, v))
+
+    def scale_selected_delay(self):
+        sel = self.table.selected
         if not sel: return
-        it=sel[0]; idx=self.tree.index(it)
-        new=max(0, min(idx+delta, len(self.tree.get_children())-1))
-        if new==idx: return
-        vals=self.tree.item(it,"values"); self.tree.delete(it)
-        new_it = self.tree.insert("", new, values=vals)
-        for i,it2 in enumerate(self.tree.get_children(), start=1):
-            vals2=list(self.tree.item(it2,"values")); vals2[0]=str(i); self.tree.item(it2, values=vals2)
-        self.tree.selection_set(new_it)
+        f = simpledialog.askfloat("Scale Delay", f"Multiply delay_ms of {len(sel)} selected rows by:", minvalue=0, parent=self)
+        if f is not None: self._do(scale_delays(self.current_macro, sel, f))
+
+    def replace_key_all(self):
+        if self.current_macro is None: return
+        old = simpledialog.askstring("Replace Key", "Key to replace:", parent=self)
+        if not old: return
+        new = simpledialog.askstring("Replace Key", f"Replace '{old}' with:", parent=self)
+        if not new: return
+        e = replace_key(self.current_macro, old.strip().lower(), new.strip().lower())
+        if e is None: self.set_status(f"No '{old}' key events."); return
+        self._do(e); self.set_status(f"Replaced {len(e.idx)} '{old}' events.")
+
+    def optimize_macro(self):
+        # coalesce / orphan / idle passes always run; the entries add the optional ones
+        if self.current_macro is None: return
+        try:
+            gap, q, fast = (max(0.0, float(v.get())) for v in (self.var_opt_gap, self.var_opt_q, self.var_opt_fast))
+        except (tk.TclError, ValueError):
+            self.set_status("Optimize: gap/quantize/min delay must be numbers."); return
+        settings.update(opt_max_gap_ms=gap, opt_quantize_ms=q, opt_fast_min_ms=fast)
+        n = len(self.current_macro)
+        e, reports = optimize_edit(self.current_macro, OptimizeOptions(max_gap_ms=gap, quantize_ms=q, fast_min_ms=fast))
+        if e is None: self.set_status("Optimize: nothing to optimize."); return
+        self._do(e, select=[])
+        self.set_status(f"Optimized {n} -> {len(self.current_macro)} events: {summary_text(reports)}")
+
+    def compress_loops(self):
+        # repeated runs of events -> repeat blocks (undoable)
+        if self.current_macro is None: return
+        n = len(self.current_macro)
+        e, blocks = compress_edit(self.current_macro)
+        if e is None: self.set_status("Compress: no repeated sequences found."); return
+        self._do(e, select=[])
+        k = len(self.current_macro)
+        self.set_status(f"Compressed {n} -> {k} events in {len(blocks)} repeat blocks ({n / max(1, k):.1f}x).")
+
+    def start_record(self):
+        self.hub.start_mouse()
+        start_record()
 
     def stop_record_btn(self):
-        if recording:
+        if engine.recording:
             m = stop_record()
             self.load_macro_into_table(m)
             self.set_status(f"Recorded {len(m.events)} events.")
 
     def play_macro(self):
-        global player_thread
-        m = self._table_to_macro()
-        self.current_macro = m
-        if player_thread and player_thread.is_alive():
+        if self.current_macro is None: return
+        if scheduler.running("macro"):
             self.set_status("Already playing."); return
-        self.set_status("Playing…")
-        def run():
-            try: playback_macro(m, speed=1.0, loop=1)
-            finally: self.set_status("Playback finished.")
-        player_thread = threading.Thread(target=run, daemon=True); player_thread.start()
+        # a copy, so edits made while playing apply to the next run
+        scheduler.add(PlaybackJob("macro", self.current_macro.copy(), human=Humanizer.for_playback(settings.snapshot())))
+        scheduler.start("macro"); self.set_status("Playing…")
 
     def save_macro(self):
-        m = self._table_to_macro()
+        m = self.current_macro
+        if m is None: return
         p = filedialog.asksaveasfilename(defaultextension=".json",
-                                         filetypes=[("Macro JSON","*.json")],
+                                         filetypes=[("Macro JSON","*.json"),("Binary macro","*.mcrb")],
                                          initialdir=str(APP_DIR), initialfile="macro.json")
         if p: m.save(Path(p)); self.set_status(f"Saved: {p}")
 
     def load_macro(self):
-        p = filedialog.askopenfilename(filetypes=[("Macro JSON","*.json")], initialdir=str(APP_DIR))
+        p = filedialog.askopenfilename(filetypes=[("Macros","*.json *.mcrb"),("Macro JSON","*.json"),("Binary macro","*.mcrb")],
+                                       initialdir=str(APP_DIR))
         if p:
             try: self.load_macro_into_table(Macro.load(Path(p))); self.set_status(f"Loaded: {p}")
             except Exception as e: messagebox.showerror("Load Macro", f"Failed: {e}")
 
     def apply_macro_hotkeys(self):
-        settings["hk_rec_start"]=self.var_hk_start.get().strip() or DEFAULTS["hk_rec_start"]
-        settings["hk_rec_stop"] =self.var_hk_stop.get().strip()  or DEFAULTS["hk_rec_stop"]
-        settings["hk_play"]     =self.var_hk_play.get().strip()  or DEFAULTS["hk_play"]
-        save_cfg(settings)
-        CONTROL_KEYS.clear()
-        CONTROL_KEYS.update(sum([extract_simple_key_names(settings[k]) 
-                                 for k in ("hk_rec_start","hk_rec_stop","hk_play","hk_click_toggle")], []))
+        settings.update(hk_rec_start=self.var_hk_start.get().strip() or DEFAULTS["hk_rec_start"],
+                        hk_rec_stop =self.var_hk_stop.get().strip()  or DEFAULTS["hk_rec_stop"],
+                        hk_play     =self.var_hk_play.get().strip()  or DEFAULTS["hk_play"])
+        apply_control_keys()
         rebuild_hotkeys(self)
         self.set_status("Hotkeys applied.")
 
     def apply_click_hotkey(self):
-        settings["hk_click_toggle"]=self.var_hk_click.get().strip() or DEFAULTS["hk_click_toggle"]
-        save_cfg(settings); rebuild_hotkeys(self); self.set_status("Clicker hotkey applied.")
-
-    def current_click_cfg(self):
-        settings["click_mode"]=self.var_mode_rate.get()
-        settings["cps"]=float(self.var_cps.get())
-        settings["interval_ms"]=int(self.var_ms.get())
-        settings["button"]=self.var_button.get()
-        settings["mode"]=self.var_where.get()
-        settings["fixed_xy"]=(int(self.var_fx.get()), int(self.var_fy.get()))
-        settings["jitter"]=float(self.var_jitter.get())
-        save_cfg(settings); return settings
+        settings.update(hk_click_toggle=self.var_hk_click.get().strip() or DEFAULTS["hk_click_toggle"])
+        apply_control_keys()
+        rebuild_hotkeys(self); self.set_status("Clicker hotkey applied.")
+
+    def sync_click_cfg(self, *_):
+        # runs on the Tk thread whenever a clicker field changes; the "clicker"
+        # ClickJob only ever reads the published snapshot
+        try:
+            settings.update(click_mode=self.var_mode_rate.get(),
+                            cps=float(self.var_cps.get()),
+                            interval_ms=int(self.var_ms.get()),
+                            button=self.var_button.get(),
+                            mode=self.var_where.get(),
+                            fixed_xy=(int(self.var_fx.get()), int(self.var_fy.get())),
+                            jitter=float(self.var_jitter.get()),
+                            late_policy=self.var_late.get(),
+                            burst_size=max(1, int(self.var_burst.get())),
+                            burst_spacing_ms=max(0.0, float(self.var_burst_ms.get())),
+                            interval_dist=self.var_int_dist.get(),
+                            interval_cv=max(0.0, float(self.var_int_cv.get())),
+                            drift_px=max(0.0, float(self.var_drift.get())),
+                            human_seed=max(0, int(self.var_seed.get())))
+        except (tk.TclError, ValueError): pass  # half-typed entry, keep the last good values
+
+    def sync_playback_cfg(self, *_):
+        try:
+            settings.update(playback_dist=self.var_play_dist.get(),
+                            playback_delay_cv=max(0.0, float(self.var_play_cv.get())))
+        except (tk.TclError, ValueError): pass
+
+    def sync_move_cfg(self, *_):
+        try:
+            settings.update(record_moves=bool(self.var_rec_moves.get()),
+                            move_tolerance_px=float(self.var_move_tol.get()),
+                            move_playback_hz=float(self.var_move_hz.get()))
+        except (tk.TclError, ValueError): return
+        apply_move_settings()
 
     def toggle_clicker(self, want: Optional[bool]=None):
-        global autoclicking, clicker_thread
-        target = not autoclicking if want is None else want
-        if target and not autoclicking:
-            autoclicking=True; self.set_status("Auto clicker: ON")
-            clicker_thread=threading.Thread(target=click_loop, args=(self.current_click_cfg,), daemon=True)
-            clicker_thread.start()
-        elif not target and autoclicking:
-            autoclicking=False; self.set_status("Auto clicker: OFF")
+        on = scheduler.running("clicker")
+        target = not on if want is None else want
+        if target and not on:
+            # the main clicker follows the Auto Clicker tab live
+            if "clicker" not in scheduler.jobs: scheduler.add(ClickJob("clicker", settings.snapshot))
+            scheduler.start("clicker"); self.set_status("Auto clicker: ON")
+        elif not target and on:
+            scheduler.stop("clicker")
+            st = scheduler.jobs["clicker"].stats
+            self.set_status("Auto clicker: OFF" + (f" ({st.summary_text()})" if st.ticks else ""))
+
+    # ---- jobs ----
+    def _new_job_name(self, prefix: str) -> str:
+        name = self.var_job_name.get().strip()
+        if name: return name
+        i = 1
+        while f"{prefix} {i}" in scheduler.jobs: i += 1
+        return f"{prefix} {i}"
+
+    def _add_job(self, job):
+        if job.name in ("clicker", "macro"):
+            self.set_status(f"'{job.name}' is reserved for the main clicker / player."); return
+        scheduler.add(job); self.var_job_name.set("")
+        if job.hotkey: apply_control_keys(); rebuild_hotkeys(self)
+        self._refresh_jobs(); self.set_status(f"Added job '{job.name}'.")
+
+    def add_click_job(self):
+        cfg = dict(settings.snapshot())   # frozen: later tab edits don't change this job
+        self._add_job(ClickJob(self._new_job_name("click"), lambda: cfg, self.var_job_hotkey.get().strip()))
+
+    def add_macro_job(self):
+        if self.current_macro is None: self.set_status("No macro loaded."); return
+        try: speed, loops = float(self.var_job_speed.get()), int(self.var_job_loops.get())
+        except (tk.TclError, ValueError): self.set_status("Speed/loops must be numbers."); return
+        self._add_job(PlaybackJob(self._new_job_name("macro"), self.current_macro.copy(), speed, loops,
+                                  self.var_job_hotkey.get().strip(), Humanizer.for_playback(settings.snapshot())))
+
+    def capture_source(self):
+        if self._capture is None:
+            f = settings["trigger_file"]
+            self._capture = get_source(settings["trigger_source"], Path(f) if f else None)
+        return self._capture
+
+    def add_trigger_job(self):
+        try:
+            x, y, w, h = (int(v) for v in self.var_trig_box.get().split(","))
+            tol, fps = float(self.var_trig_tol.get()), float(self.var_trig_fps.get())
+            source = self.capture_source()
+        except (tk.TclError, ValueError) as e: self.set_status(f"Trigger: {e}"); return
+        except Exception as e: self.set_status(f"Screen capture unavailable: {e}"); return
+        settings.update(trigger_fps=fps)
+        name = self._new_job_name("trigger")
+        triggers = TriggerSet(source, [Region(x, y, w, h, self.var_trig_mode.get(), tolerance=tol)], fps)
+        triggers.capture_refs()   # the baseline poll runs on the dispatch thread, see TriggerJob
+        act = self.var_trig_action.get()
+        if act == "click while":
+            # a clicker gated by the region, polled at most once per frame
+            cfg = dict(settings.snapshot())
+            self._add_job(ClickJob(name, lambda: cfg, self.var_job_hotkey.get().strip(), gate=triggers.gate())); return
+        if act == "macro":
+            if self.current_macro is None: self.set_status("No macro loaded."); return
+            m, human = self.current_macro.copy(), Humanizer.for_playback(settings.snapshot())
+            run = f"{name} macro"
+            def action(fired):
+                # a trigger that fires again mid-run does not restart the macro
+                if not scheduler.running(run):
+                    scheduler.add(PlaybackJob(run, m, human=human)); scheduler.start(run)
+            label = f"play {len(m.events)} events"
+        else:
+            cfg = dict(settings.snapshot())
+            n, human = engine.burst_size(cfg), Humanizer.for_clicker(cfg)
+            action = lambda fired: engine.click_once(engine.current_backend(), cfg, n, human)
+            label = f"{cfg['button']} click"
+        self._add_job(TriggerJob(name, triggers, action, self.var_job_hotkey.get().strip(), label))
+
+    def _job_action(self, fn):
+        sel = self.jobs_tree.selection()
+        if sel: fn(sel[0]); self._refresh_jobs()
+
+    def remove_job(self, name: str):
+        hotkey = scheduler.jobs[name].hotkey
+        scheduler.remove(name)
+        if hotkey: apply_control_keys(); rebuild_hotkeys(self)
+
+    def apply_jobs_hotkey(self):
+        settings.update(hk_jobs_pause=self.var_hk_jobs.get().strip() or DEFAULTS["hk_jobs_pause"])
+        apply_control_keys(); rebuild_hotkeys(self); self.set_status("Jobs hotkey applied.")
+
+    def _refresh_jobs(self):
+        if not hasattr(self, "jobs_tree"): return
+        t = self.jobs_tree; jobs = dict(scheduler.jobs)
+        for it in t.get_children():
+            if it not in jobs: t.delete(it)
+        for name, j in jobs.items():
+            vals = (name, j.kind, j.state, j.hotkey, j.describe(), j.error or (j.stats.summary_text() if j.stats.ticks else ""))
+            if t.exists(name): t.item(name, values=vals)
+            else: t.insert("", "end", iid=name, values=vals)
+
+    def _poll_jobs(self):
+        for name, j in list(scheduler.jobs.items()):
+            if j.state == DONE and self._job_states.get(name) != DONE:
+                self.set_status("Playback finished." if name == "macro" else f"Job '{name}' finished.")
+            elif j.state == ERROR and self._job_states.get(name) != ERROR:
+                self.set_status(f"{'Playback' if name == 'macro' else f'Job {name!r}'} failed: {j.error}")
+            self._job_states[name] = j.state
+        self._refresh_jobs()
+        self.metrics_text.set(METRICS.summary_text() if METRICS.enabled else "")
+        self.after(250, self._poll_jobs)
+
+    def sync_metrics_cfg(self):
+        METRICS.enabled = bool(self.var_metrics_on.get())
+        settings.update(metrics=METRICS.enabled)
+
+    def dump_metrics(self, fmt: str):
+        p = METRICS.dump(APP_DIR / ("metrics.prom" if fmt == "prom" else "metrics.json"), fmt)
+        self.set_status(f"Metrics written: {p}")
 
     def _edit_delay_cell(self, event):
         region = self.tree.identify("region", event.x, event.y)
         if region != "cell": return
         colid = self.tree.identify_column(event.x)
         if colid != "#5": return
-        rowid = self.tree.identify_row(event.y)
-        if not rowid: return
+        rowid = self.tree.identify_row(event.y); idx = self.table.index_at(event.y)
+        if not rowid or idx is None: return
         x, y, w, h = self.tree.bbox(rowid, colid)
-        vals = list(self.tree.item(rowid, "values")); current = vals[4]
+        m = self.current_macro; current = fmt_delay(m.delay[idx])
         e = tk.Entry(self.tree); e.insert(0, current); e.select_range(0, tk.END); e.focus()
         e.place(x=x, y=y, width=w, height=h)
         def commit(*_):
-            try: new_ms = str(int(float(e.get())))
-            except: new_ms = current
-            vals[4] = new_ms; self.tree.item(rowid, values=vals); e.destroy()
+            try: self.history.do(m, set_delays(m, [idx], float(e.get())))
+            except: pass
+            self.table.refresh_rows([idx]); e.destroy()
         e.bind("<Return>", commit); e.bind("<FocusOut>", commit)
 
     def _update_selected_label(self):
-        sel = self.tree.selection()
-        self.sel_idx = self.tree.index(sel[0]) if sel else None
+        self.sel_idx = self._selected_index()
         self.lbl_sel.config(text=str(self.sel_idx+1) if self.sel_idx is not None else "-")
 
     def load_selected(self):
-        sel = self.tree.selection()
-        if not sel: return
-        idx = self.tree.index(sel[0]); self.sel_idx = idx
+        idx = self._selected_index()
+        if idx is None: return
+        self.sel_idx = idx
         self.lbl_sel.config(text=str(idx+1))
-        _, kind, action, detail, dly = self.tree.item(sel[0], "values")
-        self.var_kind.set(kind); self.var_action.set(action); self.var_delay.set(int(float(dly or 0)))
-        if kind == "key":
-            k = detail.split("key=",1)[1] if "key=" in detail else detail
-            self.var_kb.set(k)
+        ev = self.current_macro.events[idx]; d = ev.data
+        self.var_kind.set(ev.kind); self.var_action.set(ev.action); self.var_delay.set(float(ev.delay_ms))
+        if ev.kind == "key":
+            self.var_kb.set(d["key"])
             self.var_x.set(0); self.var_y.set(0); self.var_pressed.set(True)
+        elif ev.kind == "loop":
+            self.var_kb.set(""); self.var_x.set(d.get("count", 0)); self.var_y.set(0); self.var_pressed.set(True)
+            if ev.action == LOOP_BEGIN: self.set_status("Repeat row: X is the repeat count.")
         else:
-            btn="left"; x=0; y=0; pressed=True
-            if "@(" in detail:
-                try:
-                    pre, rest = detail.split("@(",1)
-                    if "pressed=" in rest:
-                        coord, p2 = rest.split(") pressed=",1); pressed = (p2.strip().lower()=="true")
-                    else:
-                        coord = rest.split(")")[0]
-                    x,y = map(int, coord.split(","))
-                    if any(b in pre for b in ("left","right","middle")): btn = pre.strip().split()[0]
-                except: pass
-            self.var_kb.set(btn); self.var_x.set(x); self.var_y.set(y); self.var_pressed.set(pressed)
+            self.var_kb.set(d.get("button", "left")); self.var_x.set(d["x"]); self.var_y.set(d["y"])
+            self.var_pressed.set(d.get("pressed", True))
 
     def apply_to_selected(self):
-        if self.sel_idx is None: return
-        items = self.tree.get_children()
-        it = items[self.sel_idx]
+        if self.sel_idx is None or self.current_macro is None: return
         kind = self.var_kind.get()
         action = self.var_action.get()
-        dly = str(int(self.var_delay.get()))
-        if kind == "key":
-            detail = f"key={self.var_kb.get().strip() or 'a'}"
+        dly = max(0.0, float(self.var_delay.get()))
+        m = self.current_macro
+        if self.sel_idx >= len(m): return
+        old = m.events[self.sel_idx]
+        if old.kind == "loop":
+            # a block edge stays a block edge, or repeat/end would no longer
+            # pair up; only the count (X) and the delay can change
+            data = {"count": max(1, int(self.var_x.get()))} if old.action == LOOP_BEGIN else {}
+            kind, action = old.kind, old.action
+        elif kind == "loop" or action in (LOOP_BEGIN, LOOP_END):
+            self.set_status("Repeat rows are only made by Compress Loops."); return
+        elif kind == "key":
+            data = {"key": self.var_kb.get().strip() or "a"}
+        elif action == "move":
+            data = {"x": int(self.var_x.get()), "y": int(self.var_y.get())}
         else:
-            detail = f"{self.var_kb.get().strip() or 'left'} @({int(self.var_x.get())},{int(self.var_y.get())}) pressed={bool(self.var_pressed.get())}"
-        self.tree.item(it, values=(str(self.sel_idx+1), kind, action, detail, dly))
+            data = {"button": self.var_kb.get().strip() or "left", "x": int(self.var_x.get()),
+                    "y": int(self.var_y.get()), "pressed": bool(self.var_pressed.get())}
+        self.history.do(m, set_row(m, self.sel_idx, MacroEvent(kind, action, data, dly)))
+        self.table.refresh_rows([self.sel_idx])
 
     def on_close(self):
-        try: self.toggle_clicker(False)
-        except: pass
-        global recording, playing
-        playing=False
-        if recording:
+        self.ui.stop()
+        scheduler.close()
+        if self._capture is not None: self._capture.close()
+        if engine.recording:
             try: stop_record()
             except: pass
-        try:
-            if hasattr(self,"k_listener"): self.k_listener.stop()
-            if hasattr(self,"m_listener"): self.m_listener.stop()
-        except: pass
-        try: rebuild_hotkeys(self)
-        except: pass
+        self.hub.stop()
+        settings.flush()
         self.destroy()
 
+def startup_report(app: App, t_ready: float):
+    # --startup-report: print how long import, setup and the first window took,
+    # then close (macro_bench --only startup runs this in a subprocess)
+    def done(_e=None):
+        t = time.perf_counter()
+        print(json.dumps({"import_ms": round((t_ready - T_IMPORT) * 1000, 1),
+                          "init_ms": round((t_init - t_ready) * 1000, 1),
+                          "first_window_ms": round((t - T_IMPORT) * 1000, 1)}), flush=True)
+        app.after(0, app.on_close)
+    t_init = time.perf_counter(); fired = []
+    def on_map(e):
+        if e.widget is app and not fired: fired.append(e); app.after_idle(done)
+    app.bind("<Map>", on_map)
+
 if __name__ == "__main__":
+    from multiprocessing import freeze_support
+    freeze_support()   # library rescans use a process pool; needed in the frozen .exe
+    t_ready = time.perf_counter()
+    try: engine.set_backend(get_backend(settings["backend"]))
+    except ValueError: engine.set_backend(get_backend("auto"))
     app = App()
     app.geometry("900x720")
+    if "--startup-report" in sys.argv: startup_report(app, t_ready)
     app.mainloop()
@@ -0,0 +1,76 @@
+import json, os, tempfile, threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+SAVE_DEBOUNCE_S = 0.5
+
+def atomic_write_text(path: Path, text: str):
+    # write a sibling temp file and rename it over the target, so a crash or a
+    # concurrent reader never sees a half-written file
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f: f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+
+class ConfigStore:
+    # Holds the settings as an immutable snapshot. Readers (the clicker thread
+    # polls this every tick) just grab the current reference; writers build a
+    # new snapshot and swap it in, and the file is rewritten at most once per
+    # debounce window.
+    def __init__(self, path: Path, defaults: dict, debounce_s: float = SAVE_DEBOUNCE_S):
+        self.path = path
+        self.defaults = dict(defaults)
+        self.debounce_s = debounce_s
+        self._write_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._snap: Optional[Mapping] = None   # the file is read on first access
+
+    def _load(self) -> dict:
+        try:
+            if self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if isinstance(data, dict): return {**self.defaults, **data}
+        except Exception: pass
+        return dict(self.defaults)
+
+    def _loaded(self) -> Mapping:
+        with self._write_lock:
+            if self._snap is None: self._snap = MappingProxyType(self._load())
+            return self._snap
+
+    def snapshot(self) -> Mapping:
+        s = self._snap
+        return s if s is not None else self._loaded()
+
+    def __getitem__(self, k): return self.snapshot()[k]
+    def get(self, k, default=None): return self.snapshot().get(k, default)
+
+    def update(self, **changes):
+        self.snapshot()
+        with self._write_lock:
+            cur = self._snap
+            if all(k in cur and cur[k] == v for k, v in changes.items()): return
+            self._snap = MappingProxyType({**cur, **changes})
+            if self._timer is None:
+                self._timer = threading.Timer(self.debounce_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._io_lock:
+            with self._write_lock:
+                if self._timer is not None:
+                    self._timer.cancel(); self._timer = None
+                if self._snap is None: return   # never loaded, nothing changed
+                snap = dict(self._snap)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(self.path, json.dumps(snap, indent=2))
+            except Exception: pass
@@ -0,0 +1,140 @@
+from array import array
+from typing import Iterable, List, Optional, Sequence, Tuple
+from macro_model import Macro, NAMES, KIND_KEY
+
+# Edits know how to apply and revert themselves and only keep what they
+# touch (the removed rows, or the old/new values of the changed cells), so
+# the undo stack never holds whole-macro copies.
+
+def runs(indices: Iterable[int]) -> List[Tuple[int, int]]:
+    # sorted indices -> [(start, stop), ...] contiguous half-open ranges
+    out: List[Tuple[int, int]] = []
+    for i in sorted(set(indices)):
+        if out and out[-1][1] == i: out[-1] = (out[-1][0], i + 1)
+        else: out.append((i, i + 1))
+    return out
+
+
+class Edit:
+    label = "edit"
+    def apply(self, m: Macro): raise NotImplementedError
+    def revert(self, m: Macro): raise NotImplementedError
+
+
+class DeleteRanges(Edit):
+    label = "delete"
+    def __init__(self, ranges: Sequence[Tuple[int, int]]):
+        self.ranges = sorted(ranges); self.removed: List[dict] = []
+
+    def apply(self, m: Macro):
+        removed = []
+        for s, e in reversed(self.ranges):   # back to front keeps indices valid
+            removed.append(m.take(s, e)); m.delete_range(s, e)
+        self.removed = removed[::-1]
+
+    def revert(self, m: Macro):
+        for (s, _), rows in zip(self.ranges, self.removed): m.insert_rows(s, rows)
+
+
+class InsertRows(Edit):
+    label = "insert"
+    def __init__(self, at: int, rows: dict):
+        self.at, self.rows = at, rows
+        self.count = len(rows["kind"])
+
+    def apply(self, m: Macro): m.insert_rows(self.at, self.rows)
+    def revert(self, m: Macro): m.delete_range(self.at, self.at + self.count)
+
+
+class MoveBlock(Edit):
+    # rows [start, stop) end up starting at `dest` (an index in the result)
+    label = "move"
+    def __init__(self, start: int, stop: int, dest: int):
+        self.start, self.stop, self.dest = start, stop, dest
+
+    @staticmethod
+    def _move(m: Macro, start: int, stop: int, dest: int):
+        rows = m.take(start, stop); m.delete_range(start, stop); m.insert_rows(dest, rows)
+
+    def apply(self, m: Macro): self._move(m, self.start, self.stop, self.dest)
+    def revert(self, m: Macro):
+        self._move(m, self.dest, self.dest + self.stop - self.start, self.start)
+
+
+class SetValues(Edit):
+    label = "set"
+    def __init__(self, column: str, idx: Sequence[int], new: Sequence, m: Macro):
+        col = getattr(m, column)
+        self.column = column
+        self.idx = array("l", idx)
+        self.old = array(col.typecode, (col[i] for i in self.idx))
+        self.new = array(col.typecode, new)
+
+    def _put(self, m: Macro, values):
+        col = getattr(m, self.column)
+        for i, v in zip(self.idx, values): col[i] = v
+        m.changed()
+
+    def apply(self, m: Macro): self._put(m, self.new)
+    def revert(self, m: Macro): self._put(m, self.old)
+
+
+class Batch(Edit):
+    def __init__(self, edits: List[Edit], label: str = "edit"):
+        self.edits, self.label = edits, label
+    def apply(self, m: Macro):
+        for e in self.edits: e.apply(m)
+    def revert(self, m: Macro):
+        for e in reversed(self.edits): e.revert(m)
+
+
+# -- builders for the Macro tab operations ------------------------------------
+def delete_rows(indices: Iterable[int]) -> DeleteRanges:
+    return DeleteRanges(runs(indices))
+
+def duplicate_block(m: Macro, start: int, stop: int) -> InsertRows:
+    e = InsertRows(stop, m.take(start, stop)); e.label = "duplicate"; return e
+
+def set_delays(m: Macro, indices: Sequence[int], delay_ms: float) -> SetValues:
+    e = SetValues("delay", indices, [max(0.0, float(delay_ms))] * len(indices), m)
+    e.label = "set delay"; return e
+
+def scale_delays(m: Macro, indices: Sequence[int], factor: float) -> SetValues:
+    f = max(0.0, float(factor))
+    e = SetValues("delay", indices, [m.delay[i] * f for i in indices], m)
+    e.label = "scale delay"; return e
+
+def replace_key(m: Macro, old: str, new: str) -> Optional[SetValues]:
+    old_id = NAMES.ids.get(old)
+    if old_id is None: return None
+    idx = [i for i, (k, n) in enumerate(zip(m.kind, m.name)) if k == KIND_KEY and n == old_id]
+    if not idx: return None
+    e = SetValues("name", idx, [NAMES.intern(new)] * len(idx), m)
+    e.label = "replace key"; return e
+
+def set_row(m: Macro, i: int, ev) -> Batch:
+    row = Macro((ev,))
+    return Batch([SetValues(c, [i], getattr(row, c), m) for c, _ in Macro.COLUMNS], "edit row")
+
+
+class EditHistory:
+    def __init__(self, limit: int = 500):
+        self.limit = limit
+        self.undo_stack: List[Edit] = []
+        self.redo_stack: List[Edit] = []
+
+    def clear(self):
+        self.undo_stack.clear(); self.redo_stack.clear()
+
+    def do(self, m: Macro, e: Edit):
+        e.apply(m)
+        self.undo_stack.append(e); self.redo_stack.clear()
+        if len(self.undo_stack) > self.limit: del self.undo_stack[0]
+
+    def undo(self, m: Macro) -> Optional[Edit]:
+        if not self.undo_stack: return None
+        e = self.undo_stack.pop(); e.revert(m); self.redo_stack.append(e); return e
+
+    def redo(self, m: Macro) -> Optional[Edit]:
+        if not self.redo_stack: return None
+        e = self.redo_stack.pop(); e.apply(m); self.undo_stack.append(e); return e
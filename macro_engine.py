@@ -0,0 +1,242 @@
+import threading, time
+from typing import Callable, Iterable, List, Optional
+from macro_model import Macro, NAMES, NO_NAME, KIND_KEY, KIND_MOUSE
+from macro_backend import InputBackend, get_backend
+from macro_timing import wait_until
+from macro_plan import batched, get_plan, iter_ops
+from macro_capture import CaptureBuffer, merged, EV_KEY, EV_CLICK, EV_MOVE
+from macro_path import PathSimplifier
+from macro_human import Humanizer
+from macro_metrics import METRICS, PLAY_LATE, PLAY_INJECT, FOCUS
+
+record_hwnd: Optional[int] = None
+
+_backend: Optional[InputBackend] = None
+
+def set_backend(b: InputBackend):
+    global _backend
+    _backend = b
+
+def current_backend() -> InputBackend:
+    global _backend
+    if _backend is None: _backend = get_backend("auto")
+    return _backend
+
+
+def extract_simple_key_names(hk: str)->List[str]:
+    names=[]; tmp=hk.lower().replace(" ","")
+    for part in tmp.split("+"):
+        p=part.strip("<>");
+        if p: names.append(p)
+    return names
+
+# keys used by the global hotkeys; never recorded into a macro. Each key
+# object is checked against these once, see _key_id
+CONTROL_KEYS: set = set()
+MODIFIER_KEYS = frozenset(("ctrl","alt","shift","cmd","windows","alt_gr"))
+
+def set_control_keys(hotkeys: Iterable[str]):
+    CONTROL_KEYS.clear()
+    CONTROL_KEYS.update(sum([extract_simple_key_names(h) for h in hotkeys], []))
+    _key_ids.clear()
+
+recording = False
+playing = False
+active_jobs = 0   # running jobs on a macro_sched.Scheduler; they inject input too
+
+# capture stage: one buffer per hook thread, raw tuples only; MacroEvents are
+# built from them in stop_record()
+_rec_t0: int = 0
+_kb_cap = CaptureBuffer()
+_ms_cap = CaptureBuffer()
+_key_ids: dict = {}   # backend key object -> name id, -1 for keys never recorded
+_button_ids: dict = {}
+
+# mouse paths: simplified while recording, re-interpolated at playback
+record_moves = False
+move_playback_hz = 125.0
+_path = PathSimplifier(lambda ts, x, y: _ms_cap.push(ts, EV_MOVE, x, y, 0))
+# the simplifier is flushed by stop_record too, so the mouse buffer has two
+# writers: both hold this and the hook re-checks `recording` under it
+_ms_lock = threading.Lock()
+
+def configure_moves(record: bool, tolerance_px: float = 2.0, min_interval_ms: float = 8.0,
+                    playback_hz: float = 125.0):
+    global record_moves, move_playback_hz
+    _path.tolerance = max(0.0, float(tolerance_px))
+    _path.min_interval_ns = max(0, int(float(min_interval_ms) * 1_000_000))
+    move_playback_hz = max(0.0, float(playback_hz))
+    record_moves = bool(record)
+
+def start_record():
+    global recording, _rec_t0, record_hwnd
+    if recording or playing or active_jobs:
+        return
+    record_hwnd = current_backend().foreground_window()
+    _kb_cap.reset(); _ms_cap.reset(); _path.reset()
+    _rec_t0 = time.perf_counter_ns()
+    recording = True
+
+
+_A_PRESS, _A_RELEASE, _A_CLICK, _A_MOVE = (NAMES.intern(a) for a in ("press", "release", "click", "move"))
+
+def _build_macro(buffers: List[CaptureBuffer], t0: int) -> Macro:
+    # raw captures map straight onto the Macro columns; name ids are shared
+    kind, action, name, xs, ys, pressed, delay = [], [], [], [], [], [], []
+    prev = t0
+    for ts, code, x, y, flags in merged(buffers):
+        if code == EV_KEY:
+            kind.append(KIND_KEY); action.append(_A_PRESS if flags else _A_RELEASE); name.append(x)
+            xs.append(0); ys.append(0); pressed.append(0)
+        elif code == EV_CLICK:
+            kind.append(KIND_MOUSE); action.append(_A_CLICK); name.append(flags >> 1)
+            xs.append(x); ys.append(y); pressed.append(flags & 1)
+        elif code == EV_MOVE:
+            kind.append(KIND_MOUSE); action.append(_A_MOVE); name.append(NO_NAME)
+            xs.append(x); ys.append(y); pressed.append(0)
+        else:
+            continue
+        delay.append(round((ts - prev) / 1e6, 3)); prev = ts
+    return Macro.from_columns(record_hwnd, kind=kind, action=action, name=name, x=xs, y=ys,
+                              pressed=pressed, delay=delay)
+
+def stop_record() -> Macro:
+    global recording
+    with _ms_lock:
+        recording = False
+        _path.flush()
+    return _build_macro([_kb_cap, _ms_cap], _rec_t0)
+
+
+def _key_id(key) -> int:
+    name = current_backend().key_name(key).lower()
+    i = -1 if name in CONTROL_KEYS or name in MODIFIER_KEYS else NAMES.intern(name)
+    try: _key_ids[key] = i
+    except TypeError: pass  # unhashable key object, resolve it every time
+    return i
+
+def on_kb_event(key, pressed: bool):
+    if not recording or playing or active_jobs: return
+    ts = time.perf_counter_ns()
+    try: i = _key_ids.get(key)
+    except TypeError: i = None
+    if i is None: i = _key_id(key)
+    if i >= 0: _kb_cap.push(ts, EV_KEY, i, 0, 1 if pressed else 0)
+
+def on_mouse_move(x, y):
+    if not record_moves or not recording or playing or active_jobs: return
+    with _ms_lock:
+        if recording: _path.add(time.perf_counter_ns(), int(x), int(y))
+
+def on_mouse_click(x, y, button, pressed):
+    if not recording or playing or active_jobs: return
+    ts = time.perf_counter_ns()
+    i = _button_ids.get(button)
+    if i is None: i = _button_ids[button] = NAMES.intern(current_backend().button_name(button))
+    with _ms_lock:
+        if not recording: return
+        if record_moves: _path.flush()
+        _ms_cap.push(ts, EV_CLICK, int(x), int(y), (i << 1) | (1 if pressed else 0))
+
+def focus_target(m, io) -> bool:
+    if not m.target_hwnd: return False
+    t = time.perf_counter_ns()
+    try: return io.focus_window(m.target_hwnd)
+    except Exception: return False
+    finally:
+        if METRICS.enabled: FOCUS.record(time.perf_counter_ns() - t)
+
+def playback_source(m, io):
+    # -> (duration_ns, callable returning one iteration's ops)
+    if getattr(m, "streamed", False):
+        # memory-mapped macro: decode and resolve ops as they are played
+        return m.duration_ns, lambda: batched(iter_ops(m.events, io, move_playback_hz), io)
+    plan = get_plan(m, io, move_playback_hz)
+    return plan.duration_ns, plan.run
+
+def timeline(m, io, speed: float = 1.0, loop: int = 1, human: Optional[Humanizer] = None, source=None):
+    # -> every op of every loop as (offset from start in ns, fn, args); with a
+    # humanizer each gap between ops is scaled by its own delay factor. Pass
+    # source (from playback_source) to compile before the clock starts.
+    duration_ns, run_ops = source or playback_source(m, io)
+    scale = 1.0 / max(0.01, speed)
+    factor = human.delay_factor if human is not None else None
+    prev = extra = 0.0
+    for i in range(max(1, loop)):
+        base = i * duration_ns
+        for off, fn, args in run_ops():
+            a = base + off
+            if factor is not None:
+                extra += (a - prev) * (factor() - 1.0); prev = a
+                a += extra
+            yield int(a * scale), fn, args
+
+def playback_macro(m: Macro, speed: float = 1.0, loop: int = 1, human: Optional[Humanizer] = None):
+    global playing
+    if playing or not m.events:
+        return
+    io = current_backend()
+
+    # focus the recorded window if known
+    if focus_target(m, io): time.sleep(0.15)
+    keep_going = lambda: playing
+    playing = True
+    try:
+        # compile (and hash) before t0, or that time would count against the schedule
+        source = playback_source(m, io)
+        # every op is due at an absolute offset from t0, so sleep overshoot and
+        # injection time never accumulate across events or loop iterations
+        clock = time.perf_counter_ns
+        late_rec, inject_rec = PLAY_LATE.record, PLAY_INJECT.record
+        t0 = clock()
+        for off, fn, args in timeline(m, io, speed, loop, human, source):
+            due = t0 + off
+            if not playing or not wait_until(due, keep_going):
+                return
+            if METRICS.enabled:
+                t = clock(); fn(*args); late_rec(t - due); inject_rec(clock() - t)
+            else:
+                fn(*args)
+    finally:
+        playing = False
+
+
+def burst_size(cfg) -> int: return max(1, int(cfg.get("burst_size", 1)))
+
+def click_interval_ns(cfg) -> int:
+    # time between ticks; a tick fires burst_size clicks, so without an explicit
+    # burst spacing the average rate still matches the CPS / interval setting
+    n = burst_size(cfg)
+    spacing = float(cfg.get("burst_spacing_ms", 0))
+    if n > 1 and spacing > 0:
+        return max(1, int(spacing * 1_000_000))
+    if cfg["click_mode"] == "ms":
+        return max(1, int(cfg["interval_ms"])) * 1_000_000 * n
+    return int(1e9 * n / max(0.1, float(cfg["cps"])))
+
+def click_once(io, cfg, n: int = 1, human: Optional[Humanizer] = None):
+    # one scheduler tick of the clicker: a single click, or a burst of n;
+    # human supplies the jitter/drift offsets for fixed-position clicks
+    btn = io.resolve_button(cfg["button"])
+    fixed = cfg["mode"] == "fixed"
+    offset = human.offset if human is not None and fixed else None
+    if fixed:
+        tx, ty = cfg["fixed_xy"]
+    else:
+        tx, ty = io.position()
+    if n > 1:
+        # burst: all clicks (and cursor moves) go to the backend as one batch
+        batch = []
+        for _ in range(n):
+            if offset is not None:
+                dx, dy = offset(); batch.append(("move", (tx + dx, ty + dy)))
+            elif fixed:
+                batch.append(("move", (tx, ty)))
+            batch += (("press_button", (btn,)), ("release_button", (btn,)))
+        io.send(batch)
+        return
+    if offset is not None:
+        dx, dy = offset(); tx += dx; ty += dy
+    if fixed:
+        io.move(tx, ty)
+    io.press_button(btn); io.release_button(btn)
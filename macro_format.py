@@ -0,0 +1,143 @@
+import mmap, struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from macro_model import Macro, MacroEvent, LOOP_BEGIN, loop_span
+
+# .mcrb layout (little endian):
+#   header   64 bytes  HEADER
+#   records  count * RECORD, one per event
+#   strings  u32 count, then per string u16 length + utf-8 bytes
+# The hash is Macro.content_hash() of the events (FLAG_COLUMN_HASH), so it is
+# known without reading them and matches the same macro loaded from JSON.
+MAGIC = b"MCRB"
+VERSION = 2          # 2: kind 2 = loop row (x = repeat count); written only when a file has them
+HEADER = struct.Struct("<4sHHQQqqQ16s")  # magic, version, flags, count, strtab offset,
+                                         # duration_us, target_hwnd, reserved, hash
+RECORD = struct.Struct("<BBHHxxiiq")     # kind, pressed, action id, name id, x, y, delay_us
+FLAG_HWND, FLAG_COLUMN_HASH = 1, 2   # files without FLAG_COLUMN_HASH hashed records + strings
+NO_NAME = 0xFFFF
+
+
+def is_binary(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f: return f.read(4) == MAGIC
+    except OSError: return False
+
+
+def write_binary(m: Macro, path: Path):
+    path = Path(path)
+    strings: List[str] = []; ids: Dict[str, int] = {}
+    def sid(s: str) -> int:
+        i = ids.get(s)
+        if i is None:
+            if len(strings) >= NO_NAME: raise ValueError("too many distinct names for .mcrb")
+            i = ids[s] = len(strings); strings.append(s)
+        return i
+
+    body = bytearray(); duration_us = 0; count = 0; loops = False
+    pack = RECORD.pack
+    for e in m.events:
+        d = e.data
+        delay_us = max(0, int(round(float(e.delay_ms) * 1000)))
+        duration_us += delay_us
+        if e.kind == "key":
+            rec = pack(0, 0, sid(e.action), sid(str(d.get("key", ""))), 0, 0, delay_us)
+        elif e.kind == "loop":
+            rec = pack(2, 0, sid(e.action), NO_NAME, max(1, int(d.get("count", 1))), 0, delay_us)
+            loops = True
+        else:
+            name = NO_NAME if e.action == "move" else sid(str(d.get("button", "left")))
+            rec = pack(1, 1 if d.get("pressed") else 0, sid(e.action), name,
+                       int(d.get("x", 0)), int(d.get("y", 0)), delay_us)
+        body += rec; count += 1
+    strtab = bytearray(struct.pack("<I", len(strings)))
+    for s in strings:
+        b = s.encode("utf-8"); strtab += struct.pack("<H", len(b)) + b
+    if loops:   # the header holds the played length, repeats included
+        recs = list(RECORD.iter_unpack(body))
+        duration_us = loop_span([r[0] for r in recs], [strings[r[2]] for r in recs],
+                                [r[4] for r in recs], [r[6] for r in recs])
+
+    hwnd = m.target_hwnd
+    flags = FLAG_COLUMN_HASH | (FLAG_HWND if hwnd else 0)
+    header = HEADER.pack(MAGIC, VERSION if loops else 1, flags, count, HEADER.size + len(body),
+                         duration_us, int(hwnd or 0), 0, bytes.fromhex(m.content_hash()))
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header); f.write(body); f.write(strtab)
+    tmp.replace(path)
+
+
+class _EventView:
+    # read-only sequence of MacroEvents decoded from the mapped records on demand
+    def __init__(self, buf: memoryview, count: int, strings: List[str]):
+        self.buf, self.count, self.strings = buf, count, strings
+
+    def __len__(self): return self.count
+    def __bool__(self): return self.count > 0
+
+    def _event(self, kind, pressed, action, name, x, y, delay_us) -> MacroEvent:
+        s = self.strings; act = s[action]
+        if kind == 0:
+            return MacroEvent("key", act, {"key": s[name]}, delay_us / 1000)
+        if kind == 2:
+            return MacroEvent("loop", act, {"count": x} if act == LOOP_BEGIN else {}, delay_us / 1000)
+        if name == NO_NAME:
+            return MacroEvent("mouse", act, {"x": x, "y": y}, delay_us / 1000)
+        return MacroEvent("mouse", act, {"x": x, "y": y, "button": s[name], "pressed": bool(pressed)},
+                          delay_us / 1000)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0: i += self.count
+        if not 0 <= i < self.count: raise IndexError(i)
+        return self._event(*RECORD.unpack_from(self.buf, HEADER.size + i * RECORD.size))
+
+    def __iter__(self) -> Iterator[MacroEvent]:
+        end = HEADER.size + self.count * RECORD.size
+        for rec in RECORD.iter_unpack(self.buf[HEADER.size:end]):
+            yield self._event(*rec)
+
+
+class MappedMacro:
+    # A .mcrb file opened via mmap. Behaves like a Macro for readers (events,
+    # target_hwnd, content_hash, save) but never holds the event list in memory;
+    # playback_macro streams it (see `streamed`).
+    streamed = True
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        magic, ver, flags, count, str_off, dur_us, hwnd, _, digest = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC: raise ValueError(f"{path} is not a .mcrb macro")
+        if ver > VERSION: raise ValueError(f"{path}: unsupported .mcrb version {ver}")
+        (n,) = struct.unpack_from("<I", buf, str_off); off = str_off + 4
+        strings = []
+        for _ in range(n):
+            (ln,) = struct.unpack_from("<H", buf, off)
+            strings.append(bytes(buf[off + 2:off + 2 + ln]).decode("utf-8")); off += 2 + ln
+        self.events = _EventView(buf, count, strings)
+        self.target_hwnd: Optional[int] = hwnd if flags & FLAG_HWND else None
+        self.duration_ns = dur_us * 1000
+        self._hash = digest.hex() if flags & FLAG_COLUMN_HASH else None
+
+    def content_hash(self) -> str:
+        if self._hash is None: self._hash = self.to_macro().content_hash()   # older file
+        return self._hash
+
+    def to_macro(self) -> Macro: return Macro(list(self.events), self.target_hwnd)
+
+    def save(self, path: Path):
+        if Path(path).resolve() == self.path.resolve(): return
+        self.to_macro().save(path)
+
+    def close(self):
+        mm, self._mm = self._mm, None
+        if mm is None: return
+        try:
+            self.events.buf.release(); mm.close()
+        except BufferError: pass  # an event iterator is still alive; the map goes with it
+        self._f.close()
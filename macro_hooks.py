@@ -0,0 +1,110 @@
+import logging, queue, threading, time
+from typing import Callable, Dict, Optional, Tuple
+import macro_engine as engine
+from macro_metrics import METRICS, HOTKEY, HOOK
+
+# modifier name (as the backend reports it) -> bit in the held-modifier mask
+MOD_BITS = {"ctrl": 1, "ctrl_l": 1, "ctrl_r": 1,
+            "alt": 2, "alt_l": 2, "alt_r": 2, "alt_gr": 2,
+            "shift": 4, "shift_l": 4, "shift_r": 4,
+            "cmd": 8, "cmd_l": 8, "cmd_r": 8, "windows": 8}
+log = logging.getLogger(__name__)
+
+
+def compile_hotkeys(mapping: Dict[str, Callable]) -> Dict[Tuple[int, str], Callable]:
+    # {"<ctrl>+<alt>+h": fn} -> {(modifier mask, key name): fn}; the last
+    # non-modifier part is the trigger key, so a press is one dict lookup
+    table = {}
+    for hk, fn in mapping.items():
+        mask, key = 0, None
+        for p in engine.extract_simple_key_names(hk):
+            bit = MOD_BITS.get(p)
+            if bit and key is None: mask |= bit
+            else: key = p
+        if key is None: raise ValueError(f"hotkey without a key: {hk}")
+        table[(mask, key)] = fn
+    return table
+
+
+class InputHub:
+    # The app's only input hooks: one keyboard and one mouse listener, started
+    # once. Every key event updates the modifier mask, looks up (mask, key) in
+    # the compiled hotkey table and goes on to the recorder, so a keystroke is
+    # handled once whatever is listening. set_hotkeys() swaps the table in
+    # place; no listener or thread is ever restarted. Hotkey actions run in
+    # order on their own thread: the OS drops a low-level hook that takes too
+    # long, so the hook callback only queues them.
+    def __init__(self, io):
+        self.io = io
+        self.table: Dict[Tuple[int, str], Callable] = {}
+        self.mods = 0
+        self._down: set = set()        # non-modifier keys held, so auto-repeat doesn't re-fire
+        self._norm: dict = {}          # backend key object -> (modifier bit, key name)
+        self._lock = threading.Lock()
+        self._kl = self._ml = None
+        self._actions: queue.SimpleQueue = queue.SimpleQueue()   # (fn, press time) or None to stop
+        self._worker: Optional[threading.Thread] = None
+
+    def start_keyboard(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_actions, name="hotkeys", daemon=True)
+                self._worker.start()
+            if self._kl is None: self._kl = self.io.keyboard_listener(self._press, self._release)
+
+    def start_mouse(self):
+        # only needed for recording, so it is started by the first recording
+        with self._lock:
+            if self._ml is None: self._ml = self.io.mouse_listener(engine.on_mouse_move, engine.on_mouse_click)
+
+    def set_hotkeys(self, mapping: Dict[str, Callable]):
+        self.table = compile_hotkeys(mapping)
+
+    def stop(self):
+        with self._lock:
+            for l in (self._kl, self._ml):
+                if l is not None:
+                    try: l.stop()
+                    except Exception: pass
+            self._kl = self._ml = None
+            w, self._worker = self._worker, None
+        if w is not None:
+            self._actions.put(None); w.join(1.0)   # let queued actions finish
+
+    def _run_actions(self):
+        while True:
+            item = self._actions.get()
+            if item is None: return
+            fn, t = item
+            try: fn()
+            except Exception: log.exception("hotkey action failed")
+            if METRICS.enabled: HOTKEY.record(time.perf_counter_ns() - t)
+
+    def _resolve(self, key) -> Tuple[int, str]:
+        name = self.io.key_name(key).lower()
+        if len(name) == 1 and ord(name) < 32: name = chr(ord(name) + 96)   # ctrl+letter arrives as a control char
+        n = (MOD_BITS.get(name, 0), name)
+        try: self._norm[key] = n
+        except TypeError: pass
+        return n
+
+    def _press(self, key):
+        t = time.perf_counter_ns()
+        try: n = self._norm.get(key)
+        except TypeError: n = None
+        bit, name = n or self._resolve(key)
+        if bit: self.mods |= bit
+        elif name not in self._down:
+            self._down.add(name)
+            fn = self.table.get((self.mods, name))
+            if fn is not None: self._actions.put((fn, t))
+        engine.on_kb_event(key, True)
+        if METRICS.enabled: HOOK.record(time.perf_counter_ns() - t)
+
+    def _release(self, key):
+        try: n = self._norm.get(key)
+        except TypeError: n = None
+        bit, name = n or self._resolve(key)
+        if bit: self.mods &= ~bit
+        else: self._down.discard(name)
+        engine.on_kb_event(key, False)
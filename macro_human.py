@@ -0,0 +1,106 @@
+import math, random
+from typing import Callable, List, Mapping, Optional, Tuple
+
+DISTS = ("none", "gauss", "lognormal")
+BLOCK = 1024
+MIN_FACTOR = 0.05       # a gaussian draw never shrinks an interval below this fraction
+DRIFT_STEP_FRAC = 0.1   # per-click drift step (sd) as a fraction of the drift bound
+
+
+class _Factors:
+    # Multiplicative timing factors with mean 1, drawn BLOCK at a time, so the
+    # per-tick cost is an index and a compare whatever the distribution.
+    def __init__(self, rng: random.Random, dist: str, cv: float, block: int = BLOCK):
+        self.rng, self.dist, self.cv, self.block = rng, dist, float(cv), block
+        self.buf: List[float] = []
+        self.i = 0
+
+    def _refill(self):
+        r, n, cv = self.rng, self.block, self.cv
+        if self.dist == "gauss":
+            g = r.gauss
+            self.buf = [max(MIN_FACTOR, 1.0 + cv * g(0.0, 1.0)) for _ in range(n)]
+        else:  # lognormal, parameters chosen so the mean stays 1
+            s = math.sqrt(math.log1p(cv * cv)); mu = -s * s / 2; lv = r.lognormvariate
+            self.buf = [lv(mu, s) for _ in range(n)]
+        self.i = 0
+
+    def next(self) -> float:
+        i = self.i
+        if i >= len(self.buf): self._refill(); i = 0
+        self.i = i + 1
+        return self.buf[i]
+
+
+class _Offsets:
+    # Per-click position noise: uniform jitter (the old cfg["jitter"]) plus a
+    # random walk that drifts around the target but never leaves +-drift_px.
+    def __init__(self, rng: random.Random, jitter_px: float, drift_px: float, block: int = BLOCK):
+        self.rng, self.jitter, self.drift, self.block = rng, float(jitter_px), float(drift_px), block
+        self.step = self.drift * DRIFT_STEP_FRAC
+        self.buf: List[float] = []
+        self.i = 0
+        self.dx = self.dy = 0.0
+
+    def _refill(self):
+        r, j, st = self.rng, self.jitter, self.step
+        u, g = r.uniform, r.gauss
+        # 4 numbers per click: jitter x/y, drift step x/y
+        self.buf = [v for _ in range(self.block)
+                    for v in (u(-j, j), u(-j, j), g(0.0, st) if st else 0.0, g(0.0, st) if st else 0.0)]
+        self.i = 0
+
+    def _walk(self, p: float, step: float) -> float:
+        p += step; b = self.drift
+        if p > b: p = 2 * b - p      # reflect at the bound
+        elif p < -b: p = -2 * b - p
+        return p
+
+    def next(self) -> Tuple[int, int]:
+        i = self.i
+        if i >= len(self.buf): self._refill(); i = 0
+        jx, jy, sx, sy = self.buf[i:i + 4]; self.i = i + 4
+        if self.drift:
+            self.dx = self._walk(self.dx, sx); self.dy = self._walk(self.dy, sy)
+        return int(jx + self.dx), int(jy + self.dy)
+
+
+class Humanizer:
+    # Timing and position noise for the clicker and the player. Every stream
+    # has its own PRNG seeded from (seed, stream name), so a run is replayed
+    # exactly by reusing `seed`, however the streams interleave.
+    def __init__(self, seed: Optional[int] = None, interval_dist: str = "none", interval_cv: float = 0.0,
+                 jitter_px: float = 0.0, drift_px: float = 0.0, delay_dist: str = "none",
+                 delay_cv: float = 0.0, block: int = BLOCK):
+        self.seed = int(seed) if seed else random.randrange(1, 2 ** 31)
+        self.key: Optional[tuple] = None   # settings it was built from, see for_clicker
+        def stream(name: str, dist: str, cv: float) -> Optional[Callable[[], float]]:
+            if dist not in DISTS[1:] or cv <= 0: return None
+            return _Factors(self._rng(name), dist, cv, block).next
+        # None means "no noise" so hot paths can skip the call entirely
+        self.interval_factor = stream("interval", interval_dist, float(interval_cv))
+        self.delay_factor = stream("delay", delay_dist, float(delay_cv))
+        moves = jitter_px > 0 or drift_px > 0
+        self.offset: Optional[Callable[[], Tuple[int, int]]] = \
+            _Offsets(self._rng("position"), jitter_px, drift_px, block).next if moves else None
+
+    def _rng(self, stream: str) -> random.Random:
+        return random.Random(f"{self.seed}:{stream}")
+
+    # -- building from the settings dict -------------------------------------
+    @staticmethod
+    def click_key(cfg: Mapping) -> tuple:
+        return (cfg.get("human_seed", 0), cfg.get("interval_dist", "none"), float(cfg.get("interval_cv", 0.0)),
+                float(cfg.get("jitter", 0.0)), float(cfg.get("drift_px", 0.0)))
+
+    @classmethod
+    def for_clicker(cls, cfg: Mapping) -> "Humanizer":
+        seed, dist, cv, jitter, drift = cls.click_key(cfg)
+        h = cls(seed, dist, cv, jitter, drift); h.key = cls.click_key(cfg)
+        return h
+
+    @classmethod
+    def for_playback(cls, cfg: Mapping) -> Optional["Humanizer"]:
+        dist, cv = cfg.get("playback_dist", "none"), float(cfg.get("playback_delay_cv", 0.0))
+        if dist not in DISTS[1:] or cv <= 0: return None
+        return cls(cfg.get("human_seed", 0), delay_dist=dist, delay_cv=cv)
@@ -0,0 +1,281 @@
+import argparse, json, math, os, sys, time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from macro_config import atomic_write_text
+from macro_model import Macro, NAMES, NO_NAME, KIND_KEY, BINARY_SUFFIX
+
+INDEX_NAME = ".macro_index.json"
+INDEX_VERSION = 2      # 2: hashes are format independent
+MACRO_SUFFIXES = (".json", BINARY_SUFFIX)
+POOL_MIN = 8            # fewer changed files than this are parsed in-process
+KEY_ACTIONS, MOUSE_ACTIONS, LOOP_ACTIONS = ("press", "release"), ("click", "move"), ("repeat", "end")
+MAX_PROBLEMS = 5        # per file in a validate report
+
+
+@dataclass
+class MacroInfo:
+    # one index row: everything the library can show or filter on without
+    # loading the macro again
+    path: str                  # relative to the library root, '/' separated
+    size: int = 0
+    mtime_ns: int = 0
+    events: int = 0
+    duration_ms: float = 0.0
+    keys: List[str] = field(default_factory=list)
+    buttons: List[str] = field(default_factory=list)
+    hash: str = ""
+    error: str = ""
+
+
+def _names_used(m) -> Tuple[set, set]:
+    # -> (key names, button names) straight from the columns / mapped records
+    if isinstance(m, Macro):
+        names = NAMES.names
+        pairs = set(zip(m.kind, m.name))
+    else:
+        from macro_format import HEADER, RECORD
+        ev = m.events; names = ev.strings
+        end = HEADER.size + ev.count * RECORD.size
+        pairs = {(r[0], r[3]) for r in RECORD.iter_unpack(ev.buf[HEADER.size:end])}
+    keys = {names[n] for k, n in pairs if k == KIND_KEY and n != NO_NAME}
+    buttons = {names[n] for k, n in pairs if k != KIND_KEY and n != NO_NAME}
+    return keys, buttons
+
+
+def _close(m):
+    close = getattr(m, "close", None)
+    if close: close()
+
+
+def describe(path: Path, rel: str = "") -> dict:
+    # parse one file into an index row (a dict, so it pickles cheaply from a
+    # pool worker); a file that does not load gets a row with `error` set
+    st = path.stat()
+    info = MacroInfo(rel or path.name, st.st_size, st.st_mtime_ns)
+    try:
+        m = Macro.load(path)
+    except Exception as e:
+        info.error = f"{type(e).__name__}: {e}"; return asdict(info)
+    try:
+        info.events = len(m.events)
+        dur_ns = getattr(m, "duration_ns", None)
+        info.duration_ms = round(dur_ns / 1e6 if dur_ns is not None else m.duration_ms(), 3)
+        keys, buttons = _names_used(m)
+        info.keys, info.buttons = sorted(keys), sorted(buttons)
+        info.hash = m.content_hash()
+    except Exception as e:
+        info.error = f"{type(e).__name__}: {e}"
+    finally:
+        _close(m)
+    return asdict(info)
+
+
+def _describe_job(args) -> dict: return describe(*args)
+
+
+def pool_map(fn, items: list, workers: int = 0):
+    # fn over items in a process pool (workers=0: one per CPU), or in-process
+    # when there is too little work to pay for starting the pool
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(items) < POOL_MIN:
+        return [fn(it) for it in items]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, len(items))) as ex:
+        return list(ex.map(fn, items, chunksize=max(1, len(items) // (workers * 4))))
+
+
+class MacroLibrary:
+    # A folder of macros plus a sidecar index (INDEX_NAME) of their metadata.
+    # rescan() stats every file but only re-parses the ones whose size or
+    # mtime changed; search() works on the index alone.
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.index_path = self.root / INDEX_NAME
+        self.entries: Dict[str, MacroInfo] = {}
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+            if raw.get("version") != INDEX_VERSION: return
+            self.entries = {e["path"]: MacroInfo(**e) for e in raw["entries"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            self.entries = {}   # missing or stale: the next rescan rebuilds it
+
+    def save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = {"version": INDEX_VERSION, "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "entries": [asdict(e) for e in sorted(self.entries.values(), key=lambda e: e.path)]}
+        atomic_write_text(self.index_path, json.dumps(data, indent=1))
+
+    def files(self) -> Iterable[Path]:
+        if not self.root.is_dir(): return
+        for dirpath, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for n in names:
+                if n.lower().endswith(MACRO_SUFFIXES) and not n.startswith("."): yield Path(dirpath) / n
+
+    def rel(self, path: Path) -> str: return Path(path).relative_to(self.root).as_posix()
+    def path(self, info: MacroInfo) -> Path: return self.root / info.path
+
+    def rescan(self, workers: int = 0) -> Tuple[int, int, int]:
+        # -> (added, updated, removed)
+        seen, todo = set(), []
+        for p in self.files():
+            rel = self.rel(p); seen.add(rel)
+            try: st = p.stat()
+            except OSError: continue
+            old = self.entries.get(rel)
+            if old is None or old.size != st.st_size or old.mtime_ns != st.st_mtime_ns: todo.append((p, rel))
+        gone = [r for r in self.entries if r not in seen]
+        added = sum(1 for _, r in todo if r not in self.entries)
+        for r in gone: del self.entries[r]
+        for row in pool_map(_describe_job, todo, workers):
+            self.entries[row["path"]] = MacroInfo(**row)
+        if todo or gone or not self.index_path.exists(): self.save_index()
+        return added, len(todo) - added, len(gone)
+
+    def search(self, text: str = "", keys: Iterable[str] = (), min_ms: Optional[float] = None,
+               max_ms: Optional[float] = None, errors: Optional[bool] = None) -> List[MacroInfo]:
+        # text: substring of the path; keys: every one of them is used; errors:
+        # True for files that failed to load, False for the ones that didn't
+        text = text.lower(); want = {k.lower().strip("<>") for k in keys if k}
+        out = []
+        for e in self.entries.values():
+            if text and text not in e.path.lower(): continue
+            if want and not want <= {k.lower() for k in e.keys}: continue
+            if min_ms is not None and e.duration_ms < min_ms: continue
+            if max_ms is not None and e.duration_ms > max_ms: continue
+            if errors is not None and bool(e.error) != errors: continue
+            out.append(e)
+        return sorted(out, key=lambda e: e.path.lower())
+
+    def duplicates(self) -> List[List[MacroInfo]]:
+        # files with the same content hash
+        by_hash: Dict[str, List[MacroInfo]] = {}
+        for e in self.entries.values():
+            if e.hash: by_hash.setdefault(e.hash, []).append(e)
+        return [sorted(g, key=lambda e: e.path) for g in by_hash.values() if len(g) > 1]
+
+
+# -- bulk operations (run in pool workers) -----------------------------------
+
+def validate(path: Path) -> List[str]:
+    # -> problems found; decodes every event
+    m = Macro.load(path)
+    problems = []
+    try:
+        for i, e in enumerate(m.events):
+            p = None
+            if not math.isfinite(e.delay_ms) or e.delay_ms < 0: p = f"bad delay {e.delay_ms}"
+            elif e.kind == "key":
+                if e.action not in KEY_ACTIONS: p = f"unknown key action {e.action!r}"
+                elif not e.data.get("key"): p = "key event without a key"
+            elif e.kind == "mouse":
+                if e.action not in MOUSE_ACTIONS: p = f"unknown mouse action {e.action!r}"
+            elif e.kind == "loop":
+                if e.action not in LOOP_ACTIONS: p = f"unknown loop action {e.action!r}"
+            else: p = f"unknown kind {e.kind!r}"
+            if p:
+                problems.append(f"event {i}: {p}")
+                if len(problems) >= MAX_PROBLEMS: break
+    finally:
+        _close(m)
+    return problems
+
+def _loaded(path: Path) -> Macro:
+    # an editable copy; a mapped .mcrb is closed so the file can be replaced
+    m = Macro.load(path)
+    if not isinstance(m, Macro):
+        mm, m = m, m.to_macro(); mm.close()
+    return m
+
+def normalize(path: Path) -> bool:
+    # negative delays clamped to 0 and the file rewritten in its canonical
+    # form; -> whether anything changed
+    m = _loaded(path); before = path.read_bytes()
+    m.clamp_delays(0.0)
+    tmp = path.with_name(path.name + ".norm" + path.suffix)
+    try:
+        m.save(tmp)
+        if tmp.read_bytes() == before: return False
+        tmp.replace(path); return True
+    finally:
+        if tmp.exists(): tmp.unlink()
+
+def convert(path: Path, suffix: str, keep: bool = True) -> Path:
+    out = path.with_suffix(suffix)
+    if out == path: return out
+    if out.exists(): raise FileExistsError(f"{out.name} already exists")   # never overwrite another macro
+    _loaded(path).save(out)
+    if not keep: path.unlink()
+    return out
+
+def _bulk_job(args) -> dict:
+    op, path, suffix, keep = args
+    res = {"path": str(path), "ok": True, "detail": ""}
+    try:
+        if op == "validate":
+            problems = validate(path); res["ok"] = not problems; res["detail"] = "; ".join(problems)
+        elif op == "normalize":
+            res["detail"] = "rewritten" if normalize(path) else "unchanged"
+        elif op == "convert":
+            res["detail"] = str(convert(path, suffix, keep))
+    except Exception as e:
+        res["ok"] = False; res["detail"] = f"{type(e).__name__}: {e}"
+    return res
+
+def bulk(lib: MacroLibrary, op: str, suffix: str = BINARY_SUFFIX, keep: bool = True,
+         workers: int = 0) -> List[dict]:
+    # op: validate | normalize | convert, over every macro in the library
+    files = [p for p in lib.files() if not (op == "convert" and p.suffix.lower() == suffix)]
+    res = pool_map(_bulk_job, [(op, p, suffix, keep) for p in files], workers)
+    if op != "validate": lib.rescan(workers)
+    return res
+
+
+# -- command line --------------------------------------------------------------
+
+def _fmt(e: MacroInfo) -> str:
+    if e.error: return f"{e.path}  ERROR {e.error}"
+    keys = ",".join(e.keys[:8]) + ("…" if len(e.keys) > 8 else "")
+    return f"{e.path}  {e.events} events  {e.duration_ms / 1000:.2f}s  keys {keys or '-'}"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Index, search and bulk-process a folder of macros.")
+    ap.add_argument("root", type=Path, help="macro folder (searched recursively)")
+    ap.add_argument("command", choices=("scan", "search", "dupes", "validate", "normalize", "convert"))
+    ap.add_argument("--workers", default=0, type=int, help="worker processes (0 = one per CPU)")
+    ap.add_argument("--text", default="", help="search: path contains")
+    ap.add_argument("--key", action="append", default=[], help="search: uses this key (repeatable)")
+    ap.add_argument("--min-s", type=float, help="search: at least this long")
+    ap.add_argument("--max-s", type=float, help="search: at most this long")
+    ap.add_argument("--errors", action="store_true", help="search: only files that fail to load")
+    ap.add_argument("--to", default=BINARY_SUFFIX, choices=MACRO_SUFFIXES, help="convert: target format")
+    ap.add_argument("--replace", action="store_true", help="convert: delete the source files")
+    args = ap.parse_args(argv)
+
+    lib = MacroLibrary(args.root)
+    t0 = time.perf_counter()
+    if args.command in ("validate", "normalize", "convert"):
+        res = bulk(lib, args.command, args.to, not args.replace, args.workers)
+        bad = [r for r in res if not r["ok"]]
+        for r in res:
+            if not r["ok"] or args.command != "validate": print(f"{'ok ' if r['ok'] else 'BAD'} {r['path']}  {r['detail']}")
+        print(f"{args.command}: {len(res)} files, {len(bad)} failed, {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+        return 1 if bad else 0
+    added, updated, removed = lib.rescan(args.workers)
+    if args.command == "scan":
+        print(f"{len(lib.entries)} macros indexed ({added} new, {updated} changed, {removed} removed) "
+              f"in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    elif args.command == "dupes":
+        for g in lib.duplicates(): print("  ".join(e.path for e in g))
+    else:
+        ms = lambda s: None if s is None else s * 1000
+        for e in lib.search(args.text, args.key, ms(args.min_s), ms(args.max_s), True if args.errors else None):
+            print(_fmt(e))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
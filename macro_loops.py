@@ -0,0 +1,136 @@
+import json, time
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from macro_model import Macro, MacroEvent, KIND_LOOP, LOOP_BEGIN, LOOP_END
+from macro_edit import Batch, DeleteRanges, InsertRows, SetValues, runs
+
+@dataclass
+class CompressOptions:
+    min_repeats: int = 3          # a sequence must occur this often in a row
+    max_period: int = 512         # longest repeated sequence looked for, in events
+    delay_tol_ms: float = 25.0    # delays of a repetition may differ by this much...
+    delay_tol_frac: float = 0.1   # ...or by this fraction of the delay, whichever is larger
+    candidates: int = 8           # periods tried per position (next occurrences of the same event)
+
+@dataclass(frozen=True)
+class RepeatBlock:
+    start: int    # first row of the first pass, in the original macro
+    period: int   # rows per pass
+    count: int
+
+@dataclass(frozen=True)
+class CompressReport:
+    events_before: int
+    events_after: int
+    blocks: int
+    json_bytes_before: int = 0
+    json_bytes_after: int = 0
+    load_ms_before: float = 0.0
+    load_ms_after: float = 0.0
+
+    @property
+    def ratio(self) -> float: return self.events_before / max(1, self.events_after)
+
+    def text(self) -> str:
+        s = f"{self.events_before} -> {self.events_after} rows in {self.blocks} repeat blocks ({self.ratio:.1f}x)"
+        if self.json_bytes_before:
+            s += (f", JSON {self.json_bytes_before / 1024:.0f} -> {self.json_bytes_after / 1024:.0f} KB"
+                  f", load {self.load_ms_before:.0f} -> {self.load_ms_after:.0f} ms")
+        return s
+
+
+def _tokens(m: Macro) -> array:
+    # one id per row for everything but the delay; loop rows get unique ids so
+    # existing blocks never become part of a new one
+    ids = {}; out = array("l")
+    for i, row in enumerate(zip(m.kind, m.action, m.name, m.x, m.y, m.pressed)):
+        if row[0] == KIND_LOOP: out.append(-1 - i)
+        else: out.append(ids.setdefault(row, len(ids)))
+    return out
+
+def _close(a: float, b: float, o: CompressOptions) -> bool:
+    return abs(a - b) <= max(o.delay_tol_ms, o.delay_tol_frac * b)
+
+def _passes(d, i: int, L: int, k: int, o: CompressOptions) -> int:
+    # how many of the k token-equal passes at i also agree on delays. Row 0 of
+    # the first pass is the gap before the block, so it only has to be at least
+    # as long as the gap between passes.
+    for r in range(1, k):
+        base = i + r * L
+        if r >= 2 and not _close(d[base], d[i + L], o): return r
+        for t in range(1, L):
+            if not _close(d[base + t], d[i + t], o): return r
+    if k >= 2 and d[i] < d[i + L] - o.delay_tol_ms: return 1
+    return k
+
+def find_repeats(m: Macro, o: Optional[CompressOptions] = None) -> List[RepeatBlock]:
+    # Greedy left to right: at each row, try the periods given by the next few
+    # occurrences of the same event, extend each by whole passes while tokens
+    # (then delays) match and keep the one that saves the most rows.
+    o = o or CompressOptions()
+    tok = _tokens(m); d = m.delay; n = len(tok)
+    nxt = array("l", [-1]) * n; seen = {}
+    for i in range(n - 1, -1, -1):
+        nxt[i] = seen.get(tok[i], -1); seen[tok[i]] = i
+    out: List[RepeatBlock] = []
+    i = 0
+    while i < n:
+        best = None; j = nxt[i]; tried = 0
+        while j != -1 and j - i <= o.max_period and tried < o.candidates:
+            L = j - i; tried += 1
+            if j + L <= n and tok[j + L - 1] == tok[i + L - 1] and tok[i:j] == tok[j:j + L]:
+                body = tok[i:j]; k = 2
+                while i + (k + 1) * L <= n and tok[i + k * L:i + (k + 1) * L] == body: k += 1
+                k = _passes(d, i, L, k, o)
+                saved = (k - 1) * L - 2
+                if k >= o.min_repeats and saved > 0 and (best is None or saved > best[0]): best = (saved, L, k)
+            j = nxt[j]
+        if best:
+            _, L, k = best; out.append(RepeatBlock(i, L, k)); i += L * k
+        else:
+            i += 1
+    return out
+
+def _marker(action: str, count: int, delay_ms: float) -> dict:
+    data = {"count": count} if action == LOOP_BEGIN else {}
+    return Macro((MacroEvent("loop", action, data, delay_ms),)).take(0, 1)
+
+def compress_edit(m: Macro, o: Optional[CompressOptions] = None) -> Tuple[Optional[Batch], List[RepeatBlock]]:
+    # the repeats of m rewritten as repeat blocks, as one undoable edit: each
+    # block keeps its first pass with the mean delays of all passes, loses the
+    # others, and gets a "repeat" row before and an "end" row after it
+    blocks = find_repeats(m, o)
+    if not blocks: return None, blocks
+    d = m.delay; idx, vals, gone, inserts = [], [], [], []
+    removed = 0
+    for b, blk in enumerate(blocks):
+        i, L, k = blk.start, blk.period, blk.count
+        body0 = sum(d[i + r * L] for r in range(1, k)) / (k - 1)   # gap between passes
+        idx.append(i); vals.append(round(body0, 3))
+        for t in range(1, L):
+            idx.append(i + t); vals.append(round(sum(d[i + r * L + t] for r in range(k)) / k, 3))
+        gone.extend(range(i + L, i + k * L))
+        at = i - removed + 2 * b   # where the block starts once earlier rows are gone and markers are in
+        inserts.append(InsertRows(at, _marker(LOOP_BEGIN, k, round(max(0.0, d[i] - body0), 3))))
+        inserts.append(InsertRows(at + 1 + L, _marker(LOOP_END, 1, 0.0)))
+        removed += (k - 1) * L
+    edits = [SetValues("delay", idx, vals, m), DeleteRanges(runs(gone))] + inserts
+    return Batch(edits, "compress loops"), blocks
+
+def _json_cost(m: Macro) -> Tuple[int, float]:
+    # bytes of the saved JSON, and ms to load it back into a Macro
+    text = json.dumps({"events": m.to_dicts(), "target_hwnd": m.target_hwnd}, indent=2)
+    t = time.perf_counter()
+    raw = json.loads(text); Macro((MacroEvent(**e) for e in raw["events"]), raw.get("target_hwnd"))
+    return len(text.encode("utf-8")), (time.perf_counter() - t) * 1000
+
+def compress(m: Macro, o: Optional[CompressOptions] = None, measure: bool = False) -> Tuple[Macro, CompressReport]:
+    # -> (compressed copy, report); measure also saves and reloads both as
+    # JSON to report the size and load time saved
+    if not isinstance(m, Macro): m = m.to_macro()
+    e, blocks = compress_edit(m, o)
+    out = m.copy()
+    if e is not None: e.apply(out)
+    sizes = (*_json_cost(m), *_json_cost(out)) if measure else (0, 0.0, 0, 0.0)
+    return out, CompressReport(len(m), len(out), len(blocks), sizes[0], sizes[2], sizes[1], sizes[3])
@@ -0,0 +1,147 @@
+import json, threading, time
+from pathlib import Path
+from typing import Dict, List, Optional
+from macro_config import atomic_write_text
+
+# HDR-style log-linear buckets: exact below 2*SUB ns, then SUB buckets per
+# power of two (~3% relative error). Recording is a bit_length and one list
+# increment, cheap enough to leave on for every injected event.
+SUB_BITS = 5
+SUB = 1 << SUB_BITS
+MAX_NS = 1 << 40   # ~18 minutes; larger values land in the top bucket
+N_BUCKETS = 2 * SUB + (MAX_NS.bit_length() - SUB_BITS - 2) * SUB
+# le bounds for the Prometheus export, in ms
+PROM_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+def bucket_index(v: int) -> int:
+    if v < 2 * SUB: return v if v > 0 else 0
+    if v >= MAX_NS: return N_BUCKETS - 1
+    shift = v.bit_length() - SUB_BITS - 1
+    return 2 * SUB + (shift - 1) * SUB + (v >> shift) - SUB
+
+def bucket_bounds(i: int):
+    # -> (lowest, highest) value that lands in bucket i
+    if i < 2 * SUB: return i, i
+    shift, sub = divmod(i - 2 * SUB, SUB)
+    shift += 1; sub += SUB
+    return sub << shift, ((sub + 1) << shift) - 1
+
+
+class Histogram:
+    # Counts are plain list slots; a concurrent record() from a second thread
+    # can at worst lose one count, which is fine for diagnostics.
+    def __init__(self, name: str, help: str = ""):
+        self.name, self.help = name, help
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0; self.sum_ns = 0
+        self.min_ns = 0; self.max_ns = 0
+
+    def record(self, v_ns: int):
+        if v_ns < 0: v_ns = 0
+        self.counts[bucket_index(v_ns)] += 1
+        if not self.count or v_ns < self.min_ns: self.min_ns = v_ns
+        if v_ns > self.max_ns: self.max_ns = v_ns
+        self.count += 1; self.sum_ns += v_ns
+
+    def merge(self, other: "Histogram"):
+        if not other.count: return
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.min_ns = other.min_ns if not self.count else min(self.min_ns, other.min_ns)
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.count += other.count; self.sum_ns += other.sum_ns
+
+    def percentile(self, q: float) -> int:
+        if not self.count: return 0
+        want = max(1, int(round(q / 100.0 * self.count)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= want:
+                lo, hi = bucket_bounds(i)
+                return min(self.max_ns, (lo + hi) // 2)
+        return self.max_ns
+
+    def summary(self) -> dict:
+        ms = lambda ns: round(ns / 1e6, 4)
+        return {"count": self.count,
+                "min_ms": ms(self.min_ns),
+                "mean_ms": ms(self.sum_ns / self.count) if self.count else 0.0,
+                "p50_ms": ms(self.percentile(50)), "p90_ms": ms(self.percentile(90)),
+                "p99_ms": ms(self.percentile(99)), "p999_ms": ms(self.percentile(99.9)),
+                "max_ms": ms(self.max_ns)}
+
+    def to_dict(self) -> dict:
+        d = self.summary(); d["help"] = self.help
+        # sparse: [highest value in bucket (ms), count]
+        d["buckets"] = [[round(bucket_bounds(i)[1] / 1e6, 6), c] for i, c in enumerate(self.counts) if c]
+        return d
+
+    def prometheus(self, prefix: str) -> List[str]:
+        name = f"{prefix}_{self.name}_seconds"
+        out = [f"# HELP {name} {self.help or self.name}", f"# TYPE {name} histogram"]
+        counts = self.counts; i = 0; cum = 0
+        for le in PROM_BOUNDS_MS:
+            limit = int(le * 1_000_000)
+            while i < N_BUCKETS and bucket_bounds(i)[1] <= limit:
+                cum += counts[i]; i += 1
+            out.append(f'{name}_bucket{{le="{le / 1000:g}"}} {cum}')
+        out.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum {self.sum_ns / 1e9:.9f}")
+        out.append(f"{name}_count {self.count}")
+        return out
+
+
+class Metrics:
+    def __init__(self, prefix: str = "macroclicker"):
+        self.prefix = prefix
+        self.enabled = True
+        self.hists: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def hist(self, name: str, help: str = "") -> Histogram:
+        h = self.hists.get(name)
+        if h is None:
+            with self._lock:
+                h = self.hists.setdefault(name, Histogram(name, help))
+        return h
+
+    def reset(self):
+        for h in list(self.hists.values()): h.reset()
+
+    def summary_text(self, names: Optional[List[str]] = None) -> str:
+        parts = []
+        for name in names or list(self.hists):
+            h = self.hists.get(name)
+            if h is None or not h.count: continue
+            parts.append(f"{name} p99 {h.percentile(99) / 1e6:.2f}/max {h.max_ns / 1e6:.2f} ms")
+        return ", ".join(parts)
+
+    def to_json(self) -> str:
+        return json.dumps({"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                           "histograms": {n: h.to_dict() for n, h in list(self.hists.items())}}, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        for h in list(self.hists.values()): lines += h.prometheus(self.prefix)
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path, fmt: str = "json") -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(path, self.to_prometheus() if fmt == "prom" else self.to_json())
+        return path
+
+
+# process-wide registry; the engine, scheduler and hotkeys record into it
+METRICS = Metrics()
+PLAY_LATE = METRICS.hist("playback_late", "macro event actual minus scheduled time")
+PLAY_INJECT = METRICS.hist("playback_inject", "macro event injection call duration")
+CLICK_LATE = METRICS.hist("click_late", "auto click tick actual minus scheduled time")
+CLICK_INJECT = METRICS.hist("click_inject", "auto click tick injection call duration")
+FOCUS = METRICS.hist("focus", "focus_window (SetForegroundWindow) duration")
+HOTKEY = METRICS.hist("hotkey", "hotkey key press in the hook to action done")
+HOOK = METRICS.hist("input_hook", "keyboard hook callback duration (hotkey match + recording)")
+TRIGGER_POLL = METRICS.hist("trigger_poll", "trigger region capture and compare, per frame")
@@ -0,0 +1,245 @@
+import json, hashlib
+from array import array
+from itertools import compress, repeat
+from operator import mul
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Literal, Optional
+from macro_capture import NameTable
+
+BINARY_SUFFIX = ".mcrb"
+
+# key names, button names and actions, interned once per process
+NAMES = NameTable()
+NO_NAME = 0xFFFF
+KIND_KEY, KIND_MOUSE, KIND_LOOP = 0, 1, 2
+KINDS = ("key", "mouse", "loop")
+# loop rows bracket a repeat block: "repeat" (x = count) ... "end"; the rows
+# between them play count times, see macro_loops
+LOOP_BEGIN, LOOP_END = "repeat", "end"
+
+@dataclass
+class MacroEvent:
+    kind: Literal["key","mouse","loop"]
+    action: str
+    data: dict
+    delay_ms: float
+
+
+def _ms(d: float):
+    return int(d) if float(d).is_integer() else d
+
+
+def loop_span(kinds, actions, counts, delays):
+    # total play time of rows that may hold repeat blocks (nested or not): at
+    # an "end" the time since its "repeat" counts `count` times. An "end"
+    # without a "repeat" is ignored; a block left open runs to the end.
+    total = 0; stack = []
+    for k, a, c, d in zip(kinds, actions, counts, delays):
+        total += d
+        if k != KIND_LOOP: continue
+        if a == LOOP_BEGIN: stack.append((total, c))
+        elif stack:
+            start, c = stack.pop(); total = start + (total - start) * c
+    while stack:
+        start, c = stack.pop(); total = start + (total - start) * c
+    return total
+
+
+class _EventsView:
+    # list-like view over the columns, so code written against
+    # List[MacroEvent] keeps working; events are built on access
+    def __init__(self, m: "Macro"): self.m = m
+    def __len__(self): return len(self.m.kind)
+    def __bool__(self): return len(self.m.kind) > 0
+    def __iter__(self) -> Iterator[MacroEvent]:
+        m = self.m
+        return map(m._event, range(len(m.kind)))
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.m._event(j) for j in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError(i)
+        return self.m._event(i)
+    def __eq__(self, other):
+        try: return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError: return NotImplemented
+    def append(self, e: MacroEvent): self.m.append(e)
+    def extend(self, evs: Iterable[MacroEvent]): self.m.extend(evs)
+
+
+class Macro:
+    # Struct-of-arrays storage: one typed column per field instead of a
+    # MacroEvent + dict per event (~21 bytes/event instead of several hundred).
+    # Key/button/action names are ids into NAMES. content_hash() is memoized:
+    # assigning a column or calling a row method drops it, code that writes
+    # into a column in place must call changed().
+    COLUMNS = (("kind", "B"), ("action", "H"), ("name", "H"), ("x", "i"), ("y", "i"),
+               ("pressed", "B"), ("delay", "d"))
+    _COLUMN_NAMES = frozenset(c for c, _ in COLUMNS)
+    _hash: Optional[str] = None
+
+    def __setattr__(self, k, v):
+        if k in self._COLUMN_NAMES and self._hash is not None: object.__setattr__(self, "_hash", None)
+        object.__setattr__(self, k, v)
+
+    def changed(self):
+        if self._hash is not None: self._hash = None
+
+    def __init__(self, events: Iterable[MacroEvent] = (), target_hwnd: Optional[int] = None):
+        for col, tc in self.COLUMNS: setattr(self, col, array(tc))
+        self.target_hwnd = target_hwnd  # window handle recorded in
+        self.extend(events)
+
+    @classmethod
+    def from_columns(cls, target_hwnd: Optional[int] = None, **cols) -> "Macro":
+        m = cls(target_hwnd=target_hwnd)
+        for col, tc in cls.COLUMNS: setattr(m, col, array(tc, cols[col]))
+        return m
+
+    def copy(self) -> "Macro":
+        m = Macro.from_columns(self.target_hwnd, **{c: getattr(self, c) for c, _ in self.COLUMNS})
+        m._hash = self._hash; return m
+
+    @property
+    def events(self) -> _EventsView: return _EventsView(self)
+
+    @events.setter
+    def events(self, evs: Iterable[MacroEvent]):
+        evs = list(evs)
+        for col, tc in self.COLUMNS: setattr(self, col, array(tc))
+        self.extend(evs)
+
+    def __len__(self): return len(self.kind)
+
+    def __repr__(self):
+        return f"Macro({len(self)} events, target_hwnd={self.target_hwnd})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Macro): return NotImplemented
+        return self.target_hwnd == other.target_hwnd and \
+            all(getattr(self, c) == getattr(other, c) for c, _ in self.COLUMNS)
+
+    def append(self, e: MacroEvent):
+        d = e.data; intern = NAMES.intern; self.changed()
+        self.kind.append(KIND_KEY if e.kind == "key" else KIND_LOOP if e.kind == "loop" else KIND_MOUSE)
+        self.action.append(intern(e.action))
+        if e.kind == "key":
+            self.name.append(intern(str(d.get("key", "")))); self.x.append(0); self.y.append(0)
+            self.pressed.append(0)
+        elif e.kind == "loop":
+            self.name.append(NO_NAME); self.x.append(max(1, int(d.get("count", 1)))); self.y.append(0)
+            self.pressed.append(0)
+        else:
+            self.name.append(intern(str(d["button"])) if "button" in d else NO_NAME)
+            self.x.append(int(d.get("x", 0))); self.y.append(int(d.get("y", 0)))
+            self.pressed.append(1 if d.get("pressed") else 0)
+        self.delay.append(max(0.0, float(e.delay_ms)))
+
+    def extend(self, evs: Iterable[MacroEvent]):
+        for e in evs: self.append(e)
+
+    def _row(self, e: MacroEvent) -> tuple:
+        one = Macro((e,)); return tuple(getattr(one, c)[0] for c, _ in self.COLUMNS)
+
+    # -- single-row edits (array insert/delete are memmoves, no Python loop) --
+    def set_event(self, i: int, e: MacroEvent):
+        for (c, _), v in zip(self.COLUMNS, self._row(e)): getattr(self, c)[i] = v
+        self.changed()
+
+    def insert(self, i: int, e: MacroEvent):
+        for (c, _), v in zip(self.COLUMNS, self._row(e)): getattr(self, c).insert(i, v)
+        self.changed()
+
+    def delete(self, i: int):
+        for c, _ in self.COLUMNS: del getattr(self, c)[i]
+        self.changed()
+
+    def move(self, i: int, j: int):
+        for c, _ in self.COLUMNS:
+            col = getattr(self, c); v = col.pop(i); col.insert(j, v)
+        self.changed()
+
+    # -- block edits: rows travel as {column: array} slices ------------------
+    def take(self, start: int, stop: int) -> dict:
+        return {c: getattr(self, c)[start:stop] for c, _ in self.COLUMNS}
+
+    def delete_range(self, start: int, stop: int):
+        for c, _ in self.COLUMNS: del getattr(self, c)[start:stop]
+        self.changed()
+
+    def insert_rows(self, at: int, rows: dict):
+        for c, _ in self.COLUMNS: getattr(self, c)[at:at] = rows[c]
+        self.changed()
+
+    def _event(self, i: int) -> MacroEvent:
+        names = NAMES.names; n = self.name[i]
+        if self.kind[i] == KIND_KEY:
+            data = {"key": names[n]}
+        elif self.kind[i] == KIND_LOOP:
+            data = {"count": self.x[i]} if names[self.action[i]] == LOOP_BEGIN else {}
+        elif n == NO_NAME:
+            data = {"x": self.x[i], "y": self.y[i]}
+        else:
+            data = {"x": self.x[i], "y": self.y[i], "button": names[n], "pressed": bool(self.pressed[i])}
+        return MacroEvent(KINDS[self.kind[i]], names[self.action[i]], data, _ms(self.delay[i]))
+
+    # -- bulk transforms, one pass per column --------------------------------
+    def scale_delays(self, factor: float):
+        self.delay = array("d", map(mul, self.delay, repeat(max(0.0, float(factor)))))
+
+    def clamp_delays(self, lo: float = 0.0, hi: Optional[float] = None):
+        lo = max(0.0, float(lo)); hi = float("inf") if hi is None else float(hi)
+        self.delay = array("d", (lo if d < lo else hi if d > hi else d for d in self.delay))
+
+    def offset(self, dx: int, dy: int):
+        # only mouse rows move; key rows keep x = y = 0 and loop rows their count
+        k = self.kind
+        self.x = array("i", (v + dx if m == KIND_MOUSE else v for v, m in zip(self.x, k)))
+        self.y = array("i", (v + dy if m == KIND_MOUSE else v for v, m in zip(self.y, k)))
+
+    def select(self, keep: Iterable) -> "Macro":
+        # keep: one truthy/falsy flag per event
+        keep = list(keep)
+        return Macro.from_columns(self.target_hwnd,
+                                  **{c: compress(getattr(self, c), keep) for c, _ in self.COLUMNS})
+
+    def duration_ms(self) -> float:
+        if KIND_LOOP not in self.kind: return sum(self.delay)
+        names = NAMES.names
+        return loop_span(self.kind, (names[a] for a in self.action), self.x, self.delay)
+
+    def has_loops(self) -> bool: return KIND_LOOP in self.kind
+
+    # -- persistence ---------------------------------------------------------
+    def content_hash(self) -> str:
+        # ids are process-local, so names are hashed by value; delays in whole
+        # µs, as .mcrb stores them, so a macro hashes the same in either format
+        if self._hash is not None: return self._hash
+        names = NAMES.names
+        h = hashlib.blake2b(digest_size=16)
+        for col in (self.kind, self.x, self.y, self.pressed): h.update(col.tobytes())
+        h.update(array("q", [round(d * 1000) for d in self.delay]).tobytes())
+        for col in (self.action, self.name):
+            h.update("\0".join([names[i] if i != NO_NAME else "" for i in col]).encode("utf-8"))
+        self._hash = h.hexdigest(); return self._hash
+
+    def to_dicts(self) -> List[dict]:
+        return [{"kind": e.kind, "action": e.action, "data": e.data, "delay_ms": e.delay_ms} for e in self.events]
+
+    def save(self, path: Path):
+        if path.suffix.lower() == BINARY_SUFFIX:
+            from macro_format import write_binary
+            write_binary(self, path); return
+        data = {"events": self.to_dicts(), "target_hwnd": self.target_hwnd}
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+    @staticmethod
+    def load(path: Path) -> "Macro":
+        from macro_format import is_binary, MappedMacro
+        if is_binary(path): return MappedMacro(path)
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(raw, dict):
+            return Macro((MacroEvent(**e) for e in raw["events"]), raw.get("target_hwnd"))
+        else:  # backward-compat for old files that were just a list
+            return Macro((MacroEvent(**e) for e in raw), None)
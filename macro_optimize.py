@@ -0,0 +1,135 @@
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from macro_model import Macro, NAMES, KIND_KEY, KIND_LOOP, NO_NAME
+from macro_edit import Batch, DeleteRanges, SetValues, runs
+
+_A_PRESS, _A_RELEASE, _A_MOVE = (NAMES.intern(a) for a in ("press", "release", "move"))
+
+@dataclass
+class OptimizeOptions:
+    coalesce: bool = True            # autorepeat presses, same-spot moves
+    drop_orphans: bool = True        # releases of keys/buttons that were never pressed
+    lead_ms: Optional[float] = 0.0   # delay before the first event; None keeps it
+    max_gap_ms: float = 0.0          # clamp longer delays to this, 0 = off
+    trim_tail_moves: bool = True     # cursor travel after the last key/click (e.g. to the stop button)
+    quantize_ms: float = 0.0         # snap event times to this grid, 0 = off
+    fast_min_ms: float = 0.0         # "as fast as safely possible": every delay becomes this, 0 = off
+
+@dataclass(frozen=True)
+class PassReport:
+    name: str
+    events_removed: int
+    ms_removed: float
+
+
+class _Work:
+    # the macro being optimized, plus the original index of every row it still
+    # has, so the result can also be expressed as an edit on the original
+    def __init__(self, m: Macro):
+        self.m = m.copy()
+        self.idx = array("l", range(len(m)))
+
+    def drop(self, flags: List[bool]):
+        # removed rows hand their delay on to the next kept row, so timing of
+        # everything after them is unchanged
+        m = self.m; carry = 0.0; delay = array("d")
+        for d, f in zip(m.delay, flags):
+            if f: carry += d
+            else: delay.append(d + carry); carry = 0.0
+        keep = [not f for f in flags]
+        self.idx = array("l", (i for i, k in zip(self.idx, keep) if k))
+        self.m = m.select(keep); self.m.delay = delay
+
+
+def _coalesce(w: _Work):
+    # a release followed by a press is kept even with no gap in between:
+    # quantize / fast / set delay 0 make such gaps out of real double taps
+    m = w.m
+    drop = [False] * len(m)
+    keys_down, pos = set(), None
+    for i, (k, a, name) in enumerate(zip(m.kind, m.action, m.name)):
+        if k == KIND_LOOP:
+            pos = None   # a repeat block edge: the cursor may be anywhere
+        elif k == KIND_KEY:
+            if a == _A_PRESS:
+                if name in keys_down: drop[i] = True  # autorepeat
+                keys_down.add(name)
+            elif a == _A_RELEASE:
+                keys_down.discard(name)
+        else:
+            xy = (m.x[i], m.y[i])
+            if a == _A_MOVE and xy == pos: drop[i] = True
+            pos = xy
+    w.drop(drop)
+
+def _drop_orphans(w: _Work):
+    m = w.m
+    drop = [False] * len(m)
+    keys_down, buttons_down = set(), set()
+    for i, (k, a, name, p) in enumerate(zip(m.kind, m.action, m.name, m.pressed)):
+        if k == KIND_LOOP: continue
+        if k == KIND_KEY:
+            if a == _A_PRESS: keys_down.add(name)
+            elif a == _A_RELEASE:
+                if name in keys_down: keys_down.discard(name)
+                else: drop[i] = True
+        elif a != _A_MOVE and name != NO_NAME:
+            if p: buttons_down.add(name)
+            elif name in buttons_down: buttons_down.discard(name)
+            else: drop[i] = True
+    w.drop(drop)
+
+def _trim_idle(w: _Work, o: OptimizeOptions):
+    m = w.m
+    if o.trim_tail_moves:
+        last = max((i for i, a in enumerate(m.action) if a != _A_MOVE), default=None)
+        if last is not None and last < len(m) - 1:
+            w.drop([i > last for i in range(len(m))]); m = w.m
+    if o.max_gap_ms > 0: m.clamp_delays(0.0, o.max_gap_ms)
+    if o.lead_ms is not None and len(m):
+        m.delay[0] = min(m.delay[0], max(0.0, float(o.lead_ms))); m.changed()
+
+def _quantize(w: _Work, step: float):
+    # snap absolute times, not delays, so rounding errors do not add up
+    m = w.m; t = 0.0; prev = 0.0; out = array("d")
+    for d in m.delay:
+        t += d
+        q = round(t / step) * step
+        out.append(max(0.0, round(q - prev, 6))); prev = q
+    m.delay = out
+
+def _fast(w: _Work, min_ms: float):
+    m = w.m
+    m.delay = array("d", [float(min_ms)]) * len(m)
+
+
+def optimize(m: Macro, o: Optional[OptimizeOptions] = None) -> Tuple[Macro, List[PassReport], array]:
+    # -> (optimized copy, one report per pass that ran, original index of every kept row)
+    o = o or OptimizeOptions()
+    if not isinstance(m, Macro): m = m.to_macro()
+    passes = []
+    if o.drop_orphans: passes.append(("drop orphans", _drop_orphans))
+    if o.coalesce: passes.append(("coalesce", _coalesce))
+    passes.append(("trim idle", lambda w: _trim_idle(w, o)))
+    if o.quantize_ms > 0: passes.append(("quantize", lambda w: _quantize(w, float(o.quantize_ms))))
+    if o.fast_min_ms > 0: passes.append(("fast", lambda w: _fast(w, o.fast_min_ms)))
+    w = _Work(m); reports = []
+    for name, fn in passes:
+        n0, t0 = len(w.m), w.m.duration_ms()
+        fn(w)
+        reports.append(PassReport(name, n0 - len(w.m), round(t0 - w.m.duration_ms(), 3)))
+    return w.m, reports, w.idx
+
+def optimize_edit(m: Macro, o: Optional[OptimizeOptions] = None) -> Tuple[Optional[Batch], List[PassReport]]:
+    # the optimizer result as an undoable edit on m: new delays on the kept rows,
+    # then the dropped rows deleted
+    out, reports, kept = optimize(m, o)
+    if out == m: return None, reports
+    gone = sorted(set(range(len(m))) - set(kept))
+    edits = [SetValues("delay", kept, out.delay, m), DeleteRanges(runs(gone))]
+    return Batch(edits, "optimize"), reports
+
+def summary_text(reports: List[PassReport]) -> str:
+    return ", ".join(f"{r.name} -{r.events_removed} ev {-r.ms_removed:+g} ms"
+                     for r in reports if r.events_removed or r.ms_removed) or "nothing to optimize"
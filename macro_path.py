@@ -0,0 +1,70 @@
+from typing import Callable, Iterator, List, Optional, Tuple
+
+Point = Tuple[int, int, int]   # (ts_ns, x, y)
+
+def _dist_to_segment(p: Point, a: Point, b: Point) -> float:
+    ax, ay, bx, by, px, py = a[1], a[2], b[1], b[2], p[1], p[2]
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return ((px - ax) ** 2 + (py - ay) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / float(dx * dx + dy * dy)))
+    return ((px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2) ** 0.5
+
+
+class PathSimplifier:
+    # Streaming Ramer-Douglas-Peucker: keeps the points seen since the last
+    # emitted anchor and emits a new anchor as soon as a straight line from the
+    # anchor to the newest point would miss one of them by more than
+    # `tolerance_px`. Samples closer than `min_interval_ns` to the previous one
+    # are decimated (only the newest is kept). Work and memory per sample are
+    # bounded by `max_window`.
+    def __init__(self, emit: Callable[[int, int, int], None], tolerance_px: float = 2.0,
+                 min_interval_ns: int = 8_000_000, max_window: int = 64):
+        self.emit = emit
+        self.tolerance = float(tolerance_px)
+        self.min_interval_ns = int(min_interval_ns)
+        self.max_window = max_window
+        self.reset()
+
+    def reset(self):
+        self.anchor: Optional[Point] = None
+        self.window: List[Point] = []
+        self.tail: Optional[Point] = None   # newest decimated sample
+        self.last_ts = 0
+
+    def _emit(self, p: Point):
+        self.anchor = p; self.emit(*p)
+
+    def add(self, ts: int, x: int, y: int):
+        p = (ts, x, y)
+        if self.anchor is None:
+            self.last_ts = ts; self._emit(p); return
+        if ts - self.last_ts < self.min_interval_ns:
+            self.tail = p; return
+        self.tail = None; self.last_ts = ts
+        w = self.window
+        if w:
+            a = self.anchor
+            for q in w:
+                if _dist_to_segment(q, a, p) > self.tolerance:
+                    self._emit(w[-1]); w.clear(); break
+        w.append(p)
+        if len(w) >= self.max_window:
+            self._emit(w[-1]); w.clear()
+
+    def flush(self):
+        # emit whatever is pending so the recorded path ends where the cursor is
+        if self.tail is not None:
+            t = self.tail; self.last_ts = -self.min_interval_ns; self.add(*t)
+        if self.window:
+            last = self.window[-1]; self.window.clear()
+            if last != self.anchor: self._emit(last)
+
+
+def interpolate(off0: int, x0: int, y0: int, off1: int, x1: int, y1: int,
+                step_ns: int) -> Iterator[Tuple[int, int, int]]:
+    # intermediate points strictly between two recorded moves, one per step
+    n = (off1 - off0) // step_ns if step_ns > 0 else 0
+    for i in range(1, n):
+        f = i / n
+        yield (off0 + int((off1 - off0) * f), int(round(x0 + (x1 - x0) * f)), int(round(y0 + (y1 - y0) * f)))
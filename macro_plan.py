@@ -0,0 +1,179 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from macro_backend import BATCH_OPS
+from macro_path import interpolate
+from macro_model import Macro, NAMES, NO_NAME, KIND_KEY, KIND_MOUSE, KIND_LOOP, LOOP_BEGIN, LOOP_END, loop_span
+
+PLAN_CACHE_SIZE = 8
+
+# one op = (offset from start of the run in ns, callable, argument tuple)
+Op = Tuple[int, Callable[..., Any], tuple]
+
+class _Block:
+    # a repeat block of a compiled plan: items are ops with offsets from the
+    # block start, or (offset, _Block) for a nested block; dur is one pass
+    __slots__ = ("count", "items", "dur")
+    def __init__(self, count: int):
+        self.count, self.items, self.dur = count, [], 0
+
+def _walk(b: _Block, base: int) -> Iterator[Op]:
+    for it in b.items:
+        if len(it) == 3: yield (base + it[0], it[1], it[2])
+        else:
+            off, inner = it
+            for r in range(inner.count): yield from _walk(inner, base + off + r * inner.dur)
+
+def _op_count(b: _Block) -> int:
+    return sum(1 if len(it) == 3 else it[1].count * _op_count(it[1]) for it in b.items)
+
+
+@dataclass(frozen=True)
+class PlaybackPlan:
+    ops: List[Op]      # flat op list; empty when the macro has repeat blocks, see run()
+    duration_ns: int   # offset at which the next loop iteration starts
+    content_hash: str
+    root: Optional[_Block] = None
+    op_count: int = 0
+
+    def run(self):
+        # one iteration's ops; repeat blocks are walked `count` times instead
+        # of being expanded into a list
+        return self.ops if self.root is None else _LoopOps(self)
+
+class _LoopOps:
+    def __init__(self, plan: PlaybackPlan): self.plan = plan
+    def __iter__(self) -> Iterator[Op]: return _walk(self.plan.root, 0)
+    def __len__(self) -> int: return self.plan.op_count
+
+
+def _event_rows(events):
+    for e in events:
+        d = e.data
+        if e.kind == "key":
+            yield (KIND_KEY, e.action, d["key"], 0, 0, False, e.delay_ms)
+        elif e.kind == "loop":
+            yield (KIND_LOOP, e.action, None, d.get("count", 1), 0, False, e.delay_ms)
+        else:
+            yield (KIND_MOUSE, e.action, d.get("button"), d.get("x", 0), d.get("y", 0), d.get("pressed"), e.delay_ms)
+
+def _column_rows(m):
+    names = NAMES.names
+    for k, a, n, x, y, p, d in zip(m.kind, m.action, m.name, m.x, m.y, m.pressed, m.delay):
+        yield (k, names[a], names[n] if n != NO_NAME else None, x, y, p, d)
+
+def _ns(delay_ms) -> int: return max(0, int(round(float(delay_ms) * 1_000_000)))
+
+def iter_ops(events, io, move_hz: float = 0, markers: bool = False) -> Iterator[Op]:
+    # recorded paths are simplified, so with move_hz > 0 consecutive moves are
+    # re-densified to that rate by linear interpolation. Repeat blocks are
+    # replayed from a buffer of their first pass, or with markers=True left to
+    # the caller as (offset, None, (LOOP_BEGIN, count)) / (offset, None,
+    # (LOOP_END, pass duration)); offsets are real time either way.
+    step = int(1e9 / move_hz) if move_hz > 0 else 0
+    rows = _column_rows(events) if isinstance(events, Macro) else _event_rows(events)
+    keys, buttons = {}, {}
+    off = 0; last = None
+    stack: List[list] = []   # open blocks: [start, count, first-pass ops or None]
+    def keep(op: Op):
+        # every enclosing block replays this op, so each one buffers it
+        for blk in stack: blk[2].append(op)
+    def close():
+        start, count, buf = stack.pop(); body = off - start
+        if markers: yield (off, None, (LOOP_END, body))
+        else:
+            for r in range(1, count):
+                for o, fn, args in buf:
+                    op = (o + r * body, fn, args); keep(op)
+                    yield op
+    for kind, action, name, x, y, pressed, delay_ms in rows:
+        off += _ns(delay_ms)
+        if kind == KIND_LOOP:
+            last = None
+            if action == LOOP_BEGIN:
+                stack.append([off, max(1, int(x)), None if markers else []])
+                if markers: yield (off, None, (LOOP_BEGIN, max(1, int(x))))
+            elif stack:
+                start, count = stack[-1][0], stack[-1][1]
+                yield from close(); off = start + (off - start) * count
+            continue
+        if kind == KIND_KEY:
+            k = keys.get(name)
+            if k is None: k = keys[name] = io.resolve_key(name)
+            op = (off, io.press_key if action == "press" else io.release_key, (k,))
+        elif action == "move":
+            if step and last is not None and last[1] == io.move and last[2] != (x, y):
+                p_off, _, (px, py) = last
+                for o, ix, iy in interpolate(p_off, px, py, off, x, y, step):
+                    if stack and not markers: keep((o, io.move, (ix, iy)))
+                    yield (o, io.move, (ix, iy))
+            op = (off, io.move, (x, y))
+        elif action == "click":
+            b = buttons.get(name)
+            if b is None: b = buttons[name] = io.resolve_button(name)
+            op = (off, io.press_button if pressed else io.release_button, (b,))
+        else:
+            continue
+        last = op
+        if stack and not markers: keep(op)
+        yield op
+    while stack:   # a block without its "end" runs to the end of the macro
+        start, count = stack[-1][0], stack[-1][1]
+        yield from close(); off = start + (off - start) * count
+
+def batched(ops: Iterable[Op], io) -> Iterator[Op]:
+    # ops due at the same offset (zero-delay runs) become one io.send() batch
+    names = {getattr(io, n): n for n in BATCH_OPS}
+    def flush(run: List[Op]) -> Op:
+        return run[0] if len(run) == 1 else (run[0][0], io.send, (tuple((names[f], a) for _, f, a in run),))
+    run: List[Op] = []
+    for op in ops:
+        if run and op[0] != run[0][0]:
+            yield flush(run); run = []
+        run.append(op)
+    if run: yield flush(run)
+
+def _compile_blocks(src, io, move_hz: float) -> _Block:
+    root = _Block(1); stack = [(root, 0)]; seg: List[Op] = []
+    for off, fn, args in iter_ops(src, io, move_hz, markers=True):
+        b, start = stack[-1]
+        if fn is not None: seg.append((off - start, fn, args)); continue
+        b.items += batched(seg, io); seg = []
+        if args[0] == LOOP_BEGIN:
+            inner = _Block(args[1]); b.items.append((off - start, inner)); stack.append((inner, off))
+        else:
+            stack.pop(); b.dur = args[1]
+    stack[-1][0].items += batched(seg, io)
+    return root
+
+def compile_macro(m, io, move_hz: float = 0) -> PlaybackPlan:
+    src = m if isinstance(m, Macro) else m.events
+    loops = m.has_loops() if isinstance(m, Macro) else any(e.kind == "loop" for e in src)
+    if loops:
+        rows = list(_column_rows(src) if isinstance(src, Macro) else _event_rows(src))
+        duration = loop_span([r[0] for r in rows], [r[1] for r in rows], [max(1, int(r[3])) for r in rows],
+                             [_ns(r[6]) for r in rows])
+        root = _compile_blocks(src, io, move_hz)
+        return PlaybackPlan([], duration, m.content_hash(), root, _op_count(root))
+    ops: List[Op] = list(batched(iter_ops(src, io, move_hz), io))
+    delays = m.delay if isinstance(m, Macro) else (e.delay_ms for e in m.events)
+    duration = sum(_ns(d) for d in delays)
+    return PlaybackPlan(ops, duration, m.content_hash(), op_count=len(ops))
+
+
+# plans hold callables bound to one backend, so the backend is part of the key
+_cache: "OrderedDict[tuple, PlaybackPlan]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_plan(m, io, move_hz: float = 0) -> PlaybackPlan:
+    h = (m.content_hash(), io, move_hz)
+    with _cache_lock:
+        plan = _cache.get(h)
+        if plan is not None:
+            _cache.move_to_end(h); return plan
+    plan = compile_macro(m, io, move_hz)
+    with _cache_lock:
+        _cache[h] = plan
+        while len(_cache) > PLAN_CACHE_SIZE: _cache.popitem(last=False)
+    return plan
@@ -0,0 +1,328 @@
+import heapq, itertools, logging, threading, time
+from typing import Callable, Dict, List, Optional
+import macro_engine as engine
+from macro_human import Humanizer
+from macro_timing import SPIN_NS, POLL_NS, TimingStats, advance
+from macro_metrics import METRICS, PLAY_LATE, PLAY_INJECT, CLICK_LATE, CLICK_INJECT, TRIGGER_POLL
+from macro_trigger import TriggerSet
+
+STOPPED, STARTING, RUNNING, PAUSED, DONE, ERROR = "stopped", "starting", "running", "paused", "done", "error"
+ACTIVE = (STARTING, RUNNING)
+FOCUS_SETTLE_NS = 150_000_000
+log = logging.getLogger(__name__)
+
+
+class Job:
+    # Something the Scheduler fires at deadlines. start()/resume() return the
+    # first deadline, fire() does one step and returns the next deadline, or
+    # None when the job is finished. Deadlines are absolute perf_counter_ns.
+    # Jobs with slow_start get prepare() + start() called on a worker thread.
+    # Jobs that inject input count in engine.active_jobs while they run,
+    # which keeps recording off.
+    kind = "job"
+    slow_start = False
+    injects = True
+
+    def __init__(self, name: str, hotkey: str = ""):
+        self.name = name
+        self.hotkey = hotkey
+        self.state = STOPPED
+        self.gen = 0          # bumped on pause/stop, so queued deadlines go stale
+        self.paused_ns = 0
+        self.stats = TimingStats()
+        self.error = ""       # why the job ended in ERROR
+
+    def prepare(self): pass
+    def start(self, now_ns: int) -> int: raise NotImplementedError
+    def resume(self, now_ns: int) -> int: raise NotImplementedError
+    def fire(self, now_ns: int, due_ns: int) -> Optional[int]: raise NotImplementedError
+    def describe(self) -> str: return ""
+
+
+class ClickJob(Job):
+    # the auto clicker: one tick (a click or a burst) per fire(); get_cfg is read
+    # on every tick, so the main clicker can follow settings.snapshot while
+    # extra jobs keep a fixed dict
+    kind = "click"
+
+    def __init__(self, name: str, get_cfg: Callable[[], dict], hotkey: str = "",
+                 gate: Optional[Callable[[], bool]] = None):
+        super().__init__(name, hotkey)
+        self.get_cfg = get_cfg
+        self.gate = gate      # e.g. TriggerSet.gate(); a closed gate skips the click but keeps the grid
+        self.human: Optional[Humanizer] = None
+
+    def start(self, now_ns: int) -> int:
+        self.stats = TimingStats(); self.stats.t0_ns = self.stats.t_last_ns = now_ns
+        self.human = None
+        return now_ns
+
+    def resume(self, now_ns: int) -> int: return self.start(now_ns)
+
+    def fire(self, now_ns: int, due_ns: int) -> Optional[int]:
+        cfg = self.get_cfg()
+        n = engine.burst_size(cfg); interval = engine.click_interval_ns(cfg)
+        h = self.human
+        if h is None or h.key != Humanizer.click_key(cfg): h = self.human = Humanizer.for_clicker(cfg)
+        late = now_ns - due_ns
+        if self.gate is None or self.gate():
+            io = engine.current_backend(); t = time.perf_counter_ns()
+            engine.click_once(io, cfg, n, h)
+            if METRICS.enabled:
+                CLICK_LATE.record(late); CLICK_INJECT.record(time.perf_counter_ns() - t)
+        else: n = 0
+        self.stats.record(late, now_ns, n)
+        step = interval if h.interval_factor is None else max(1, int(interval * h.interval_factor()))
+        due_ns, dropped = advance(due_ns, late, interval, step, cfg.get("late_policy", "skip"))
+        self.stats.missed += dropped
+        return due_ns
+
+    def describe(self) -> str:
+        cfg = self.get_cfg()
+        rate = f"{cfg['cps']:g} CPS" if cfg["click_mode"] == "cps" else f"every {cfg['interval_ms']} ms"
+        where = "@({},{})".format(*cfg["fixed_xy"]) if cfg["mode"] == "fixed" else "@cursor"
+        return f"{cfg['button']} {where} {rate}"
+
+
+class PlaybackJob(Job):
+    # one op per fire(); every op keeps its absolute offset from t0, and a
+    # pause moves t0 forward by the paused time. prepare() compiles the plan
+    # once, so t0 is only taken when the first op can actually go out.
+    kind = "macro"
+    slow_start = True
+
+    def __init__(self, name: str, m, speed: float = 1.0, loop: int = 1, hotkey: str = "",
+                 human: Optional[Humanizer] = None):
+        super().__init__(name, hotkey)
+        self.m, self.speed, self.loop = m, speed, max(1, int(loop))
+        self.human = human
+        self.t0 = 0
+        self._source = None   # (duration_ns, run_ops) from engine.playback_source
+        self._ops = None
+        self._next = None
+        self.done_ops = 0
+        self.ops_per_loop = 0
+        self.end_ns = 0
+
+    def _advance(self) -> Optional[int]:
+        self._next = next(self._ops, None)
+        return None if self._next is None else self.t0 + self._next[0]
+
+    def prepare(self):
+        if self._source is not None: return   # m is a private copy, the plan can't go stale
+        self._source = engine.playback_source(self.m, engine.current_backend())
+        ops = self._source[1]()   # the plan's ops, or a not yet started stream
+        self.ops_per_loop = len(ops) if hasattr(ops, "__len__") else len(self.m.events)
+
+    def start(self, now_ns: int) -> int:
+        io = engine.current_backend()
+        self.prepare()
+        now_ns = max(now_ns, time.perf_counter_ns())
+        # give the recorded window time to come up instead of sleeping here
+        self.t0 = now_ns + (FOCUS_SETTLE_NS if engine.focus_target(self.m, io) else 0)
+        self.stats = TimingStats(); self.stats.t0_ns = self.stats.t_last_ns = now_ns
+        self._ops = engine.timeline(self.m, io, self.speed, self.loop, self.human, self._source); self.done_ops = 0
+        duration_ns = self._source[0]
+        self.end_ns = self.t0 + int(duration_ns * self.loop / max(0.01, self.speed))
+        return self._advance() if len(self.m.events) else None
+
+    def resume(self, now_ns: int) -> int:
+        self.t0 += now_ns - self.paused_ns; self.end_ns += now_ns - self.paused_ns
+        return self.t0 + self._next[0]
+
+    def fire(self, now_ns: int, due_ns: int) -> Optional[int]:
+        _, fn, args = self._next
+        t = time.perf_counter_ns(); fn(*args)
+        if METRICS.enabled:
+            PLAY_LATE.record(now_ns - due_ns); PLAY_INJECT.record(time.perf_counter_ns() - t)
+        self.stats.record(now_ns - due_ns, now_ns); self.done_ops += 1
+        return self._advance()
+
+    def progress(self, now_ns: int):
+        # -> (ops done, ops total, current loop, loops, seconds left); read from
+        # the UI thread, so it only looks at plain ints the dispatch thread writes
+        per = max(1, self.ops_per_loop); total = per * self.loop
+        done = min(self.done_ops, total)
+        if self.state == PAUSED: now_ns = self.paused_ns
+        return done, total, min(self.loop, done // per + 1), self.loop, max(0, self.end_ns - now_ns) / 1e9
+
+    def describe(self) -> str:
+        return f"{len(self.m.events)} events x{self.loop} @ {self.speed:g}x"
+
+
+class TriggerJob(Job):
+    # polls a TriggerSet once per frame and runs action(fired regions) in the
+    # same fire() as the poll that saw the change, so it reacts within a frame.
+    # Watching injects nothing, so an armed trigger doesn't block recording; a
+    # macro it starts runs as its own PlaybackJob and does.
+    kind = "trigger"
+    injects = False
+
+    def __init__(self, name: str, triggers: TriggerSet, action: Callable[[list], None], hotkey: str = "",
+                 label: str = ""):
+        super().__init__(name, hotkey)
+        self.triggers, self.action, self.label = triggers, action, label
+        self.fired = 0
+        self._primed = False
+
+    def start(self, now_ns: int) -> int:
+        self.stats = TimingStats(); self.stats.t0_ns = self.stats.t_last_ns = now_ns
+        self._primed = False
+        return now_ns
+
+    def resume(self, now_ns: int) -> int: return self.start(now_ns)
+
+    def fire(self, now_ns: int, due_ns: int) -> Optional[int]:
+        fired = self.triggers.poll()
+        if METRICS.enabled: TRIGGER_POLL.record(time.perf_counter_ns() - now_ns)
+        if not self._primed:
+            # the first poll after a (re)start only takes the baseline
+            self._primed = True; fired = []
+        if fired:
+            self.action(fired); self.fired += 1
+        late = now_ns - due_ns; frame = self.triggers.frame_ns
+        self.stats.record(late, now_ns, 1 if fired else 0)
+        # never queue up polls: a late frame just starts the next one a frame later
+        behind = late // frame; self.stats.missed += behind
+        return due_ns + (behind + 1) * frame
+
+    def describe(self) -> str:
+        t = self.triggers
+        return f"{len(t.regions)} regions @ {1e9 / t.frame_ns:g} fps -> {self.label}, fired {self.fired}"
+
+
+class Scheduler:
+    # One dispatch thread for every job: deadlines sit in a heap, the thread
+    # sleeps on a condition until the earliest one (minus a spin margin), so
+    # adding, pausing or stopping a job wakes it immediately.
+    def __init__(self, spin_ns: int = SPIN_NS):
+        self.spin_ns = spin_ns
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _push(self, job: Job, due: Optional[int]):
+        # caller holds _cv
+        if due is None:
+            self._set(job, DONE); return
+        heapq.heappush(self._heap, (due, next(self._seq), job.gen, job))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="macro-sched", daemon=True)
+            self._thread.start()
+        self._cv.notify()
+
+    def _set(self, job: Job, state: str):
+        # caller holds _cv
+        was = job.state in ACTIVE
+        if state != RUNNING: job.gen += 1
+        job.state = state
+        if job.injects: engine.active_jobs += (state in ACTIVE) - was
+
+    def add(self, job: Job) -> Job:
+        old = self.jobs.get(job.name)
+        if old is not None: self.stop(old.name)
+        with self._cv: self.jobs[job.name] = job
+        return job
+
+    def remove(self, name: str):
+        self.stop(name)
+        with self._cv: self.jobs.pop(name, None)
+
+    def start(self, name: str):
+        job = self.jobs[name]
+        if job.state == PAUSED: return self.resume(name)
+        if job.state in ACTIVE: return
+        if not job.slow_start: return self._begin(job, job.gen)
+        # compile on a worker: the caller is the Tk thread or the keyboard hook
+        with self._cv:
+            self._set(job, STARTING); gen = job.gen
+        threading.Thread(target=self._begin, args=(job, gen), name="macro-prepare", daemon=True).start()
+
+    def _begin(self, job: Job, gen: int):
+        job.error = ""
+        try:
+            due = job.start(time.perf_counter_ns())
+        except Exception as e:
+            with self._cv:
+                if gen == job.gen: self._fail(job, e)
+            return
+        with self._cv:
+            if gen != job.gen: return   # stopped while it was preparing
+            self._set(job, RUNNING); self._push(job, due)
+
+    def _fail(self, job: Job, e: Exception):
+        # caller holds _cv; the UI polls job states and shows job.error
+        log.error("job %r failed", job.name, exc_info=e)
+        job.error = f"{type(e).__name__}: {e}"
+        self._set(job, ERROR)
+
+    def stop(self, name: str):
+        job = self.jobs.get(name)
+        if job is None: return
+        with self._cv:
+            if job.state in (STARTING, RUNNING, PAUSED): self._set(job, STOPPED)
+
+    def pause(self, name: str):
+        job = self.jobs[name]
+        with self._cv:
+            if job.state == RUNNING:
+                self._set(job, PAUSED); job.paused_ns = time.perf_counter_ns()
+
+    def resume(self, name: str):
+        job = self.jobs[name]
+        with self._cv:
+            if job.state != PAUSED: return
+            self._set(job, RUNNING); self._push(job, job.resume(time.perf_counter_ns()))
+
+    def toggle(self, name: str):
+        # hotkey action: start a stopped job, pause a running one, resume a paused one
+        job = self.jobs.get(name)
+        if job is None: return
+        if job.state == RUNNING: self.pause(name)
+        else: self.start(name)
+
+    def running(self, name: str) -> bool:
+        # a job still preparing counts: starting it again would do nothing
+        job = self.jobs.get(name)
+        return job is not None and job.state in ACTIVE
+
+    def pause_all(self):
+        for name in list(self.jobs): self.pause(name)
+
+    def resume_all(self):
+        for name in list(self.jobs): self.resume(name)
+
+    def stop_all(self):
+        for name in list(self.jobs): self.stop(name)
+
+    def close(self):
+        self.stop_all()
+        with self._cv:
+            self._closed = True; self._cv.notify()
+
+    def _run(self):
+        cv = self._cv
+        while True:
+            with cv:
+                while not self._heap and not self._closed: cv.wait()
+                if self._closed: return
+                due, _, gen, job = self._heap[0]
+                if gen != job.gen:
+                    heapq.heappop(self._heap); continue
+                rem = due - time.perf_counter_ns()
+                if rem > self.spin_ns:
+                    cv.wait(min(rem - self.spin_ns, POLL_NS) / 1e9); continue
+                if rem <= 0: heapq.heappop(self._heap)
+            if rem > 0:
+                time.sleep(0); continue  # spin the last stretch, GIL released
+            try:
+                nxt = job.fire(time.perf_counter_ns(), due)
+            except Exception as e:
+                with cv:
+                    if gen == job.gen: self._fail(job, e)
+                continue
+            with cv:
+                if gen == job.gen: self._push(job, nxt)
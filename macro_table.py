@@ -0,0 +1,118 @@
+from tkinter import ttk
+from typing import Iterable, List, Optional
+from macro_model import Macro, NAMES, NO_NAME, KIND_KEY, KIND_LOOP, KINDS, LOOP_BEGIN
+
+COLS = ("#", "type", "action", "detail", "delay_ms")
+WIDTHS = (70, 70, 80, 360, 90)
+
+def fmt_delay(ms: float) -> str:
+    ms = max(0.0, round(float(ms), 3))
+    return str(int(ms)) if ms.is_integer() else str(ms)
+
+def row_values(m: Macro, i: int) -> tuple:
+    names = NAMES.names; n = m.name[i]
+    if m.kind[i] == KIND_KEY:
+        detail = f"key={names[n]}"
+    elif m.kind[i] == KIND_LOOP:
+        detail = f"repeat x{m.x[i]}" if names[m.action[i]] == LOOP_BEGIN else "end repeat"
+    elif n == NO_NAME:
+        detail = f"move @({m.x[i]},{m.y[i]})"
+    else:
+        detail = f"{names[n]} @({m.x[i]},{m.y[i]}) pressed={bool(m.pressed[i])}"
+    return (str(i + 1), KINDS[m.kind[i]], names[m.action[i]], detail, fmt_delay(m.delay[i]))
+
+
+class VirtualEventTable(ttk.Frame):
+    # Shows a Macro through a fixed pool of Treeview rows. Only the rows that
+    # fit on screen exist; scrolling just rewrites their values, so the cost of
+    # loading, scrolling or editing does not depend on the macro length.
+    # Selection is kept as macro indices, not Treeview items.
+    def __init__(self, master, **kw):
+        super().__init__(master, **kw)
+        self.macro: Optional[Macro] = None
+        self.top = 0
+        self.visible = 12
+        self.selected: List[int] = []
+        self.anchor: Optional[int] = None
+        self.tree = ttk.Treeview(self, columns=COLS, show="headings", height=self.visible, selectmode="none")
+        for c, w in zip(COLS, WIDTHS):
+            self.tree.heading(c, text=c); self.tree.column(c, width=w, anchor="w")
+        self.tree.tag_configure("sel", background="#cce4ff")
+        self.tree.pack(fill="both", expand=True, side="left")
+        self.sb = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.sb.pack(side="right", fill="y")
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    def __len__(self): return len(self.macro) if self.macro is not None else 0
+
+    def set_macro(self, m: Optional[Macro]):
+        self.macro = m; self.top = 0; self.selected = []; self.anchor = None
+        self.refresh(); self.event_generate("<<TableSelect>>")
+
+    def _on_resize(self, _e=None):
+        rh = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        n = max(1, (self.tree.winfo_height() - rh) // rh)   # minus the heading
+        if n != self.visible:
+            self.visible = n; self.refresh()
+
+    def refresh(self):
+        # make the row pool match the window, then fill it from the model
+        n = len(self); self.top = max(0, min(self.top, n - self.visible))
+        want = min(self.visible, n - self.top)
+        items = self.tree.get_children()
+        for it in items[want:]: self.tree.delete(it)
+        for _ in range(len(items), want): self.tree.insert("", "end")
+        sel = set(self.selected)
+        for slot, it in enumerate(self.tree.get_children()):
+            i = self.top + slot
+            self.tree.item(it, values=row_values(self.macro, i), tags=("sel",) if i in sel else ())
+        if n: self.sb.set(self.top / n, (self.top + want) / n)
+        else: self.sb.set(0, 1)
+
+    def refresh_rows(self, indices):
+        # rewrite only the given rows, if they are on screen
+        items = self.tree.get_children()
+        for i in indices:
+            slot = i - self.top
+            if 0 <= slot < len(items):
+                self.tree.item(items[slot], values=row_values(self.macro, i))
+
+    def yview(self, *args):
+        n = len(self)
+        if not args or not n: return
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * n)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.visible if args[2] == "pages" else 1)
+            self.top += step
+        self.refresh()
+
+    def see(self, i: int):
+        if i < self.top: self.top = i
+        elif i >= self.top + self.visible: self.top = i - self.visible + 1
+        self.refresh()
+
+    def index_at(self, y: int) -> Optional[int]:
+        it = self.tree.identify_row(y)
+        if not it: return None
+        i = self.top + self.tree.index(it)
+        return i if i < len(self) else None
+
+    def _on_click(self, e):
+        if self.tree.identify("region", e.x, e.y) != "cell": return
+        i = self.index_at(e.y)
+        if i is None: return
+        if e.state & 0x1 and self.anchor is not None:     # shift: range from anchor
+            lo, hi = sorted((self.anchor, i)); self.select(range(lo, hi + 1)); return
+        if e.state & 0x4:                                   # ctrl: toggle one row
+            sel = set(self.selected); sel.symmetric_difference_update((i,))
+            self.anchor = i; self.select(sel); return
+        self.anchor = i; self.select([i])
+
+    def select(self, indices: Iterable[int]):
+        self.selected = sorted(set(i for i in indices if 0 <= i < len(self)))
+        self.refresh(); self.event_generate("<<TableSelect>>")
@@ -0,0 +1,121 @@
+import time
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+# time.sleep can overshoot by a full scheduler quantum (~1-15 ms on Windows),
+# so the last stretch before a deadline is spun instead of slept.
+SPIN_NS = 2_000_000
+POLL_NS = 50_000_000   # longest single sleep, so stop requests are noticed
+LATE_POLICIES = ("skip", "catchup")
+MAX_CATCHUP = 10       # missed ticks "catchup" fires back to back before dropping them
+
+def wait_until(deadline_ns: int, keep_going: Optional[Callable[[], bool]] = None,
+               spin_ns: int = SPIN_NS) -> bool:
+    while True:
+        rem = deadline_ns - time.perf_counter_ns()
+        if rem <= 0: return True
+        if keep_going is not None and not keep_going(): return False
+        if rem > spin_ns:
+            time.sleep(min(rem - spin_ns, POLL_NS) / 1e9)
+        else:
+            time.sleep(0)  # yield the GIL while spinning
+
+def advance(due_ns: int, late_ns: int, interval_ns: int, step_ns: int, policy: str = "skip",
+            max_catchup: int = MAX_CATCHUP) -> Tuple[int, int]:
+    # -> (next deadline, ticks dropped) after a tick due at due_ns fired late_ns
+    # late; step_ns is the next period (interval_ns unless humanized)
+    behind = late_ns // interval_ns
+    if policy == "catchup" and behind <= max_catchup: return due_ns + step_ns, 0
+    return due_ns + behind * interval_ns + step_ns, behind
+
+def percentile(sorted_vals, q: float):
+    if not sorted_vals: return 0
+    i = min(len(sorted_vals) - 1, max(0, int(round(q / 100.0 * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+
+class TimingStats:
+    def __init__(self, window: int = 8192):
+        self.ticks = 0
+        self.units = 0      # clicks; more than ticks when each tick fires a burst
+        self.missed = 0
+        self.late_sum_ns = 0
+        self.late_max_ns = 0
+        self.recent = deque(maxlen=window)  # lateness of the last `window` ticks
+        self.t0_ns = time.perf_counter_ns()
+        self.t_last_ns = self.t0_ns
+
+    def record(self, late_ns: int, now_ns: int, units: int = 1):
+        self.ticks += 1; self.units += units
+        self.late_sum_ns += late_ns
+        if late_ns > self.late_max_ns: self.late_max_ns = late_ns
+        self.recent.append(late_ns)
+        self.t_last_ns = now_ns
+
+    def achieved_rate(self) -> float:
+        span = self.t_last_ns - self.t0_ns
+        if self.ticks < 2 or span <= 0: return 0.0
+        return (self.ticks - 1) * 1e9 / span * self.units / self.ticks
+
+    def summary(self) -> dict:
+        s = sorted(self.recent)
+        return {
+            "ticks": self.ticks,
+            "burst": round(self.units / self.ticks, 2) if self.ticks else 1,
+            "missed": self.missed,
+            "achieved_cps": round(self.achieved_rate(), 3),
+            "late_mean_ms": round(self.late_sum_ns / self.ticks / 1e6, 4) if self.ticks else 0.0,
+            "late_p99_ms": round(percentile(s, 99) / 1e6, 4),
+            "late_max_ms": round(self.late_max_ns / 1e6, 4),
+        }
+
+    def summary_text(self) -> str:
+        d = self.summary()
+        burst = f" in bursts of {d['burst']:g}" if d["burst"] > 1 else ""
+        return (f"{d['achieved_cps']:.1f} CPS{burst}, late mean {d['late_mean_ms']:.2f} ms "
+                f"p99 {d['late_p99_ms']:.2f} ms, missed {d['missed']}")
+
+
+class DeadlineScheduler:
+    # Ticks sit on an absolute grid (start + n*interval), so time spent between
+    # waits is absorbed instead of added to the period. When a deadline is missed
+    # "skip" drops the lost ticks and realigns to the grid, "catchup" fires them
+    # back to back (bounded by max_catchup, beyond that they are dropped too).
+    def __init__(self, interval_ns: int, policy: str = "skip",
+                 spin_ns: int = SPIN_NS, max_catchup: int = MAX_CATCHUP):
+        self.interval_ns = max(1, int(interval_ns))
+        self.policy = policy if policy in LATE_POLICIES else "skip"
+        self.spin_ns = spin_ns
+        self.max_catchup = max_catchup
+        self.next_ns: Optional[int] = None
+        self.units = 1      # what one tick counts as in stats (burst size)
+        self.last_late_ns = 0
+        self.factor: Optional[Callable[[], float]] = None   # humanized interval, mean 1
+        self.stats = TimingStats()
+
+    def start(self, now_ns: Optional[int] = None):
+        now_ns = time.perf_counter_ns() if now_ns is None else now_ns
+        self.next_ns = now_ns
+        self.stats = TimingStats()
+        self.stats.t0_ns = self.stats.t_last_ns = now_ns
+
+    def set_interval(self, interval_ns: int):
+        interval_ns = max(1, int(interval_ns))
+        if interval_ns == self.interval_ns: return
+        if self.next_ns is not None:  # re-anchor the pending deadline on the new period
+            self.next_ns += interval_ns - self.interval_ns
+        self.interval_ns = interval_ns
+
+    def set_policy(self, policy: str):
+        if policy in LATE_POLICIES: self.policy = policy
+
+    def wait(self, keep_going: Optional[Callable[[], bool]] = None) -> bool:
+        if self.next_ns is None: self.start()
+        if not wait_until(self.next_ns, keep_going, self.spin_ns): return False
+        now = time.perf_counter_ns()
+        late = self.last_late_ns = now - self.next_ns
+        self.stats.record(late, now, self.units)
+        step = self.interval_ns if self.factor is None else max(1, int(self.interval_ns * self.factor()))
+        self.next_ns, dropped = advance(self.next_ns, late, self.interval_ns, step, self.policy, self.max_catchup)
+        self.stats.missed += dropped
+        return True
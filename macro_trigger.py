@@ -0,0 +1,264 @@
+import os, sys, threading, time, zlib
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# Pixels everywhere are 32-bit BGRA rows, the layout a GDI DIB section uses.
+BPP = 4
+TRIGGER_MODES = ("change", "match")
+SOURCES = ("auto", "gdi", "file", "array")
+MAX_SAMPLES = 1024     # bytes compared per region for a tolerant match without numpy
+UNION_SLACK = 4        # grab the regions' bounding box unless it is this much bigger than they are
+DEFAULT_FPS = 60.0
+
+def _numpy():
+    # optional: used for exact tolerant diffs when installed
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+class Frame:
+    # a captured rectangle; (x, y) is its top-left corner on screen
+    def __init__(self, x: int, y: int, w: int, h: int, data):
+        self.x, self.y, self.w, self.h = x, y, w, h
+        self.data = memoryview(data)
+
+    def region(self, x: int, y: int, w: int, h: int) -> bytes:
+        # screen coordinates; the rect must lie inside the frame
+        stride = self.w * BPP; row = w * BPP; d = self.data
+        off = (y - self.y) * stride + (x - self.x) * BPP
+        if w == self.w:
+            if off == 0 and h == self.h and isinstance(d.obj, bytes): return d.obj
+            return d[off:off + h * stride].tobytes()
+        return b"".join([d[o:o + row] for o in range(off, off + h * stride, stride)])
+
+
+class CaptureSource:
+    name = "base"
+    def grab(self, x: int, y: int, w: int, h: int) -> Frame: raise NotImplementedError
+    def close(self): pass
+
+
+class ArraySource(CaptureSource):
+    # In-memory screen for headless runs and tests: draw into it with fill()
+    # from any thread, triggers see the change on their next poll.
+    name = "array"
+
+    def __init__(self, width: int, height: int, color: Tuple[int, int, int] = (0, 0, 0)):
+        self.width, self.height = width, height
+        self.buf = bytearray(bytes((color[2], color[1], color[0], 255)) * (width * height))
+        self.lock = threading.Lock()
+
+    def fill(self, x: int, y: int, w: int, h: int, color: Tuple[int, int, int]):
+        px = bytes((color[2], color[1], color[0], 255)) * w
+        stride = self.width * BPP
+        with self.lock:
+            for row in range(y, y + h):
+                o = row * stride + x * BPP; self.buf[o:o + len(px)] = px
+
+    def grab(self, x: int, y: int, w: int, h: int) -> Frame:
+        stride = self.width * BPP; row = w * BPP
+        with self.lock, memoryview(self.buf) as mv:
+            off = y * stride + x * BPP
+            if x == 0 and w == self.width: data = mv[off:off + h * stride].tobytes()
+            else: data = b"".join([mv[o:o + row] for o in range(off, off + h * stride, stride)])
+        return Frame(x, y, w, h, data)
+
+
+def _ppm_header(raw: bytes):
+    # -> (magic, width, height, maxval tokens), offset of the pixel data. The
+    # header ends with exactly one whitespace byte after maxval; the pixels
+    # after it may start with bytes that look like whitespace or '#'.
+    tokens, i, n = [], 0, len(raw)
+    while len(tokens) < 4:
+        while i < n and raw[i] in b" \t\n\v\f\r": i += 1
+        if i < n and raw[i] == 0x23:   # '#' comment up to the end of the line
+            while i < n and raw[i] not in b"\r\n": i += 1
+            continue
+        j = i
+        while j < n and raw[j] not in b" \t\n\v\f\r#": j += 1
+        if j == i: raise ValueError("truncated PPM header")
+        tokens.append(raw[i:j]); i = j
+    if i >= n or raw[i] not in b" \t\n\v\f\r": raise ValueError("bad PPM header")
+    return tokens, i + 1
+
+
+class FileSource(ArraySource):
+    # A binary PPM (P6) screenshot on disk, reloaded whenever its mtime
+    # changes, so another process can stand in for the screen.
+    name = "file"
+
+    def __init__(self, path: Path):
+        self.path = Path(path); self._mtime = None
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        raw = self.path.read_bytes()
+        (magic, w, h, maxval), off = _ppm_header(raw)
+        if magic != b"P6" or int(maxval) != 255: raise ValueError(f"{self.path}: expected an 8-bit P6 PPM")
+        w, h = int(w), int(h); rgb = raw[off:off + w * h * 3]
+        if len(rgb) != w * h * 3: raise ValueError(f"{self.path}: truncated pixel data")
+        buf = bytearray(w * h * BPP)
+        buf[0::4], buf[1::4], buf[2::4], buf[3::4] = rgb[2::3], rgb[1::3], rgb[0::3], b"\xff" * (w * h)
+        with self.lock: self.width, self.height, self.buf = w, h, buf
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def grab(self, x: int, y: int, w: int, h: int) -> Frame:
+        try:
+            if os.stat(self.path).st_mtime_ns != self._mtime: self._load()
+        except (OSError, ValueError): pass   # mid-write; keep the last good frame
+        return super().grab(x, y, w, h)
+
+
+class GdiSource(CaptureSource):
+    # BitBlt from the screen DC into a reused 32-bit DIB section; one source
+    # serves every trigger, so grabs are serialized on `lock`
+    name = "gdi"
+
+    def __init__(self):
+        import ctypes, ctypes.wintypes
+        self.ctypes = ctypes
+        self.user32, self.gdi32 = ctypes.windll.user32, ctypes.windll.gdi32
+        W = ctypes.wintypes
+        class BITMAPINFOHEADER(ctypes.Structure):
+            _fields_ = [("biSize", W.DWORD), ("biWidth", W.LONG), ("biHeight", W.LONG), ("biPlanes", W.WORD),
+                        ("biBitCount", W.WORD), ("biCompression", W.DWORD), ("biSizeImage", W.DWORD),
+                        ("biXPelsPerMeter", W.LONG), ("biYPelsPerMeter", W.LONG), ("biClrUsed", W.DWORD),
+                        ("biClrImportant", W.DWORD)]
+        self._BIH = BITMAPINFOHEADER
+        self.screen_dc = self.user32.GetDC(0)
+        self.mem_dc = self.gdi32.CreateCompatibleDC(self.screen_dc)
+        self._bmp = None; self._bits = None; self._size = (0, 0)
+        self.lock = threading.Lock()
+
+    def _surface(self, w: int, h: int):
+        if self._size == (w, h): return
+        ct = self.ctypes
+        if self._bmp: self.gdi32.DeleteObject(self._bmp)
+        bih = self._BIH(); bih.biSize = ct.sizeof(self._BIH)
+        bih.biWidth, bih.biHeight, bih.biPlanes, bih.biBitCount = w, -h, 1, 32   # top-down rows
+        self._bits = ct.c_void_p()
+        self._bmp = self.gdi32.CreateDIBSection(self.mem_dc, ct.byref(bih), 0, ct.byref(self._bits), None, 0)
+        self.gdi32.SelectObject(self.mem_dc, self._bmp)
+        self._size = (w, h)
+
+    def grab(self, x: int, y: int, w: int, h: int) -> Frame:
+        with self.lock:
+            self._surface(w, h)
+            self.gdi32.BitBlt(self.mem_dc, 0, 0, w, h, self.screen_dc, x, y, 0x00CC0020)  # SRCCOPY
+            return Frame(x, y, w, h, self.ctypes.string_at(self._bits, w * h * BPP))
+
+    def close(self):
+        with self.lock:
+            if self._bmp: self.gdi32.DeleteObject(self._bmp); self._bmp = None
+            self.gdi32.DeleteDC(self.mem_dc); self.user32.ReleaseDC(0, self.screen_dc)
+
+
+def get_source(name: str = "auto", path: Optional[Path] = None) -> CaptureSource:
+    if name == "auto":
+        name = "gdi" if sys.platform == "win32" else "file" if path else "array"
+    if name == "gdi": return GdiSource()
+    if name == "file": return FileSource(path)
+    if name == "array": return ArraySource(1920, 1080)
+    raise ValueError(f"unknown capture source: {name}")
+
+
+class Region:
+    # "change" is active for the one poll in which the pixels differ from the
+    # previous poll; "match" is active while they equal `ref` (within a mean
+    # per-byte difference of `tolerance`) and fires when that starts.
+    def __init__(self, x: int, y: int, w: int, h: int, mode: str = "change",
+                 ref: Optional[bytes] = None, tolerance: float = 0.0, name: str = ""):
+        if mode not in TRIGGER_MODES: raise ValueError(f"unknown trigger mode: {mode}")
+        self.x, self.y, self.w, self.h = x, y, max(1, w), max(1, h)
+        self.mode, self.ref, self.tolerance = mode, ref, float(tolerance)
+        self.name = name or f"{mode}@({x},{y},{w}x{h})"
+        self._ref_crc = zlib.crc32(ref) if ref is not None else None
+        self._crc: Optional[int] = None
+        self.active = False
+        self.fired = 0
+
+    @property
+    def box(self) -> Tuple[int, int, int, int]: return self.x, self.y, self.x + self.w, self.y + self.h
+
+    def set_ref(self, ref: bytes):
+        self.ref, self._ref_crc = ref, zlib.crc32(ref)
+
+    def _matches(self, px: bytes, crc: int) -> bool:
+        if crc == self._ref_crc: return True
+        if self.tolerance <= 0 or self.ref is None or len(px) != len(self.ref): return False
+        np = _numpy()
+        if np is not None:
+            a = np.frombuffer(px, np.uint8).astype(np.int16); b = np.frombuffer(self.ref, np.uint8)
+            return float(np.abs(a - b).mean()) <= self.tolerance
+        step = max(1, len(px) // MAX_SAMPLES)
+        if step % BPP == 0: step += 1   # otherwise every sample is the same channel
+        a, b = px[::step], self.ref[::step]
+        return sum(abs(p - q) for p, q in zip(a, b)) / len(a) <= self.tolerance
+
+    def update(self, px: bytes) -> bool:
+        # -> True when the region fires on this poll
+        crc = zlib.crc32(px)
+        if self.mode == "change":
+            fire = self._crc is not None and crc != self._crc
+            self.active = fire
+        else:
+            was = self.active
+            self.active = self._matches(px, crc)
+            fire = self.active and not was
+        self._crc = crc
+        if fire: self.fired += 1
+        return fire
+
+
+class TriggerSet:
+    # Polls a capture source for a group of regions. A poll grabs the regions'
+    # bounding box once (or each region on its own when they are far apart) and
+    # then only hashes each region's bytes, so cost grows with watched pixels,
+    # not with screen size.
+    def __init__(self, source: CaptureSource, regions: Sequence[Region], fps: float = DEFAULT_FPS):
+        self.source = source
+        self.regions = list(regions)
+        self.frame_ns = int(1e9 / max(1.0, float(fps)))
+        self._last_poll = 0
+        self._lock = threading.Lock()
+        self._layout()
+
+    def _layout(self):
+        if not self.regions: self._union = None; return
+        x0 = min(r.x for r in self.regions); y0 = min(r.y for r in self.regions)
+        x1 = max(r.box[2] for r in self.regions); y1 = max(r.box[3] for r in self.regions)
+        area = sum(r.w * r.h for r in self.regions)
+        self._union = (x0, y0, x1 - x0, y1 - y0) if (x1 - x0) * (y1 - y0) <= UNION_SLACK * area else None
+
+    def capture_refs(self):
+        # take each "match" region's current pixels as its reference
+        for r in self.regions:
+            if r.mode == "match": r.set_ref(self.source.grab(r.x, r.y, r.w, r.h).region(r.x, r.y, r.w, r.h))
+
+    def poll(self) -> List[Region]:
+        with self._lock:
+            self._last_poll = time.perf_counter_ns()
+            fired = []
+            if self._union is not None:
+                f = self.source.grab(*self._union)
+                for r in self.regions:
+                    if r.update(f.region(r.x, r.y, r.w, r.h)): fired.append(r)
+            else:
+                for r in self.regions:
+                    if r.update(self.source.grab(r.x, r.y, r.w, r.h).region(r.x, r.y, r.w, r.h)): fired.append(r)
+            return fired
+
+    def active(self) -> bool:
+        return any(r.active for r in self.regions)
+
+    def gate(self) -> Callable[[], bool]:
+        # for ClickJob (the "click while" trigger action): click only while a region is active; polls
+        # at most once per frame however high the click rate is
+        def ok() -> bool:
+            if time.perf_counter_ns() - self._last_poll >= self.frame_ns: self.poll()
+            return self.active()
+        return ok
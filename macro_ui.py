@@ -0,0 +1,85 @@
+import logging, threading, time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+FRAME_MS = 33        # pump period; every update inside one frame is coalesced
+RATE_WINDOW_S = 0.5  # live CPS is measured over at least this long
+log = logging.getLogger(__name__)
+
+
+class UiChannel:
+    # Hands updates from worker/hook threads to the Tk thread. post() only
+    # stores the newest value for a key (a dict store, atomic under the GIL),
+    # call() appends to a deque; neither takes a lock or touches Tk. The Tk
+    # thread drains both once per frame from an after() loop, so a thread
+    # posting per event costs one dict store and Tk sees at most one update
+    # per key per frame.
+    def __init__(self, root, frame_ms: int = FRAME_MS):
+        self.root, self.frame_ms = root, frame_ms
+        self.tk_thread = threading.get_ident()
+        self._latest: Dict[str, object] = {}
+        self._calls: deque = deque()
+        self._sinks: Dict[str, Callable] = {}
+        self._tick: Optional[Callable[[], None]] = None
+        self._job = None
+        self._live = False
+
+    def bind(self, key: str, sink: Callable):
+        # sink(value) runs on the Tk thread with the newest value posted for key
+        self._sinks[key] = sink
+
+    def on_frame(self, fn: Callable[[], None]):
+        # fn runs on the Tk thread every frame (pull-style live counters)
+        self._tick = fn
+
+    def post(self, key: str, value):
+        self._latest[key] = value
+
+    def call(self, fn: Callable, *args):
+        if threading.get_ident() == self.tk_thread: fn(*args)
+        else: self._calls.append((fn, args))
+
+    def start(self):
+        self._live = True
+        if self._job is None: self._job = self.root.after(self.frame_ms, self._pump)
+
+    def stop(self):
+        self._live = False
+        if self._job is not None:
+            try: self.root.after_cancel(self._job)
+            except Exception: pass
+            self._job = None
+
+    def _run(self, fn: Callable, *args):
+        # one failing update is logged and skipped; it must not stop the pump
+        try: fn(*args)
+        except Exception: log.exception("UI update %r failed", fn)
+
+    def _pump(self):
+        calls, latest = self._calls, self._latest
+        try:
+            while calls:
+                fn, args = calls.popleft()
+                self._run(fn, *args)
+            while latest:
+                try: key, value = latest.popitem()
+                except KeyError: break
+                sink = self._sinks.get(key)
+                if sink: self._run(sink, value)
+            if self._tick: self._run(self._tick)
+        finally:
+            self._job = self.root.after(self.frame_ms, self._pump) if self._live else None
+
+
+class RateMeter:
+    # current rate from a monotonically growing counter, sampled by the pump
+    def __init__(self, window_s: float = RATE_WINDOW_S):
+        self.window_s = window_s
+        self.t, self.n, self.rate = time.perf_counter(), 0, 0.0
+
+    def update(self, n: int) -> float:
+        now = time.perf_counter()
+        if n < self.n: self.t, self.n, self.rate = now, n, 0.0   # counter restarted
+        elif now - self.t >= self.window_s:
+            self.rate = (n - self.n) / (now - self.t); self.t, self.n = now, n
+        return self.rate
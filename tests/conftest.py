@@ -0,0 +1,65 @@
+import sys, time
+from pathlib import Path
+
+import pytest
+
+# the macro_* modules live at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import macro_engine as engine
+from macro_backend import VirtualBackend
+from macro_model import Macro, MacroEvent
+from macro_sched import Scheduler
+
+
+def key(action, name="a", delay=10.0): return MacroEvent("key", action, {"key": name}, delay)
+def click(pressed, x=5, y=5, delay=10.0, button="left"):
+    return MacroEvent("mouse", "click", {"x": x, "y": y, "button": button, "pressed": pressed}, delay)
+def move(x, y, delay=10.0): return MacroEvent("mouse", "move", {"x": x, "y": y}, delay)
+
+
+def farming(passes: int = 40, jitter: float = 0.0) -> Macro:
+    # a press, then `passes` repeats of a click + key sequence, then a release
+    ev = [key("press", "shift", 5.0)]
+    for r in range(passes):
+        d = 100.0 + (jitter * (r % 3))
+        ev += [move(10, 20, d), click(True, 10, 20), click(False, 10, 20, 30.0),
+               key("press", "e", 50.0), key("release", "e", 20.0)]
+    ev.append(key("release", "shift", 5.0))
+    return Macro(ev)
+
+
+@pytest.fixture
+def io(): return VirtualBackend()
+
+
+@pytest.fixture
+def sched(io):
+    engine.set_backend(io)
+    s = Scheduler()
+    yield s
+    s.close()
+    engine.active_jobs = 0
+
+
+def taps(n: int, delay_ms: float = 1.0) -> Macro:
+    return Macro([key("press" if i % 2 == 0 else "release", "a", delay_ms) for i in range(n)])
+
+
+def save_both(m, tmp_path):
+    # -> m saved and loaded back as .json and as .mcrb
+    j, b = tmp_path / "m.json", tmp_path / "m.mcrb"
+    m.save(j); m.save(b)
+    return Macro.load(j), Macro.load(b)
+
+
+def wait_for(cond, timeout: float = 5.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > end: raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+def gaps_ms(log, n: int = 10):
+    # time between the first n ops a VirtualBackend logged
+    return [(b[0] - a[0]) / 1e6 for a, b in zip(log[:n], log[1:n])]
@@ -0,0 +1,58 @@
+import ctypes
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+import macro_backend
+from macro_backend import KEYEVENTF_EXTENDEDKEY, KEYEVENTF_KEYUP, KEYEVENTF_UNICODE, Win32Backend
+
+
+@dataclass(frozen=True)
+class KeyCode:   # shaped like pynput's KeyCode
+    vk: Optional[int] = None
+    char: Optional[str] = None
+
+
+class FakeUser32:
+    # a US layout for the letters, '!' only with shift; records SendInput calls
+    def __init__(self):
+        self.sent, self.lookups = [], 0
+        def VkKeyScanW(ch):
+            self.lookups += 1
+            if ch.isalpha(): return ord(ch.upper())
+            return 0x0131 if ch == "!" else -1
+        self.VkKeyScanW = VkKeyScanW
+        self.MapVirtualKeyW = lambda vk, kind: vk + 0x100
+        self.GetSystemMetrics = lambda i: 0
+        def SendInput(n, arr, size):
+            self.sent.append([(r.type, r.u.ki.wVk, r.u.ki.wScan, r.u.ki.dwFlags) for r in arr[:n]])
+        self.SendInput = SendInput
+
+
+@pytest.fixture
+def win(monkeypatch):
+    u = FakeUser32()
+    monkeypatch.setattr(ctypes, "windll", SimpleNamespace(user32=u), raising=False)
+    monkeypatch.setattr(macro_backend.PynputBackend, "__init__", lambda self: None)
+    return Win32Backend()
+
+
+def test_key_resolution(win):
+    assert win._key_strokes(KeyCode(char="a")) == ((0x41, 0x141, 0),)
+    assert win._key_strokes(KeyCode(vk=0x2E)) == ((0x2E, 0x12E, KEYEVENTF_EXTENDEDKEY),)   # delete
+    assert win._key_strokes(KeyCode(char="!")) == ((0, ord("!"), KEYEVENTF_UNICODE),)     # needs shift
+    assert win._key_strokes(KeyCode(char="\U0001F600")) == ((0, 0xD83D, KEYEVENTF_UNICODE), (0, 0xDE00, KEYEVENTF_UNICODE))
+
+
+def test_keys_are_resolved_once(win):
+    for _ in range(5): win._key_strokes(KeyCode(char="q"))
+    assert win.user32.lookups == 1
+
+
+def test_batch_is_one_send_input(win):
+    a, smile = KeyCode(char="a"), KeyCode(char="\U0001F600")
+    win.send([("press_key", (a,)), ("release_key", (a,)), ("press_key", (smile,))])
+    assert win.user32.sent == [[(1, 0x41, 0x141, 0), (1, 0x41, 0x141, KEYEVENTF_KEYUP),
+                                (1, 0, 0xD83D, KEYEVENTF_UNICODE), (1, 0, 0xDE00, KEYEVENTF_UNICODE)]]
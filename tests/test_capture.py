@@ -0,0 +1,17 @@
+from macro_capture import EV_CLICK, EV_KEY, CaptureBuffer, merged
+
+
+def test_buffer_grows_and_keeps_order():
+    b = CaptureBuffer(capacity=4)
+    for i in range(10): b.push(i, EV_KEY, i, 0, i & 1)
+    assert len(b) == 10 and b.cap >= 10
+    assert list(b) == [(i, EV_KEY, i, 0, i & 1) for i in range(10)]
+    b.reset(); assert len(b) == 0 and list(b) == []
+
+
+def test_hook_buffers_merge_by_timestamp():
+    kb, ms = CaptureBuffer(8), CaptureBuffer(8)
+    for t in (1, 4, 9): kb.push(t, EV_KEY, 0, 0, 1)
+    for t in (2, 3, 10): ms.push(t, EV_CLICK, 5, 5, 1)
+    assert [(r[0], r[1]) for r in merged([kb, ms])] == \
+        [(1, EV_KEY), (2, EV_CLICK), (3, EV_CLICK), (4, EV_KEY), (9, EV_KEY), (10, EV_CLICK)]
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+import macro_cli
+
+from conftest import taps
+
+
+@pytest.mark.parametrize("bad", [["--speed", "0"], ["--speed", "-2"], ["--speed", "inf"], ["--loop", "0"],
+                                 ["--repeat", "-1"]])
+def test_bad_numbers_exit_2(tmp_path, bad, capsys):
+    taps(4).save(tmp_path / "m.json")
+    with pytest.raises(SystemExit) as e: macro_cli.main([str(tmp_path / "m.json"), "--backend", "virtual", *bad])
+    assert e.value.code == 2 and bad[0] in capsys.readouterr().err
+
+
+def test_missing_macro_exits_2(tmp_path):
+    assert macro_cli.main([str(tmp_path / "nope.json"), "--backend", "virtual"]) == 2
+
+
+def test_plays_and_writes_json_metrics(tmp_path):
+    taps(6).save(tmp_path / "a.json"); taps(4).save(tmp_path / "b.mcrb")
+    out = tmp_path / "m" / "metrics.json"
+    rc = macro_cli.main([str(tmp_path / "a.json"), str(tmp_path / "b.mcrb"), "--backend", "virtual",
+                         "--loop", "2", "--speed", "4", "--metrics", str(out)])
+    assert rc == 0
+    h = json.loads(out.read_text())["histograms"]
+    assert h["playback_late"]["count"] == h["playback_inject"]["count"] == (6 + 4) * 2
+
+
+def test_a_broken_macro_fails_the_run(tmp_path):
+    taps(4).save(tmp_path / "a.json"); (tmp_path / "b.json").write_text("{not json")
+    assert macro_cli.main([str(tmp_path / "a.json"), str(tmp_path / "b.json"), "--backend", "virtual"]) == 1
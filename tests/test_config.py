@@ -0,0 +1,41 @@
+import json, os, time
+
+import pytest
+
+from macro_config import ConfigStore, atomic_write_text
+
+from conftest import wait_for
+
+
+def test_updates_are_debounced(tmp_path, monkeypatch):
+    p = tmp_path / "settings.json"; writes = []
+    real = os.replace
+    monkeypatch.setattr(os, "replace", lambda a, b: (writes.append(b), real(a, b)))
+    cs = ConfigStore(p, {"cps": 10.0, "button": "left"}, debounce_s=0.1)
+    for i in range(50): cs.update(cps=float(i))
+    assert cs["cps"] == 49.0 and not p.exists()
+    wait_for(lambda: p.exists())
+    time.sleep(0.15)
+    assert len(writes) == 1 and json.loads(p.read_text()) == {"cps": 49.0, "button": "left"}
+
+
+def test_unchanged_values_do_not_write(tmp_path):
+    cs = ConfigStore(tmp_path / "s.json", {"cps": 10.0}, debounce_s=0.05)
+    cs.update(cps=10.0); time.sleep(0.1)
+    assert not (tmp_path / "s.json").exists()
+
+
+def test_snapshots_are_immutable_and_swapped(tmp_path):
+    cs = ConfigStore(tmp_path / "s.json", {"cps": 10.0}, debounce_s=60)
+    before = cs.snapshot(); cs.update(cps=5.0)
+    assert before["cps"] == 10.0 and cs.snapshot()["cps"] == 5.0
+    with pytest.raises(TypeError): cs.snapshot()["cps"] = 1
+    cs.flush()
+    assert ConfigStore(tmp_path / "s.json", {"cps": 10.0, "new": 1}).snapshot() == {"cps": 5.0, "new": 1}
+
+
+def test_atomic_write_keeps_the_old_file_on_error(tmp_path):
+    p = tmp_path / "s.json"; p.write_text("old")
+    with pytest.raises(TypeError): atomic_write_text(p, 123)   # fails mid-write
+    assert p.read_text() == "old" and [f.name for f in tmp_path.iterdir()] == ["s.json"]
+    atomic_write_text(p, "new"); assert p.read_text() == "new"
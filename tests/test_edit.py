@@ -0,0 +1,52 @@
+import pytest
+
+from macro_edit import (Batch, EditHistory, MoveBlock, delete_rows, duplicate_block, replace_key,
+                        scale_delays, set_delays, set_row)
+
+from conftest import farming, key
+
+
+def _round_trip(m, e):
+    # apply, undo, redo through the history; -> the edited macro
+    before, hist = m.copy(), EditHistory()
+    hist.do(m, e); after = m.copy()
+    hist.undo(m); assert m == before
+    hist.redo(m); assert m == after
+    return after
+
+
+def test_delete_ranges():
+    m = farming(5); names = [e.action for e in m.events]
+    after = _round_trip(m, delete_rows([7, 1, 2, 3, 20]))
+    assert [e.action for e in after.events] == [a for i, a in enumerate(names) if i not in (1, 2, 3, 7, 20)]
+
+
+def test_insert_rows():
+    m = farming(3); n = len(m)
+    after = _round_trip(m, duplicate_block(m, 1, 6))
+    assert len(after) == n + 5 and after.events[6:11] == m.events[1:6]
+
+
+@pytest.mark.parametrize("start,stop,dest", [(1, 4, 8), (8, 10, 0), (3, 6, 3)])
+def test_move_block(start, stop, dest):
+    m = farming(3); rows = m.events[start:stop]
+    after = _round_trip(m, MoveBlock(start, stop, dest))
+    assert after.events[dest:dest + stop - start] == rows and len(after) == len(m)
+
+
+def test_set_values_and_batch():
+    m = farming(3); d1 = m.delay[1]
+    after = _round_trip(m, Batch([set_delays(m, [0, 2], 7.0), scale_delays(m, [1], 3.0),
+                                  replace_key(m, "e", "r"), set_row(m, 4, key("press", "z", 1.0))]))
+    assert after.delay[0] == after.delay[2] == 7.0 and after.delay[1] == d1 * 3
+    assert "e" not in {e.data.get("key") for e in after.events}
+    assert after.events[4] == key("press", "z", 1.0)
+
+
+def test_history_limit_and_redo_cleared():
+    m = farming(2); hist = EditHistory(limit=3)
+    for i in range(5): hist.do(m, set_delays(m, [0], float(i)))
+    assert len(hist.undo_stack) == 3
+    hist.undo(m); assert hist.redo_stack
+    hist.do(m, set_delays(m, [0], 9.0)); assert not hist.redo_stack
+    assert replace_key(m, "no-such-key", "x") is None
@@ -0,0 +1,15 @@
+from macro_format import MappedMacro, is_binary
+from macro_model import Macro
+
+from conftest import click, key, move, save_both
+
+
+def test_json_and_mcrb_round_trip(tmp_path):
+    m = Macro([key("press", "a", 1.5), move(3, 4, 0.25), click(True, 3, 4), click(False, 3, 4, 12.0),
+               key("release", "a", 7.0)], target_hwnd=1234)
+    j, b = save_both(m, tmp_path)
+    assert j == m
+    assert isinstance(b, MappedMacro) and is_binary(tmp_path / "m.mcrb")
+    assert b.target_hwnd == 1234
+    assert b.to_macro() == m
+    b.close()
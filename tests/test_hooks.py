@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from macro_hooks import InputHub, compile_hotkeys
+
+
+def test_compile_hotkeys():
+    f, g = object(), object()
+    assert compile_hotkeys({"<ctrl>+<alt>+h": f, "<F9>": g}) == {(3, "h"): f, (0, "f9"): g}
+    with pytest.raises(ValueError): compile_hotkeys({"<shift>+<ctrl>": f})
+
+
+def _hub(io, mapping):
+    hub = InputHub(io); hub.start_keyboard(); hub.set_hotkeys(mapping); return hub
+
+
+def _type(io, *seq):
+    for k in seq:
+        if k.startswith("-"): io.emit_key(k[1:], False)
+        else: io.emit_key(k, True)
+
+
+def test_only_the_exact_modifier_mask_fires(io):
+    fired = []
+    hub = _hub(io, {"<ctrl>+<alt>+h": lambda: fired.append("cah"), "h": lambda: fired.append("h")})
+    _type(io, "h", "-h",                                       # plain h
+          "ctrl_l", "alt_r", "h", "-h", "-alt_r", "-ctrl_l",   # either side counts
+          "ctrl_l", "shift_l", "alt_l", "h", "-h", "-alt_l", "-shift_l", "-ctrl_l",   # extra shift: no match
+          "ctrl_l", "h", "-h", "-ctrl_l")
+    hub.stop()
+    assert fired == ["h", "cah"]
+
+
+def test_autorepeat_fires_once_and_control_chars_map_back(io):
+    fired = []
+    hub = _hub(io, {"<ctrl>+h": lambda: fired.append(threading.current_thread().name)})
+    _type(io, "ctrl_l", "\x08", "\x08", "\x08", "-\x08", "\x08", "-\x08", "-ctrl_l")   # ctrl+h arrives as BS
+    hub.stop()
+    assert fired == ["hotkeys", "hotkeys"]
+
+
+def test_stop_runs_queued_actions(io):
+    done = []; gate = threading.Event()
+    hub = _hub(io, {"a": lambda: (gate.wait(1.0), done.append(1)), "b": lambda: done.append(2)})
+    _type(io, "a", "-a", "b", "-b")
+    gate.set(); hub.stop()
+    assert done == [1, 2]
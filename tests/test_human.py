@@ -0,0 +1,44 @@
+import statistics
+
+import pytest
+
+from macro_human import Humanizer
+
+
+def _draw(h, n=5000):
+    return [h.interval_factor() for _ in range(n)], [h.offset() for _ in range(n)]
+
+
+def test_same_seed_same_streams():
+    a = Humanizer(42, "gauss", 0.2, jitter_px=3, drift_px=10, block=64)
+    b = Humanizer(42, "gauss", 0.2, jitter_px=3, drift_px=10, block=4096)   # block size doesn't matter
+    assert _draw(a) == _draw(b)
+    assert _draw(Humanizer(43, "gauss", 0.2, jitter_px=3, drift_px=10))[0] != _draw(a)[0]
+
+
+def test_streams_do_not_shift_each_other():
+    a = Humanizer(7, "lognormal", 0.3, drift_px=5); b = Humanizer(7, "lognormal", 0.3, drift_px=5)
+    for _ in range(100): a.offset()    # position draws must not move the interval stream
+    assert [a.interval_factor() for _ in range(50)] == [b.interval_factor() for _ in range(50)]
+
+
+@pytest.mark.parametrize("dist", ["gauss", "lognormal"])
+def test_factors_have_mean_one(dist):
+    h = Humanizer(1, dist, 0.1); f = [h.interval_factor() for _ in range(20_000)]
+    assert statistics.fmean(f) == pytest.approx(1.0, abs=0.01)
+    assert statistics.pstdev(f) == pytest.approx(0.1, rel=0.1)
+
+
+def test_drift_stays_within_bound():
+    h = Humanizer(3, drift_px=4.0)
+    offs = [h.offset() for _ in range(50_000)]
+    assert max(max(abs(x), abs(y)) for x, y in offs) <= 4
+    assert len(set(offs)) > 10    # it does wander
+
+
+def test_no_noise_means_no_callables():
+    h = Humanizer(1)
+    assert h.interval_factor is None and h.delay_factor is None and h.offset is None
+    assert Humanizer.for_playback({"playback_dist": "gauss", "playback_delay_cv": 0}) is None
+    c = Humanizer.for_clicker({"human_seed": 5, "interval_dist": "gauss", "interval_cv": 0.1})
+    assert c.seed == 5 and c.key == Humanizer.click_key({"human_seed": 5, "interval_dist": "gauss", "interval_cv": 0.1})
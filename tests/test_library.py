@@ -0,0 +1,48 @@
+import pytest
+
+from macro_format import HEADER
+from macro_library import MacroLibrary, bulk, convert
+from macro_model import Macro
+
+from conftest import farming, key, save_both
+
+
+def test_convert_never_overwrites(tmp_path):
+    src, other = tmp_path / "a.mcrb", tmp_path / "a.json"
+    farming(3).save(src); Macro([key("press", "z")]).save(other)
+    before = other.read_bytes()
+    with pytest.raises(FileExistsError): convert(src, ".json", keep=False)
+    assert other.read_bytes() == before and src.exists()
+
+
+def test_bulk_convert_reports_the_clash(tmp_path):
+    farming(3).save(tmp_path / "a.mcrb"); Macro([key("press", "z")]).save(tmp_path / "a.json")
+    farming(4).save(tmp_path / "b.mcrb")
+    res = {r["path"].rsplit("/", 1)[-1]: r for r in bulk(MacroLibrary(tmp_path), "convert", ".json", keep=False, workers=1)}
+    assert not res["a.mcrb"]["ok"] and res["b.mcrb"]["ok"]
+    assert (tmp_path / "a.mcrb").exists() and not (tmp_path / "b.mcrb").exists()
+
+
+def test_duplicates_across_formats(tmp_path):
+    m = farming(5)
+    m.save(tmp_path / "a.json"); m.save(tmp_path / "a_copy.mcrb"); farming(6).save(tmp_path / "b.json")
+    lib = MacroLibrary(tmp_path); lib.rescan(workers=1)
+    assert [[e.path for e in g] for g in lib.duplicates()] == [["a.json", "a_copy.mcrb"]]
+
+
+def test_hash_is_format_independent(tmp_path):
+    m = farming(5)
+    m.delay[3] = 12.3456789     # below the µs .mcrb stores
+    j, b = save_both(m, tmp_path)
+    assert j.content_hash() == b.content_hash() == m.content_hash()
+    b.close()
+
+
+def test_old_mcrb_hash_is_computed(tmp_path):
+    m = farming(5); p = tmp_path / "old.mcrb"; m.save(p)
+    raw = bytearray(p.read_bytes()); f = list(HEADER.unpack_from(raw, 0))
+    f[2], f[8] = 0, bytes(16)    # no FLAG_COLUMN_HASH, as written before it existed
+    HEADER.pack_into(raw, 0, *f); p.write_bytes(raw)
+    b = Macro.load(p)
+    assert b.content_hash() == m.content_hash()
+    b.close()
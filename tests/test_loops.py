@@ -0,0 +1,109 @@
+from macro_format import HEADER
+from macro_library import validate
+from macro_loops import CompressOptions, compress, compress_edit
+from macro_model import Macro, MacroEvent, KIND_LOOP, LOOP_BEGIN, LOOP_END
+from macro_optimize import OptimizeOptions, optimize_edit
+from macro_plan import compile_macro, iter_ops
+
+from conftest import farming, key, save_both
+
+
+def repeat(n): return MacroEvent("loop", LOOP_BEGIN, {"count": n}, 0.0)
+def end(): return MacroEvent("loop", LOOP_END, {}, 0.0)
+
+
+def _flat(m, io):
+    # every op of one iteration, repeat blocks walked out
+    return [(off, fn, args) for off, fn, args in compile_macro(m, io).run()]
+
+
+def test_compress_finds_the_repeats():
+    m = farming(40)
+    c, rep = compress(m)
+    assert rep.blocks == 1 and rep.events_before == len(m)
+    assert len(c) == 2 + 5 + 2    # shift press/release, one pass, repeat + end rows
+    assert list(c.kind).count(KIND_LOOP) == 2
+    assert rep.ratio > 20
+
+
+def test_compressed_plan_plays_the_same_ops(io):
+    m = farming(40)
+    c, _ = compress(m)
+    want = _flat(m, io)
+    got = _flat(c, io)
+    assert got == want
+    assert compile_macro(c, io).duration_ns == compile_macro(m, io).duration_ns
+    assert len(compile_macro(c, io).run()) == len(want)
+
+
+def test_streamed_ops_match_the_plan(io):
+    c, _ = compress(farming(12))
+    assert list(iter_ops(c.events, io)) == list(iter_ops(farming(12).events, io))
+
+
+def test_delay_tolerance_averages_passes(io):
+    m = farming(30, jitter=4.0)          # 100/104/108 ms gaps between passes
+    c, rep = compress(m, CompressOptions(delay_tol_ms=10.0))
+    assert rep.blocks == 1
+    assert abs(c.duration_ms() - m.duration_ms()) < 10.0
+    # exact delays: only the 3-pass cycle of the jitter repeats
+    e, blocks = compress_edit(m, CompressOptions(delay_tol_ms=0.0, delay_tol_frac=0.0))
+    assert [b.period for b in blocks] == [15]
+
+
+def test_nested_blocks_play_expanded(io):
+    inner = [key("press", "b"), key("release", "b")]
+    nested = Macro([repeat(3), key("press", "a"), repeat(2), *inner, end(), key("release", "a"), end()])
+    flat = Macro([key("press", "a"), *inner * 2, key("release", "a")] * 3)
+    assert _flat(nested, io) == _flat(flat, io)
+    assert list(iter_ops(nested.events, io)) == list(iter_ops(flat.events, io))
+    assert nested.duration_ms() == flat.duration_ms()
+
+
+def test_existing_blocks_are_left_alone():
+    c, _ = compress(farming(5))
+    m = Macro(list(c.events) * 4)
+    assert compress_edit(m)[1] == []
+
+
+def test_compress_edit_is_undoable():
+    m = farming(10); before = m.copy()
+    e, blocks = compress_edit(m)
+    e.apply(m); assert len(m) < len(before)
+    e.revert(m); assert m == before
+
+
+def test_nothing_to_compress():
+    m = Macro([key("press", "a"), key("release", "a"), key("press", "b")])
+    e, blocks = compress_edit(m)
+    assert e is None and blocks == []
+
+
+def test_loops_round_trip(tmp_path):
+    c, _ = compress(farming(20))
+    j, b = save_both(c, tmp_path)
+    assert j == c and b.to_macro() == c
+    assert b.duration_ns == round(c.duration_ms() * 1e6)
+    b.close()
+
+
+def test_version_2_only_with_loops(tmp_path):
+    farming(3).save(tmp_path / "flat.mcrb")
+    compress(farming(20))[0].save(tmp_path / "loops.mcrb")
+    ver = lambda p: HEADER.unpack_from((tmp_path / p).read_bytes(), 0)[1]
+    assert ver("flat.mcrb") == 1 and ver("loops.mcrb") == 2
+
+
+def test_validate_accepts_loops(tmp_path):
+    c, _ = compress(farming(10))
+    for name in ("l.json", "l.mcrb"):
+        c.save(tmp_path / name)
+        assert validate(tmp_path / name) == []
+
+
+def test_loop_rows_are_kept():
+    c, _ = compress(farming(10))
+    rows = [e.action for e in c.events if e.kind == "loop"]
+    e, _ = optimize_edit(c, OptimizeOptions())
+    if e is not None: e.apply(c)
+    assert [e.action for e in c.events if e.kind == "loop"] == rows
@@ -0,0 +1,39 @@
+import random, time
+
+import pytest
+
+from macro_metrics import CLICK_INJECT, METRICS, Histogram
+from macro_sched import ClickJob
+
+from conftest import wait_for
+
+
+def test_percentiles_within_bucket_error():
+    rnd = random.Random(1); vals = sorted(rnd.randrange(1_000, 50_000_000) for _ in range(20_000))
+    h = Histogram("t")
+    for v in vals: h.record(v)
+    for q in (50, 90, 99, 99.9):
+        exact = vals[int(round(q / 100 * len(vals))) - 1]
+        assert h.percentile(q) == pytest.approx(exact, rel=0.04)
+    assert (h.min_ns, h.max_ns, h.count) == (vals[0], vals[-1], len(vals))
+
+
+def test_small_values_are_exact_and_merge_adds_up():
+    a, b = Histogram("a"), Histogram("b")
+    for v in range(1, 11): a.record(v)
+    for v in (-5, 1_000_000): b.record(v)
+    assert a.percentile(50) == 5 and a.percentile(100) == 10
+    a.merge(b)
+    assert (a.count, a.min_ns, a.max_ns, a.sum_ns) == (12, 0, 1_000_000, 1_000_055)
+    assert Histogram("empty").percentile(99) == 0
+
+
+def test_click_inject_times_only_the_backend_call(sched, io):
+    def slow_cfg():
+        time.sleep(0.02)   # cfg reads are not injection time
+        return {"click_mode": "cps", "cps": 20.0, "interval_ms": 100, "button": "left", "mode": "fixed",
+                "fixed_xy": (1, 1), "late_policy": "skip", "burst_size": 1}
+    METRICS.enabled = True; CLICK_INJECT.reset()
+    sched.add(ClickJob("slow", slow_cfg)); sched.start("slow")
+    wait_for(lambda: CLICK_INJECT.count >= 3)
+    assert CLICK_INJECT.max_ns < 10_000_000
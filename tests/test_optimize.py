@@ -0,0 +1,61 @@
+from macro_model import Macro
+from macro_optimize import OptimizeOptions, optimize_edit
+
+from conftest import click, key, move
+
+
+def _optimize(m, **kw):
+    e, reports = optimize_edit(m, OptimizeOptions(**kw))
+    if e is not None: e.apply(m)
+    return m
+
+
+def _actions(m):
+    return [(e.kind, e.action, e.data.get("pressed")) for e in m.events]
+
+
+def test_autorepeat_and_same_spot_moves_are_dropped():
+    m = Macro([key("press", "a"), key("press", "a"), key("press", "a"), key("release", "a"),
+               move(1, 1), move(1, 1), move(2, 2)])
+    n = m.duration_ms()
+    _optimize(m, trim_tail_moves=False, lead_ms=None)
+    assert _actions(m) == [("key", "press", None), ("key", "release", None),
+                           ("mouse", "move", None), ("mouse", "move", None)]
+    assert m.duration_ms() == n     # dropped rows hand their delay on
+
+
+def test_orphan_releases_are_dropped():
+    m = Macro([key("release", "x"), click(False), key("press", "a"), key("release", "a")])
+    _optimize(m)
+    assert _actions(m) == [("key", "press", None), ("key", "release", None)]
+
+
+def test_double_click_survives_quantize():
+    # at 70 and 90 ms, the release and second press snap to the same 100 ms step
+    m = Macro([click(True, delay=10), click(False, delay=60), click(True, delay=20), click(False, delay=60)])
+    _optimize(m, quantize_ms=100)
+    assert m.delay[2] == 0
+    _optimize(m)                    # the zero gaps quantize made must not merge the clicks
+    assert [e.data["pressed"] for e in m.events] == [True, False, True, False]
+
+
+def test_double_tap_survives_fast():
+    m = Macro([key("press", "a"), key("release", "a"), key("press", "a"), key("release", "a")])
+    _optimize(m, fast_min_ms=0.0001)
+    m.delay[2] = 0.0
+    _optimize(m)
+    assert [e.action for e in m.events] == ["press", "release", "press", "release"]
+
+
+def test_max_gap_and_lead():
+    m = Macro([key("press", "a", 500), key("release", "a", 5000)])
+    _optimize(m, max_gap_ms=200)
+    assert list(m.delay) == [0.0, 200.0]
+
+
+def test_optimize_is_undoable():
+    m = Macro([key("press", "a"), key("press", "a"), key("release", "a"), key("release", "b")])
+    before = m.copy()
+    e, _ = optimize_edit(m, OptimizeOptions())
+    e.apply(m); e.revert(m)
+    assert m == before
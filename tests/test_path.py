@@ -0,0 +1,44 @@
+from macro_path import PathSimplifier, _dist_to_segment, interpolate
+
+MS = 1_000_000
+
+
+def _simplify(points, **kw):
+    out = []; ps = PathSimplifier(lambda ts, x, y: out.append((x, y)), **kw)
+    for i, (x, y) in enumerate(points): ps.add(i * 10 * MS, x, y)
+    ps.flush(); return out
+
+
+def test_straight_line_keeps_only_its_ends():
+    assert _simplify([(i, 2 * i) for i in range(40)]) == [(0, 0), (39, 78)]
+
+
+def _error(points, out):
+    # how far the worst recorded point is from the simplified path
+    seg = [((0,) + a, (0,) + b) for a, b in zip(out, out[1:])]
+    return max(min(_dist_to_segment((0,) + p, a, b) for a, b in seg) for p in points)
+
+
+def test_corner_is_kept_within_tolerance():
+    pts = [(i, 0) for i in range(20)] + [(19, i) for i in range(1, 20)]
+    out = _simplify(pts)
+    assert len(out) == 3 and out[0] == (0, 0) and out[-1] == (19, 19)
+    assert _error(pts, out) <= 2.0
+
+
+def test_tolerance():
+    wobble = [(i, (i % 2) * 3) for i in range(30)]   # 3 px zig-zag
+    assert len(_simplify(wobble, tolerance_px=4.0)) == 2
+    assert len(_simplify(wobble, tolerance_px=2.0)) > 10
+
+
+def test_fast_samples_are_decimated_but_the_last_is_kept():
+    out = []; ps = PathSimplifier(lambda ts, x, y: out.append((x, y)), min_interval_ns=8 * MS)
+    for i in range(10): ps.add(i * MS, i, 0)       # 1 ms apart
+    ps.flush()
+    assert out == [(0, 0), (9, 0)]
+
+
+def test_interpolate_fills_between_moves():
+    pts = list(interpolate(0, 0, 0, 40 * MS, 40, 0, 10 * MS))
+    assert pts == [(10 * MS, 10, 0), (20 * MS, 20, 0), (30 * MS, 30, 0)]
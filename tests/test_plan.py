@@ -0,0 +1,35 @@
+import time
+
+from macro_backend import VirtualBackend
+from macro_edit import EditHistory, delete_rows, set_delays
+from macro_model import Macro
+from macro_plan import get_plan
+
+from conftest import farming, key, taps
+
+
+def test_hash_follows_edits():
+    m = farming(5); h0 = m.content_hash(); hist = EditHistory()
+    hist.do(m, set_delays(m, [3], 77.0)); h1 = m.content_hash()
+    assert h1 != h0 and h1 == Macro(m.events).content_hash()
+    hist.undo(m); assert m.content_hash() == h0
+    hist.redo(m); assert m.content_hash() == h1
+    hist.do(m, delete_rows([0, 1])); assert m.content_hash() == Macro(m.events).content_hash()
+    m.scale_delays(2.0); assert m.content_hash() == Macro(m.events).content_hash()
+    m.append(key("press", "q")); assert m.content_hash() == Macro(m.events).content_hash()
+    m.delay[0] = 1.0; m.changed(); assert m.content_hash() == Macro(m.events).content_hash()
+
+
+def test_copy_keeps_the_hash():
+    m = farming(5); h = m.content_hash(); c = m.copy()
+    assert c._hash == h
+    c.offset(1, 1); assert c.content_hash() != h and m.content_hash() == h
+
+
+def test_plan_cache_hit_is_cheap():
+    m, io = taps(100_000), VirtualBackend()
+    plan = get_plan(m, io)
+    t = time.perf_counter(); again = get_plan(m, io)
+    assert again is plan and time.perf_counter() - t < 0.01
+    m.clamp_delays(0.0, 0.5)
+    assert get_plan(m, io) is not plan
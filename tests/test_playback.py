@@ -0,0 +1,16 @@
+import threading
+
+import macro_engine as engine
+
+from conftest import gaps_ms, taps, wait_for
+
+
+def test_playback_macro_compiles_before_the_clock(io):
+    engine.set_backend(io)
+    def stop_after_ops():
+        wait_for(lambda: len(io.log) >= 20); engine.playing = False
+    stop = threading.Thread(target=stop_after_ops); stop.start()
+    engine.playback_macro(taps(100_000))
+    stop.join()
+    # ops keep their 1 ms spacing instead of bursting out after the compile
+    assert len(io.log) >= 10 and min(gaps_ms(io.log)) > 0.5
@@ -0,0 +1,35 @@
+import time
+
+import macro_engine as engine
+from macro_sched import ERROR, STARTING, STOPPED, Job, PlaybackJob
+
+from conftest import gaps_ms, taps, wait_for
+
+
+def test_playback_job_compiles_off_the_caller(sched, io):
+    sched.add(PlaybackJob("macro", taps(100_000)))
+    t = time.perf_counter(); sched.start("macro")
+    assert time.perf_counter() - t < 0.05
+    assert sched.jobs["macro"].state == STARTING and sched.running("macro")
+    wait_for(lambda: len(io.log) >= 10)
+    sched.stop("macro")
+    # ops keep their spacing instead of bursting out to catch up with the compile
+    assert min(gaps_ms(io.log)) > 0.5
+
+
+def test_stop_while_preparing(sched, io):
+    sched.add(PlaybackJob("macro", taps(50_000))); sched.start("macro"); sched.stop("macro")
+    time.sleep(0.5)
+    assert sched.jobs["macro"].state == STOPPED and not io.log and engine.active_jobs == 0
+
+
+class _Broken(Job):
+    def start(self, now_ns): return now_ns
+    def fire(self, now_ns, due_ns): raise RuntimeError("backend gone")
+
+
+def test_job_errors_are_reported(sched):
+    sched.add(_Broken("broken")); sched.start("broken")
+    wait_for(lambda: sched.jobs["broken"].state == ERROR)
+    assert "backend gone" in sched.jobs["broken"].error
+    assert engine.active_jobs == 0
@@ -0,0 +1,48 @@
+import time
+
+from macro_timing import DeadlineScheduler, TimingStats, advance
+
+MS = 1_000_000
+
+
+def _late_tick(policy, max_catchup=10):
+    # a 10 ms grid whose first deadline was 55 ms ago
+    s = DeadlineScheduler(10 * MS, policy, max_catchup=max_catchup)
+    due = time.perf_counter_ns() - 55 * MS; s.start(due)
+    assert s.wait()
+    return s, due
+
+
+def test_skip_realigns_to_the_grid():
+    s, due = _late_tick("skip")
+    assert s.next_ns == due + 60 * MS and s.stats.missed == 5
+
+
+def test_catchup_fires_missed_ticks_back_to_back():
+    s, due = _late_tick("catchup")
+    assert s.next_ns == due + 10 * MS and s.stats.missed == 0
+
+
+def test_catchup_gives_up_beyond_max():
+    s, due = _late_tick("catchup", max_catchup=2)
+    assert s.next_ns == due + 60 * MS and s.stats.missed == 5
+
+
+def test_advance_uses_the_humanized_step():
+    assert advance(0, 25 * MS, 10 * MS, 13 * MS) == (33 * MS, 2)
+    assert advance(0, 25 * MS, 10 * MS, 13 * MS, "catchup") == (13 * MS, 0)
+    assert advance(0, 0, 10 * MS, 7 * MS) == (7 * MS, 0)
+
+
+def test_wait_stops_when_told():
+    s = DeadlineScheduler(10_000 * MS); s.start(time.perf_counter_ns() + 10_000 * MS)
+    assert not s.wait(lambda: False)
+
+
+def test_timing_stats():
+    st = TimingStats(); st.t0_ns = 0
+    for i in range(11): st.record(i * MS, i * 100 * MS, units=2)
+    d = st.summary()
+    assert d["ticks"] == 11 and d["burst"] == 2
+    assert d["achieved_cps"] == 20.0    # 10 ticks/s, 2 clicks each
+    assert d["late_mean_ms"] == 5.0 and d["late_max_ms"] == 10.0 and d["late_p99_ms"] == 10.0
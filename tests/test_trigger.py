@@ -0,0 +1,61 @@
+import pytest
+
+import macro_engine as engine
+from macro_sched import ClickJob, TriggerJob
+from macro_trigger import ArraySource, FileSource, Region, TriggerSet
+
+from conftest import wait_for
+
+CLICK_CFG = {"click_mode": "cps", "cps": 10.0, "interval_ms": 100, "button": "left", "mode": "fixed",
+             "fixed_xy": (3, 4), "late_policy": "skip", "burst_size": 1}
+
+
+def _ppm(tmp_path, header: bytes, pixels: bytes):
+    p = tmp_path / "screen.ppm"; p.write_bytes(header + pixels); return p
+
+
+@pytest.mark.parametrize("first", [0x0a, 0x20, 0x09, 0x0d, 0x23])
+def test_ppm_pixels_may_start_with_whitespace(tmp_path, first):
+    rgb = bytes([first, 0x20, 0x09, 1, 2, 3])
+    src = FileSource(_ppm(tmp_path, b"P6\n2 1\n255\n", rgb))
+    assert src.grab(0, 0, 2, 1).data == bytes([0x09, 0x20, first, 0xff, 3, 2, 1, 0xff])   # BGRA
+
+
+def test_ppm_header_comments(tmp_path):
+    src = FileSource(_ppm(tmp_path, b"P6 # from a test\n# size\n1 1 255\n", b"\x0a\x0b\x0c"))
+    assert src.grab(0, 0, 1, 1).data == b"\x0c\x0b\x0a\xff"
+
+
+def test_ppm_truncated_pixels_are_rejected(tmp_path):
+    with pytest.raises(ValueError): FileSource(_ppm(tmp_path, b"P6\n2 2\n255\n", b"\x00" * 11))
+
+
+def test_armed_trigger_does_not_block_recording(sched):
+    ts = TriggerSet(ArraySource(32, 32), [Region(0, 0, 8, 8, "change")], 60)
+    sched.add(TriggerJob("watch", ts, lambda fired: None)); sched.start("watch")
+    assert sched.running("watch") and engine.active_jobs == 0
+    engine.start_record()
+    try: assert engine.recording
+    finally: engine.stop_record()
+
+
+def test_first_poll_only_takes_the_baseline(sched):
+    # a "match" region already matches when the job is added; that must not fire
+    src = ArraySource(32, 32); ts = TriggerSet(src, [Region(0, 0, 8, 8, "match")], 500)
+    ts.capture_refs(); fired = []
+    sched.add(TriggerJob("watch", ts, fired.append)); sched.start("watch")
+    wait_for(lambda: sched.jobs["watch"].stats.ticks >= 3)
+    assert not fired
+    src.fill(0, 0, 8, 8, (0, 255, 0)); wait_for(lambda: not ts.active())
+    src.fill(0, 0, 8, 8, (0, 0, 0)); wait_for(lambda: fired)
+
+
+def test_gated_clicker_clicks_only_while_the_region_matches(sched, io):
+    src = ArraySource(32, 32, (255, 0, 0)); ts = TriggerSet(src, [Region(0, 0, 8, 8, "match")], 500)
+    ts.capture_refs(); src.fill(0, 0, 8, 8, (0, 0, 0))
+    cfg = dict(CLICK_CFG, cps=500.0)
+    sched.add(ClickJob("gated", lambda: cfg, gate=ts.gate())); sched.start("gated")
+    wait_for(lambda: sched.jobs["gated"].stats.ticks >= 10)
+    assert not io.log
+    src.fill(0, 0, 8, 8, (255, 0, 0))
+    wait_for(lambda: len(io.log) >= 4)
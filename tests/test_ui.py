@@ -0,0 +1,56 @@
+import threading
+
+from macro_ui import RateMeter, UiChannel
+
+
+class FakeRoot:
+    # after() only queues; tests run the pending callbacks by hand, like Tk's loop would
+    def __init__(self): self.pending, self.ids = {}, 0
+    def after(self, ms, fn): self.ids += 1; self.pending[self.ids] = fn; return self.ids
+    def after_cancel(self, i): self.pending.pop(i, None)
+    def run(self):
+        due, self.pending = self.pending, {}
+        for fn in due.values(): fn()
+
+
+def _from_worker(fn):
+    t = threading.Thread(target=fn); t.start(); t.join()
+
+
+def test_posts_are_coalesced_per_frame():
+    root = FakeRoot(); ui = UiChannel(root); seen = []
+    ui.bind("count", seen.append); ui.start()
+    _from_worker(lambda: [ui.post("count", i) for i in range(1000)])
+    root.run(); root.run()
+    assert seen == [999]
+
+
+def test_calls_run_in_order_on_the_tk_thread():
+    root = FakeRoot(); ui = UiChannel(root); ran = []
+    _from_worker(lambda: [ui.call(lambda i=i: ran.append((i, threading.get_ident()))) for i in range(3)])
+    assert not ran
+    ui.start(); root.run()
+    assert ran == [(i, ui.tk_thread) for i in range(3)]
+    ui.call(ran.append, "now"); assert ran[-1] == "now"     # already on the Tk thread
+
+
+def test_a_failing_update_keeps_the_pump_going():
+    root = FakeRoot(); ui = UiChannel(root); seen = []
+    ui.bind("bad", lambda v: 1 / 0); ui.bind("good", seen.append); ui.on_frame(lambda: 1 / 0)
+    ui.start(); ui.post("bad", 1); ui.post("good", 2); _from_worker(lambda: ui.call(lambda: 1 / 0))
+    root.run()
+    assert seen == [2] and len(root.pending) == 1       # rescheduled
+    ui.post("good", 3); root.run(); assert seen == [2, 3]
+
+
+def test_stop_cancels_the_pump():
+    root = FakeRoot(); ui = UiChannel(root); ui.start(); root.run()
+    ui.stop(); assert not root.pending
+    ui.start(); assert len(root.pending) == 1
+
+
+def test_rate_meter_resets_with_the_counter():
+    r = RateMeter(window_s=0.0)
+    assert r.update(0) == 0.0
+    assert r.update(100) > 0
+    assert r.update(5) == 0.0